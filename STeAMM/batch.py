@@ -0,0 +1,207 @@
+#-------------------------------------------------------------------------------
+# Name:         batch.py
+#
+# Summary:      Headless entry point running the full STeAMM pipeline (download, preprocess,
+#               predict) from a JSON run config, without QGIS. For example:
+#
+#                   python batch.py basin.json
+#
+#               where basin.json holds (see lib/run_config.py for all keys):
+#
+#                   {"proj_dir": "crb", "years": [2015], "tiles": ["h09v04", "h10v04"],
+#                    "doy_start": 1, "doy_end": 365, "product": "MOD11A1.005",
+#                    "rca_shp": "rca.shp", "rca_id_field": "RCA_ID",
+#                    "stream_shp": "streams.shp", "stream_id_field": "REACH_ID",
+#                    "obs_csv": "obs_temp.csv", "n_workers": 8}
+#
+#               Several basins can share one run, listed as "basins": [{"name": "crb",
+#               "rca_shp": ..., "stream_shp": ...}, ...]. Their tiles are then downloaded,
+#               converted and mosaicked once, warped once per distinct projection and
+#               resolution, and only clipped, summarized and modeled per basin.
+#
+#               The time, items and bytes of every stage are written to run_report.json in
+#               the project directory, and printed as a summary at the end of the run. The
+#               telemetry of download requests (latency, time to first byte, throughput per
+#               host) is written to download_stats.json and summarized alongside.
+#               Stages named in the run config's 'profile' key, or in the STEAMM_PROFILE
+#               environment variable, are profiled into the project's temp directory.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import sys
+import argparse
+import get_swaths
+import preprocess
+import predict_temp
+from lib import run_config
+from lib import run_journal
+from lib import run_report
+from lib import stage_profile
+from lib import download_stats
+
+# Names of the run report and download telemetry in the project directory
+REPORT_FILE = 'run_report.json'
+DOWNLOAD_STATS_FILE = 'download_stats.json'
+
+
+def download_year(config, year):
+    """Downloads the MODIS HDF files of one year of a run config, or finds them if they
+    were downloaded before. Returns the HDF file paths, file names and dates."""
+    hdf_filepath_list, hdf_filename_list, hdf_dates = get_swaths.main(
+        config['proj_dir'], [config['product']], [year], config['tiles'],
+        config['doy_start'], config['doy_end'], config['username'], config['password'],
+        config['download'], config['proxy'], run_config.download_policy(config),
+        int(config['max_connections']), strict=True)
+    if len(hdf_dates) == 0:
+        raise ValueError("No MODIS HDF files found for %d" % year)
+    return hdf_filepath_list, hdf_filename_list, hdf_dates
+
+
+def run_year(config, year):
+    """Downloads, preprocesses and predicts one year of a run config. Returns the
+    GeoPackage of predictions."""
+    print "Processing %d..." % year
+    hdf_filepath_list, hdf_filename_list, hdf_dates = download_year(config, year)
+
+    year_dir = os.path.join(config['proj_dir'], str(year))
+    lst_csv, reprj_list = preprocess.main(year_dir, hdf_filepath_list, hdf_filename_list,
+                                          hdf_dates, config['tiles'], config['rca_shp'],
+                                          run_config.open_cache(config), config['keep_intermediates'],
+                                          config['max_in_flight'],
+                                          run_journal.RunJournal(os.path.join(year_dir, run_journal.JOURNAL_FILE),
+                                                                 config['resume']))
+    return predict_temp.main(lst_csv, reprj_list[0], config['rca_shp'], config['rca_id_field'],
+                             config['stream_shp'], config['stream_id_field'], config['obs_csv'],
+                             os.path.join(config['proj_dir'], 'output'), config['n_folds'],
+                             config['n_workers'], config['fill_method'], config['area_weighted'])
+
+
+def preprocess_shared(config, year):
+    """Downloads, converts and mosaics one year of a multi-basin run config, once for all
+    basins. Returns the VRT mosaics and the MODIS grid resolution."""
+    hdf_filepath_list, hdf_filename_list, hdf_dates = download_year(config, year)
+
+    year_dir = os.path.join(config['proj_dir'], str(year))
+    for sub_dir in preprocess.PREPROCESS_DIRS:
+        if not os.path.exists(os.path.join(year_dir, sub_dir)):
+            os.makedirs(os.path.join(year_dir, sub_dir))
+    cache = run_config.open_cache(config)
+    geotiff_list, xres, yres = preprocess.convert_hdf(
+        year_dir, [os.path.join(year_dir, preprocess.PREPROCESS_DIRS[0])], hdf_filepath_list, hdf_filename_list,
+        cache)
+    mosaic_io_array = preprocess.build_mosaic_io_array(geotiff_list, hdf_dates)
+    vrt_list = preprocess.convert_to_vrt(mosaic_io_array, config['tiles'], year_dir,
+                                         preprocess.PREPROCESS_DIRS, preprocess.find_modis_wkt(), cache)
+    return vrt_list, abs(xres), abs(yres)
+
+
+def run_basins_year(config, year):
+    """Runs one year of a multi-basin run config. The mosaics are warped once per distinct
+    projection and resolution of the basins, and each basin clips, fills, summarizes and
+    models its own part of the shared grids. Returns the GeoPackage of each basin."""
+    print "Processing %d for %d basins..." % (year, len(config['basins']))
+    vrt_list, xres, yres = preprocess_shared(config, year)
+    cache = run_config.open_cache(config)
+    year_dir = os.path.join(config['proj_dir'], str(year))
+    warped = {}
+    out_gpkgs = {}
+    for basin in run_config.basin_configs(config):
+        print "Processing basin %s..." % basin['name']
+        poly_wkt = preprocess.get_poly_wkt(basin['rca_shp'])
+        res = (basin['resolution'], basin['resolution']) if basin['resolution'] else (xres, yres)
+        key = preprocess.warp_key(poly_wkt, res[0], res[1])
+        if key not in warped:
+            warp_dir = os.path.join(year_dir, 'warp_%s' % key)
+            warp_journal = run_journal.RunJournal(os.path.join(warp_dir, run_journal.JOURNAL_FILE), config['resume'])
+            warped[key] = preprocess.warp_rasters(vrt_list, warp_dir, poly_wkt, res[0], res[1], cache, warp_journal)
+
+        basin_dir = os.path.join(config['proj_dir'], 'basins', basin['name'])
+        basin_year_dir = os.path.join(basin_dir, str(year))
+        basin_journal = run_journal.RunJournal(os.path.join(basin_year_dir, run_journal.JOURNAL_FILE),
+                                               config['resume'])
+        clip_list = preprocess.clip_rasters(warped[key],
+                                            os.path.join(basin_year_dir, preprocess.PREPROCESS_DIRS[1]),
+                                            preprocess.get_bbox(basin['rca_shp']), basin['rca_shp'], cache,
+                                            basin_journal)
+        fill_list = preprocess.spatial_fill_rasters(clip_list)
+        csv_list = preprocess.LST_to_csv(fill_list, basin_year_dir, preprocess.PREPROCESS_DIRS, cache)
+        acq_date_list = preprocess.build_acq_date_list(csv_list)
+        lst_csv = preprocess.build_interpl_table(acq_date_list, basin_year_dir, preprocess.PREPROCESS_DIRS)
+        out_gpkgs[basin['name']] = predict_temp.main(
+            lst_csv, clip_list[0], basin['rca_shp'], basin['rca_id_field'], basin['stream_shp'],
+            basin['stream_id_field'], basin['obs_csv'], os.path.join(basin_dir, 'output'),
+            config['n_folds'], config['n_workers'], config['fill_method'], config['area_weighted'])
+    return out_gpkgs
+
+
+def run(config):
+    """Runs every year of a run config, in order. The RCA store and models in the output
+    directory accumulate all years, so the GeoPackage of the last year holds predictions
+    for every year. Returns the GeoPackage, or a GeoPackage per basin for multi-basin
+    run configs."""
+    report = run_report.reset()
+    downloads = download_stats.reset()
+    stage_profile.configure(config['profile'], os.path.join(config['proj_dir'], 'temp', 'profiles'))
+    out_gpkg = None
+    try:
+        for year in config['years']:
+            if config['basins']:
+                out_gpkg = run_basins_year(config, year)
+            else:
+                out_gpkg = run_year(config, year)
+    finally:
+        print report.summary()
+        print "Run report written to %s" % report.write(os.path.join(config['proj_dir'], REPORT_FILE))
+        if downloads.requests:
+            print downloads.summary()
+            print "Download telemetry written to %s" % downloads.write(
+                os.path.join(config['proj_dir'], DOWNLOAD_STATS_FILE))
+        for profile_file in stage_profile.write():
+            print "Stage profile written to %s" % profile_file
+    print "STeAMM batch run complete: %s" % out_gpkg
+    return out_gpkg
+
+
+def parse_args(argv=None):
+    """Parses the command line options."""
+    parser = argparse.ArgumentParser(description="Run the STeAMM pipeline without QGIS.")
+    parser.add_argument('config', help="JSON run config file")
+    parser.add_argument('--skip-download', action='store_true',
+                        help="use previously downloaded HDF files")
+    parser.add_argument('--workers', type=int, dest='n_workers',
+                        help="number of model selection worker processes")
+    parser.add_argument('--restart', action='store_true',
+                        help="preprocess every date again, instead of resuming a previous run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    overrides = {}
+    if args.skip_download:
+        overrides['download'] = False
+    if args.n_workers is not None:
+        overrides['n_workers'] = args.n_workers
+    if args.restart:
+        overrides['resume'] = False
+    try:
+        config = run_config.load_config(args.config, overrides)
+    except ValueError as e:
+        print "Invalid run config: %s" % e
+        return 2
+    run(config)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
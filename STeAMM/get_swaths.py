@@ -22,17 +22,12 @@
 
 # Import modules
 import os
-import sys
-import shutil
+import time
+from lib import run_report
+from lib import job_queue
 # import gdal
 # import gdalconst
 
-tool_dir = os.path.normpath(os.path.dirname(__file__))
-sys.path.insert(0, tool_dir + '\externals\get_modis' )
-for path in sys.path:
-    print path
-import get_modis as gm
-
 # TODO remove CLI example text block
 '''
 # ---------------
@@ -66,39 +61,105 @@ PLATFORM = 'MOLT' # L
 #MODIS_PRODUCTS = {'Daily':'MOD11A1.005', '8-day':'MOD11A2.005'}
 MODIS_PRODUCTS = {'Daily':'MOD11A1.005'}
 
+# Name of the record of granules that failed to download, in each HDF directory
+FAILED_FILE = 'failed_granules.json'
+
 def build_dir_list(project_dir, year_list, product_list):
     """Create a list of full directory paths for downloaded MODIS files."""
     dir_list = []
     for product in product_list:
         for year in year_list:
-            dir_list.append("{}\{}\{}".format(project_dir, product, year))
+            dir_list.append(os.path.join(project_dir, product, str(year)))
     return dir_list
 
 
 def make_dirs(dir_list):
-    """Creates new directories to store downloaded MODIS files"""
+    """Creates the directories to store downloaded MODIS files that do not exist yet. Files
+    already downloaded are kept; get_modis only downloads them again if their size differs
+    from the server's."""
     for dir in dir_list:
         if not os.path.exists(dir):
             print ("Creating new directory " + dir)
             os.makedirs(dir, 0777)
-        else:
-            print ("Overwriting existing directory with " + dir)
-            shutil.rmtree(dir)
-            os.makedirs(dir, 0777)
     return
 
 
-def download_hdf(product_list, year_list, swath_list, doy_start, doy_end, project_dir, username, password, proxy=None):
-    """download HDF files for multiple years, using get_modis."""
-
-    for product in product_list.itervalues():
+def downloaded(hdf_dir, record):
+    """Whether a granule that failed to download is in an HDF directory now. For a failed
+    date listing, whether any granule of the date is."""
+    if record['file']:
+        return os.path.exists(os.path.join(hdf_dir, record['file']))
+    date = time.strftime('%Y%j', time.strptime(record['url'].rstrip('/').split('/')[-1], '%Y.%m.%d'))
+    return any('.A%s.' % date in f for f in os.listdir(hdf_dir))
+
+
+def record_failed(hdf_dir, failed):
+    """Adds granules that failed to download to the failed_granules.json record of an HDF
+    directory, and drops those that have been downloaded since. Returns the granules still
+    missing, by earlier downloads too."""
+    failed_file = os.path.join(hdf_dir, FAILED_FILE)
+    records = job_queue.read_json(failed_file) if os.path.exists(failed_file) else []
+    by_url = dict((r['url'], r) for r in records + failed)
+    missing = [r for r in by_url.values() if r in failed or not downloaded(hdf_dir, r)]
+    missing.sort(key=lambda r: r['url'])
+    if missing or records:
+        job_queue.write_json(failed_file, missing)
+    return missing
+
+
+def _progress(feedback, percent, message=None):
+    """Reports progress to the feedback of a QGIS task (see steamm_task.py), if given."""
+    if feedback is not None:
+        feedback.report(percent, message)
+
+
+def download_hdf(product_list, year_list, swath_list, doy_start, doy_end, project_dir, username, password, proxy=None,
+                 policy=None, max_connections=None, strict=False, feedback=None, listings=None):
+    """download HDF files for multiple years, using get_modis. Requests are retried according
+    to policy (a lib.retry_policy.RetryPolicy), with up to max_connections in flight. Granules
+    that still fail are recorded in failed_granules.json in the HDF directory; if strict, an
+    IOError is then raised, rather than carrying on with an incomplete dataset. Progress is
+    reported to the feedback of a QGIS task, if given, after each swath. Each product directory
+    is listed once, rather than for each swath; callers can pass the same listings dict to
+    successive calls to list it once for all of them."""
+    # imported here, so importing this module does not load the download client
+    from lib import get_modis as gm
+
+    if max_connections is None:
+        max_connections = gm.retry_policy.MAX_CONNECTIONS
+    if listings is None:
+        listings = {}
+    hdf_dirs = []
+    missing = []
+    n_swaths = len(product_list) * len(year_list) * len(swath_list)
+    n_done = 0
+    for product in product_list:
         for year in year_list:
+            hdf_dir = build_dir_list(project_dir, [year], [product])[0]
+            failed = []
             for swath in swath_list:
-                hdf_dir = """{}\{}\{}""".format(project_dir, year, product)
-                gm.get_modisfiles(username, password, PLATFORM, product, year, swath, proxy, doy_start, doy_end)
-            message = 'All HDF files downloaded for %d.' % (year)
-            print message
-    return hdf_dir
+                # get_modis excludes the end day
+                with run_report.timed('get_swaths.download_hdf') as stats:
+                    failed += gm.get_modisfiles(PLATFORM, product, int(year), swath, proxy,
+                                                username=username, password=password,
+                                                doy_start=int(doy_start), doy_end=int(doy_end) + 1,
+                                                out_dir=hdf_dir, policy=policy,
+                                                max_connections=max_connections, listings=listings)
+                    stats.add(1)
+                n_done += 1
+                _progress(feedback, 90.0 * n_done / n_swaths)
+            if failed:
+                print '%d HDF files failed to download for %d.' % (len(failed), int(year))
+            else:
+                print 'All HDF files downloaded for %d.' % int(year)
+            record_failed(hdf_dir, failed)
+            missing += failed
+            hdf_dirs.append(hdf_dir)
+    print gm.download_stats.current().summary()
+    if missing and strict:
+        raise IOError("%d HDF files could not be downloaded, see %s in the HDF directories: %s"
+                      % (len(missing), FAILED_FILE, ', '.join(r['url'] for r in missing[:5])))
+    return hdf_dirs
 
 
 def get_hdf_filepaths(hdf_dir):
@@ -144,42 +205,44 @@ def find_dup_file_dates(hdf_date_list, swath_list):
     return sorted_dates
 
 
-# main function, to serve as example
+# main function
 def main(proj_dir,
          data_products,
-         process_yr_str,
-         swath_id,
-         doy_start_str,
-         doy_end_str,
-         username,
-         password):
-
-    # Create download directories and download from HDF files from USGS server
-    dirs = build_dir_list(proj_dir, data_products, process_yr)
-    make_dirs(dirs)
-    download_hdf(MODIS_PRODUCTS, process_yr, swath_id, doy_start, doy_end, data_dir, username, password)
-
-    hdf_filepath_list, hdf_file_list = get_hdf_filepaths(dirs)
-    hdf_file_array = build_file_array(hdf_file_list)
-    hdf_date_list = get_file_dates(hdf_file_array)
-    hdf_dates = find_dup_file_dates(hdf_date_list, swath_id)
-
-
-# testing variables
-data_dir = r'C:\JL\Testing\STeAMM\test20160912'
-process_yr = [2015, 2016]
-swath_id = ['h09v04', 'h10v04']
-doy_start = 1
-doy_end = 9
-username = 'jesselangdon'
-password = 'Jw-3i1970'
-
-# call the main function, run the program
-if __name__ == '__main__':
-    main(data_dir,
-         MODIS_PRODUCTS,
          process_yr,
          swath_id,
          doy_start,
          doy_end,
-         username, password)
\ No newline at end of file
+         username,
+         password,
+         download=True,
+         proxy=None,
+         policy=None,
+         max_connections=None,
+         strict=False,
+         feedback=None):
+    """Downloads the MODIS HDF files of each product, year and swath (tile), from doy_start to
+    doy_end (inclusive). If download is False, previously downloaded files are used. See
+    download_hdf for the retry policy, max_connections and strict. Returns the file paths,
+    file names and collection dates of the HDF files, for preprocess.main. Progress is
+    reported to the feedback of a QGIS task (see steamm_task.py), if given, which can cancel
+    the run between steps."""
+
+    if isinstance(data_products, dict):
+        data_products = sorted(data_products.values())
+
+    # Create download directories and download from HDF files from USGS server
+    dirs = build_dir_list(proj_dir, process_yr, data_products)
+    if download:
+        make_dirs(dirs)
+        _progress(feedback, 0, "Downloading MODIS HDF files...")
+        download_hdf(data_products, process_yr, swath_id, doy_start, doy_end, proj_dir, username, password, proxy,
+                     policy, max_connections, strict, feedback)
+
+    _progress(feedback, 90, "Listing MODIS HDF files...")
+    with run_report.timed('get_swaths.list_hdf') as stats:
+        hdf_file_list, hdf_filepath_list = get_hdf_filepaths(dirs)
+        hdf_file_array = build_file_array(hdf_file_list)
+        hdf_date_list = get_file_dates(hdf_file_array)
+        hdf_dates = find_dup_file_dates(hdf_date_list, swath_id)
+        stats.add(len(hdf_filepath_list))
+    return hdf_filepath_list, hdf_file_list, hdf_dates
@@ -0,0 +1,245 @@
+#-------------------------------------------------------------------------------
+# Name:         download_stats.py
+#
+# Summary:      Telemetry of the HTTP requests made to download MODIS granules: latency,
+#               time to first byte, bytes transferred, retries and HTTP status of each
+#               request, throughput per host, and latency histograms. Per host throughput
+#               is over the wall time from the first request's start to the last one's end,
+#               so concurrent requests are not counted twice; the throughput of granule
+#               downloads alone, without listings, size checks and failed requests, is
+#               reported separately. A progress UI or an external monitor can poll
+#               snapshot(), or register a callback that is called with each request as it
+#               completes.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import json
+import time
+import threading
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+# Upper bounds of the latency histogram buckets, in seconds; the last bucket is unbounded
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Bytes in a megabyte, for the summary
+MB = 1024.0 * 1024.0
+
+
+class Histogram(object):
+    """Counts of values in fixed buckets, with the count, sum, minimum and maximum.
+
+    :param buckets: Increasing upper bounds of the buckets; values above the last bound
+        are counted in an extra, unbounded bucket.
+    :type buckets: tuple
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        """Returns an upper bound of the q-th percentile (0 to 100): the upper bound of the
+        bucket holding it, or the maximum for the unbounded bucket. None if empty."""
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': round(self.total, 6), 'min': self.min, 'max': self.max,
+                'mean': self.total / self.count if self.count else None,
+                'p50': self.percentile(50), 'p90': self.percentile(90), 'p99': self.percentile(99),
+                'buckets': [[le, n] for le, n in zip(list(self.buckets) + ['inf'], self.counts)]}
+
+
+def _span(stats, start_key, end_key, start, end):
+    """Widens the time span of a host's requests to include a request."""
+    if stats[start_key] is None or start < stats[start_key]:
+        stats[start_key] = start
+    if stats[end_key] is None or end > stats[end_key]:
+        stats[end_key] = end
+
+
+def _seconds(start, end):
+    return end - start if start is not None else 0.0
+
+
+def _rate(n_bytes, seconds):
+    return n_bytes / MB / seconds if seconds else None
+
+
+def _format_rate(mb_per_second):
+    return '%.2f' % mb_per_second if mb_per_second is not None else '-'
+
+
+class DownloadStats(object):
+    """Telemetry of download requests, safe to record from several threads."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.in_flight = 0
+        self.status = {}
+        self.hosts = {}
+        self.latency = Histogram()
+        self.ttfb = Histogram()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback):
+        """Registers callback(request) to be called with the dict describing each request
+        when it completes. Exceptions raised by callbacks are ignored."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def start(self):
+        """Counts a request as in flight. Returns its start time."""
+        with self._lock:
+            self.in_flight += 1
+        return time.time()
+
+    def record(self, url, start, ttfb=None, n_bytes=0, status=None, retries=0, error=None, download=False):
+        """Records a completed (or failed) request, started at start (from start()), with
+        the seconds to its first byte, the bytes received, the HTTP status, the number of
+        times it was tried before, and the error, if it failed. The retries total counts
+        requests that were retries of an earlier one. download is True for requests
+        downloading a granule, rather than listing dates or checking sizes."""
+        end = time.time()
+        seconds = end - start
+        host = urlparse(url).netloc
+        request = {'url': url, 'host': host, 'status': status, 'seconds': seconds, 'ttfb': ttfb,
+                   'bytes': n_bytes, 'retries': retries, 'error': error, 'time': start,
+                   'download': download}
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            if retries:
+                self.retries += 1
+            self.bytes += n_bytes
+            if error is not None:
+                self.errors += 1
+            key = str(status) if status is not None else 'none'
+            self.status[key] = self.status.get(key, 0) + 1
+            self.latency.add(seconds)
+            if ttfb is not None:
+                self.ttfb.add(ttfb)
+            if host not in self.hosts:
+                self.hosts[host] = {'requests': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0,
+                                    'first_start': None, 'last_end': None, 'downloads': 0,
+                                    'download_bytes': 0, 'download_start': None, 'download_end': None}
+            stats = self.hosts[host]
+            stats['requests'] += 1
+            stats['bytes'] += n_bytes
+            stats['seconds'] += seconds
+            _span(stats, 'first_start', 'last_end', start, end)
+            if error is not None:
+                stats['errors'] += 1
+            elif download:
+                stats['downloads'] += 1
+                stats['download_bytes'] += n_bytes
+                _span(stats, 'download_start', 'download_end', start, end)
+        for callback in list(self._callbacks):
+            try:
+                callback(request)
+            except Exception:
+                pass
+        return request
+
+    def snapshot(self):
+        """Returns the current totals, per host throughput and latency histograms as a dict."""
+        with self._lock:
+            hosts = {}
+            for host, stats in self.hosts.items():
+                wall_seconds = _seconds(stats['first_start'], stats['last_end'])
+                download_seconds = _seconds(stats['download_start'], stats['download_end'])
+                hosts[host] = dict(stats, wall_seconds=wall_seconds, download_seconds=download_seconds,
+                                   mb_per_second=_rate(stats['bytes'], wall_seconds),
+                                   download_mb_per_second=_rate(stats['download_bytes'], download_seconds))
+            return {'started': self.started, 'elapsed': time.time() - self.started,
+                    'requests': self.requests, 'errors': self.errors, 'retries': self.retries,
+                    'bytes': self.bytes, 'in_flight': self.in_flight, 'status': dict(self.status),
+                    'hosts': hosts, 'latency': self.latency.to_dict(), 'ttfb': self.ttfb.to_dict()}
+
+    def write(self, out_file):
+        """Writes the snapshot to a JSON file. Returns the file."""
+        out_dir = os.path.dirname(os.path.abspath(out_file))
+        if not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+        with open(out_file, 'w') as out_json:
+            json.dump(self.snapshot(), out_json, indent=2)
+        return out_file
+
+    def summary(self):
+        """Returns a readable summary of the downloads."""
+        s = self.snapshot()
+        lines = ['Download requests: %d (%d failed, %d retries), %.1f MB' %
+                 (s['requests'], s['errors'], s['retries'], s['bytes'] / MB)]
+        for name in ('latency', 'ttfb'):
+            h = s[name]
+            if h['count']:
+                lines.append('%-8s mean %.2fs, p50 <= %.2fs, p90 <= %.2fs, p99 <= %.2fs, max %.2fs' %
+                             (name, h['mean'], h['p50'], h['p90'], h['p99'], h['max']))
+        for host in sorted(s['hosts']):
+            h = s['hosts'][host]
+            lines.append('%-30s %5d requests, %3d failed, %10.1f MB, %s MB/s, %d downloads at %s MB/s' %
+                         (host, h['requests'], h['errors'], h['bytes'] / MB, _format_rate(h['mb_per_second']),
+                          h['downloads'], _format_rate(h['download_mb_per_second'])))
+        if s['status']:
+            lines.append('HTTP status: %s' % ', '.join('%s: %d' % (k, v) for k, v in sorted(s['status'].items())))
+        return '\n'.join(lines)
+
+
+# Download telemetry of this process
+_stats = DownloadStats()
+
+
+def current():
+    """Returns the download telemetry of this process."""
+    return _stats
+
+
+def reset():
+    """Starts new download telemetry for this process, keeping registered callbacks.
+    Returns it."""
+    global _stats
+    callbacks = _stats._callbacks
+    _stats = DownloadStats()
+    _stats._callbacks = callbacks
+    return _stats
@@ -0,0 +1,349 @@
+#-------------------------------------------------------------------------------
+# Name:         gap_fill.py
+#
+# Summary:      Vectorized gap filling routines for land surface temperature (LST) arrays.
+#               Temporal routines work on a 2D array with one row per grid cell (pixel) and
+#               one column per acquisition date. Spatial routines work on a 3D day x row x
+#               column cube of gridded LST values. Missing values are represented by NaN.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import numpy as np
+
+# MODIS LST fill value, and the nodata value assigned by gdalwarp in preprocess
+NODATA_VALUES = (0, -999)
+MISSING_VALUE = 0
+OUTSIDE_VALUE = -999
+
+# Number of pixel rows processed at a time, to bound peak memory use
+CHUNK_SIZE = 20000
+
+# Annual harmonic regression settings: number of harmonics, and period in days
+HARMONICS = 2
+PERIOD = 365.25
+
+# Gap filling methods, and longest gap (in days) filled linearly by the hybrid method
+FILL_METHODS = ('linear', 'harmonic', 'hybrid')
+MAX_LINEAR_GAP = 8
+
+# Number of days processed at a time by spatial gap filling, and minimum number of
+# valid neighbor cells required to fill a missing cell
+DAY_CHUNK_SIZE = 32
+MIN_NEIGHBORS = 3
+
+
+def to_nan(lst_array, nodata_values=NODATA_VALUES):
+    """Returns a float copy of an LST array with nodata values converted to NaN."""
+    out_array = np.array(lst_array, dtype=np.float64)
+    for nodata in nodata_values:
+        out_array[out_array == nodata] = np.nan
+    return out_array
+
+
+def neighbor_index(valid):
+    """Finds the previous and next valid column for every cell of a pixel x day mask.
+
+    The indexes are found by forward and backward propagation (running max/min)
+    of valid column indexes along each row. Cells without a previous valid value
+    are assigned -1, and cells without a next valid value are assigned the number
+    of columns.
+    """
+    n_days = valid.shape[1]
+    col_idx = np.arange(n_days)
+    prev_idx = np.where(valid, col_idx, -1)
+    np.maximum.accumulate(prev_idx, axis=1, out=prev_idx)
+    next_idx = np.where(valid, col_idx, n_days)[:, ::-1]
+    next_idx = np.minimum.accumulate(next_idx, axis=1)[:, ::-1]
+    return prev_idx, next_idx
+
+
+def fill_linear_chunk(lst_chunk, days):
+    """Linearly interpolates NaN values in a pixel x day array.
+
+    Leading and trailing gaps are filled with the nearest valid value in the row
+    (backward and forward fill). Rows without any valid values are left as NaN.
+    Returns the filled array and the length (in days) of the gap each filled
+    cell belonged to, which is infinite for leading and trailing gaps.
+    """
+    n_rows, n_days = lst_chunk.shape
+    valid = ~np.isnan(lst_chunk)
+    prev_idx, next_idx = neighbor_index(valid)
+    has_prev = prev_idx >= 0
+    has_next = next_idx < n_days
+    prev_idx = np.clip(prev_idx, 0, n_days - 1)
+    next_idx = np.clip(next_idx, 0, n_days - 1)
+
+    row_idx = np.arange(n_rows)[:, np.newaxis]
+    prev_val = lst_chunk[row_idx, prev_idx]
+    next_val = lst_chunk[row_idx, next_idx]
+    prev_day = days[prev_idx]
+    next_day = days[next_idx]
+
+    filled = lst_chunk.copy()
+    gap_len = np.zeros(lst_chunk.shape)
+
+    interior = ~valid & has_prev & has_next
+    span = (next_day - prev_day)[interior]
+    weight = (np.broadcast_to(days, lst_chunk.shape)[interior] - prev_day[interior]) / span
+    filled[interior] = prev_val[interior] + weight * (next_val[interior] - prev_val[interior])
+    gap_len[interior] = span
+
+    leading = ~has_prev & has_next
+    filled[leading] = next_val[leading]
+    trailing = has_prev & ~has_next
+    filled[trailing] = prev_val[trailing]
+    gap_len[leading | trailing] = np.inf
+    return filled, gap_len
+
+
+def fill_linear(lst_array, days=None, chunk_size=CHUNK_SIZE):
+    """Fills NaN values in a pixel x day LST array by linear interpolation along the day axis.
+
+    Parameters
+    ----------
+    lst_array: numpy.ndarray
+        2D array of LST values, one row per pixel and one column per date.
+    days: sequence
+        Day of year (or any increasing day count) for each column. Defaults to
+        evenly spaced columns.
+    chunk_size: int
+        Number of pixel rows processed at a time.
+
+    Returns
+    -------
+    A filled copy of `lst_array`.
+    """
+    lst_array = np.asarray(lst_array, dtype=np.float64)
+    if days is None:
+        days = np.arange(lst_array.shape[1], dtype=np.float64)
+    days = np.asarray(days, dtype=np.float64)
+    filled = np.empty_like(lst_array)
+    for start in range(0, lst_array.shape[0], chunk_size):
+        stop = start + chunk_size
+        filled[start:stop] = fill_linear_chunk(lst_array[start:stop], days)[0]
+    return filled
+
+
+def harmonic_design(days, n_harmonics=HARMONICS, period=PERIOD):
+    """Builds the day x coefficient design matrix of an annual harmonic regression
+    (intercept, then a cosine and sine term for each harmonic)."""
+    days = np.asarray(days, dtype=np.float64)
+    columns = [np.ones_like(days)]
+    for k in range(1, n_harmonics + 1):
+        angle = 2.0 * np.pi * k * days / period
+        columns.append(np.cos(angle))
+        columns.append(np.sin(angle))
+    return np.column_stack(columns)
+
+
+def fit_harmonic_chunk(lst_chunk, design, min_obs):
+    """Fits the harmonic regression to every row of a pixel x day array in one
+    batched least-squares solve, using only the valid (non-NaN) days of each row.
+
+    The masked normal equations of all rows are built with two matrix products,
+    then solved together. Rows with fewer than `min_obs` valid days get NaN
+    coefficients.
+    """
+    n_coef = design.shape[1]
+    valid = ~np.isnan(lst_chunk)
+    weight = valid.astype(np.float64)
+    y = np.where(valid, lst_chunk, 0.0)
+
+    # per-row X'WX, flattened to n_coef * n_coef columns, and X'Wy
+    outer = (design[:, :, np.newaxis] * design[:, np.newaxis, :]).reshape(len(design), -1)
+    xtx = weight.dot(outer).reshape(-1, n_coef, n_coef)
+    xty = y.dot(design)
+
+    coef = np.full((lst_chunk.shape[0], n_coef), np.nan)
+    fit_rows = weight.sum(axis=1) >= min_obs
+    if fit_rows.any():
+        xtx = xtx[fit_rows]
+        # small ridge term keeps nearly singular systems (clustered valid days) solvable
+        ridge = 1e-9 * np.trace(xtx, axis1=1, axis2=2)[:, np.newaxis, np.newaxis]
+        xtx = xtx + ridge * np.eye(n_coef)
+        coef[fit_rows] = np.linalg.solve(xtx, xty[fit_rows][:, :, np.newaxis])[:, :, 0]
+    return coef
+
+
+def fit_harmonic(lst_array, days, n_harmonics=HARMONICS, period=PERIOD,
+                 chunk_size=CHUNK_SIZE, min_obs=None):
+    """Fits an annual harmonic regression to the LST series of every pixel.
+
+    Parameters
+    ----------
+    lst_array: numpy.ndarray
+        2D array of LST values, one row per pixel and one column per date.
+    days: sequence
+        Day of year for each column.
+    n_harmonics: int
+        Number of annual harmonics in the regression.
+    period: float
+        Length of the annual cycle, in days.
+    chunk_size: int
+        Number of pixel rows fitted at a time.
+    min_obs: int
+        Minimum number of valid days required to fit a pixel. Defaults to twice
+        the number of coefficients.
+
+    Returns
+    -------
+    A pixel x coefficient array, with NaN rows for pixels that could not be fitted.
+    """
+    lst_array = np.asarray(lst_array, dtype=np.float64)
+    design = harmonic_design(days, n_harmonics, period)
+    if min_obs is None:
+        min_obs = 2 * design.shape[1]
+    coef = np.empty((lst_array.shape[0], design.shape[1]))
+    for start in range(0, lst_array.shape[0], chunk_size):
+        stop = start + chunk_size
+        coef[start:stop] = fit_harmonic_chunk(lst_array[start:stop], design, min_obs)
+    return coef
+
+
+def fill_gaps(lst_array, days=None, method='linear', max_gap=MAX_LINEAR_GAP,
+              n_harmonics=HARMONICS, period=PERIOD, chunk_size=CHUNK_SIZE):
+    """Fills NaN values in a pixel x day LST array.
+
+    Parameters
+    ----------
+    lst_array: numpy.ndarray
+        2D array of LST values, one row per pixel and one column per date.
+    days: sequence
+        Day of year for each column. Defaults to evenly spaced columns.
+    method: str
+        'linear' interpolates between the nearest valid days, 'harmonic' fills
+        gaps from an annual harmonic regression fitted to each pixel, and
+        'hybrid' interpolates gaps of up to `max_gap` days linearly and fills
+        longer (and leading or trailing) gaps from the harmonic regression.
+        Pixels that are too sparse for the harmonic regression fall back to
+        linear interpolation.
+    max_gap: float
+        Longest gap, in days, filled linearly by the 'hybrid' method.
+    n_harmonics: int
+        Number of annual harmonics in the regression.
+    period: float
+        Length of the annual cycle, in days.
+    chunk_size: int
+        Number of pixel rows processed at a time.
+
+    Returns
+    -------
+    A filled copy of `lst_array`.
+    """
+    if method not in FILL_METHODS:
+        raise ValueError("Unknown gap filling method: %s" % method)
+    lst_array = np.asarray(lst_array, dtype=np.float64)
+    if days is None:
+        days = np.arange(lst_array.shape[1], dtype=np.float64)
+    days = np.asarray(days, dtype=np.float64)
+    design = harmonic_design(days, n_harmonics, period)
+    min_obs = 2 * design.shape[1]
+
+    filled = np.empty_like(lst_array)
+    for start in range(0, lst_array.shape[0], chunk_size):
+        stop = start + chunk_size
+        lst_chunk = lst_array[start:stop]
+        linear, gap_len = fill_linear_chunk(lst_chunk, days)
+        if method == 'linear':
+            filled[start:stop] = linear
+            continue
+        fitted = fit_harmonic_chunk(lst_chunk, design, min_obs).dot(design.T)
+        use_fit = np.isnan(lst_chunk) & ~np.isnan(fitted)
+        if method == 'hybrid':
+            use_fit &= gap_len > max_gap
+        filled[start:stop] = np.where(use_fit, fitted, linear)
+    return filled
+
+
+def masked_convolve(lst_cube, kernel):
+    """Convolves every day of a day x row x column cube with a 2D kernel, skipping NaN cells.
+
+    Returns the weighted sum of valid neighbor values and the sum of the weights
+    of valid neighbors for every cell. Each kernel element is applied to all days
+    at once as a shifted slice of the zero padded cube.
+    """
+    kernel = np.asarray(kernel, dtype=np.float64)
+    k_rows, k_cols = kernel.shape
+    n_days, n_rows, n_cols = lst_cube.shape
+    valid = ~np.isnan(lst_cube)
+    pad = ((0, 0), (k_rows // 2, k_rows // 2), (k_cols // 2, k_cols // 2))
+    pad_val = np.pad(np.where(valid, lst_cube, 0.0), pad, 'constant')
+    pad_wgt = np.pad(valid.astype(np.float64), pad, 'constant')
+
+    val_sum = np.zeros(lst_cube.shape)
+    wgt_sum = np.zeros(lst_cube.shape)
+    # correlation with the flipped kernel is convolution with the kernel
+    flipped = kernel[::-1, ::-1]
+    for i, j in zip(*np.nonzero(flipped)):
+        k = flipped[i, j]
+        val_sum += k * pad_val[:, i:i + n_rows, j:j + n_cols]
+        wgt_sum += k * pad_wgt[:, i:i + n_rows, j:j + n_cols]
+    return val_sum, wgt_sum
+
+
+def fill_spatial(lst_cube, size=3, kernel=None, min_neighbors=MIN_NEIGHBORS,
+                 day_chunk_size=DAY_CHUNK_SIZE):
+    """Fills NaN cells of a day x row x column LST cube from valid neighbor cells on the same day.
+
+    Parameters
+    ----------
+    lst_cube: numpy.ndarray
+        3D array of gridded LST values, one grid per date.
+    size: int
+        Width of the square neighborhood, in cells. Ignored if `kernel` is given.
+    kernel: numpy.ndarray
+        Optional 2D array of neighbor weights.
+    min_neighbors: int
+        Minimum number of valid neighbor cells needed to fill a missing cell.
+    day_chunk_size: int
+        Number of days processed at a time.
+
+    Returns
+    -------
+    A filled copy of `lst_cube`. Missing cells with too few valid neighbors remain NaN.
+    """
+    if kernel is None:
+        kernel = np.ones((size, size))
+    kernel = np.asarray(kernel, dtype=np.float64)
+    unit_kernel = np.all((kernel == 0) | (kernel == 1))
+    lst_cube = np.asarray(lst_cube, dtype=np.float64)
+    filled = lst_cube.copy()
+    for start in range(0, lst_cube.shape[0], day_chunk_size):
+        stop = start + day_chunk_size
+        lst_chunk = lst_cube[start:stop]
+        val_sum, wgt_sum = masked_convolve(lst_chunk, kernel)
+        if unit_kernel:
+            n_neighbors = wgt_sum
+        else:
+            n_neighbors = masked_convolve(lst_chunk, kernel != 0)[1]
+        fill_cells = np.isnan(lst_chunk) & (n_neighbors >= min_neighbors) & (wgt_sum > 0)
+        filled[start:stop][fill_cells] = val_sum[fill_cells] / wgt_sum[fill_cells]
+    return filled
+
+
+def fill_missing_cells(grid_cube, size=3, min_neighbors=MIN_NEIGHBORS, day_chunk_size=DAY_CHUNK_SIZE,
+                       missing=MISSING_VALUE, outside=OUTSIDE_VALUE):
+    """Fills the missing (i.e. cloudy) cells of a day x row x column cube of LST grids as
+    read from geotiffs, keeping the nodata values of the grids.
+
+    Only cells holding the `missing` value are filled, from valid neighbor cells on the same
+    day. Cells outside the grid's cutline (`outside`) are neither used as neighbors nor
+    filled, and cells that cannot be filled keep the `missing` value, so every date's grid
+    has the same set of cells outside the cutline.
+    """
+    grid_cube = np.asarray(grid_cube, dtype=np.float64)
+    filled = fill_spatial(to_nan(grid_cube, (missing, outside)), size,
+                          min_neighbors=min_neighbors, day_chunk_size=day_chunk_size)
+    out_cube = grid_cube.copy()
+    fill_cells = (grid_cube == missing) & ~np.isnan(filled)
+    out_cube[fill_cells] = filled[fill_cells]
+    return out_cube
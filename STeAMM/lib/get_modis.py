@@ -45,13 +45,24 @@ AUTHOR
 import optparse
 import os
 import urllib2
+import httplib
 from cookielib import CookieJar
 import time
 import calendar
-import shutil
 import logging
 import sys
 import fnmatch
+import threading
+import Queue
+try:
+    from . import run_report
+    from . import download_stats
+    from . import retry_policy
+except (ValueError, ImportError):
+    # run as a script
+    import run_report
+    import download_stats
+    import retry_policy
 
 LOG = logging.getLogger( __name__ )
 OUT_HDLR = logging.StreamHandler( sys.stdout )
@@ -62,7 +73,160 @@ LOG.setLevel( logging.INFO )
 
 HEADERS = { 'User-Agent' : 'get_modis Python 1.3.0' }
 
-def parse_modis_dates ( url, dates, product, out_dir, ruff=False ):
+# Bytes read from a response at a time
+BLOCK_SIZE = 64 * 1024
+
+def fetch_url ( req, stats, out_fp=None, retries=0 ):
+    """Request a URL, recording its telemetry.
+
+    The latency, time to first byte, bytes received and HTTP status of the
+    request are recorded in `stats`, whether it succeeds or not. Errors are
+    re-raised.
+
+    Parameters
+    ----------
+    req: urllib2.Request
+        The request
+    stats: download_stats.DownloadStats
+        The download telemetry to record the request in
+    out_fp: file
+        A file to write the response to. If None, the response is returned.
+    retries: int
+        The number of times the request was tried before.
+    Returns
+    -------
+    The lines of the response, or None if it was written to `out_fp`.
+    """
+    url = req.get_full_url()
+    start = stats.start()
+    status, ttfb, n_bytes, error = None, None, 0, None
+    try:
+        response = urllib2.urlopen( req )
+        status = response.getcode()
+        url = response.geturl()
+        chunks = []
+        while True:
+            chunk = response.read( BLOCK_SIZE )
+            if ttfb is None:
+                ttfb = time.time() - start
+            if not chunk:
+                break
+            n_bytes += len( chunk )
+            if out_fp is None:
+                chunks.append( chunk )
+            else:
+                out_fp.write( chunk )
+        response.close()
+        if out_fp is None:
+            return "".join( chunks ).splitlines( True )
+    except ( IOError, httplib.HTTPException ), e:
+        # HTTPError, URLError, socket errors, and responses cut short
+        status = getattr( e, 'code', status )
+        error = str( e )
+        raise
+    finally:
+        stats.record( url, start, ttfb, n_bytes, status, retries, error,
+                      download=out_fp is not None )
+
+def url_size ( req, stats, retries=0 ):
+    """Return the size of a remote file from the headers of its response,
+    recording the request in `stats`."""
+    url = req.get_full_url()
+    start = stats.start()
+    status, ttfb, error = None, None, None
+    try:
+        response = urllib2.urlopen( req )
+        ttfb = time.time() - start
+        status = response.getcode()
+        url = response.geturl()
+        size = int( response.headers.dict['content-length'] )
+        response.close()
+        return size
+    except ( IOError, httplib.HTTPException ), e:
+        status = getattr( e, 'code', status )
+        error = str( e )
+        raise
+    finally:
+        stats.record( url, start, ttfb, 0, status, retries, error )
+
+def log_retry ( req ):
+    """Return a callback logging the retries of a request."""
+    def on_retry ( attempt, error, delay ):
+        LOG.info ( "Retrying %s in %.1f s (%d): %s" % ( req.get_full_url(), \
+            delay, attempt + 1, error ) )
+    return on_retry
+
+def fetch_with_retry ( req, stats, policy=None, limiter=None, out_file=None ):
+    """Request a URL with `fetch_url`, retrying transient failures.
+
+    Parameters
+    ----------
+    req: urllib2.Request
+        The request
+    stats: download_stats.DownloadStats
+        The download telemetry to record each try in
+    policy: retry_policy.RetryPolicy
+        When and how long to wait before retrying. Defaults to
+        `retry_policy.RetryPolicy()`.
+    limiter: retry_policy.AdaptiveLimiter
+        Bounds the number of requests in flight, if given.
+    out_file: str
+        A file to download the response to. The response is written to
+        `out_file`.part, which replaces `out_file` once complete, so a failed
+        download never leaves a partial granule behind.
+    Returns
+    -------
+    The lines of the response, or None if it was downloaded to `out_file`.
+    """
+    if policy is None:
+        policy = retry_policy.RetryPolicy()
+
+    def fetch ( attempt ):
+        if out_file is None:
+            return fetch_url ( req, stats, retries=attempt )
+        part_file = out_file + ".part"
+        try:
+            with open ( part_file, 'wb' ) as out_fp:
+                fetch_url ( req, stats, out_fp=out_fp, retries=attempt )
+            if os.path.exists ( out_file ):
+                os.remove ( out_file )
+            os.rename ( part_file, out_file )
+        finally:
+            if os.path.exists ( part_file ):
+                os.remove ( part_file )
+
+    return policy.call ( fetch, limiter, on_retry=log_retry ( req ) )
+
+def list_modis_dates ( url, stats=None, policy=None ):
+    """List the dates with data in a MODIS product directory.
+
+    Parameters
+    ----------
+    url: str
+        A URL such as "http://e4ftl01.cr.usgs.gov/MOTA/MCD45A1.005/"
+    stats: download_stats.DownloadStats
+        The download telemetry to record requests in. Defaults to the
+        telemetry of the process.
+    policy: retry_policy.RetryPolicy
+        When and how long to wait before retrying the request.
+    Returns
+    -------
+    A list of the dates of the directory, in the format "YYYY.MM.DD".
+    """
+    if stats is None:
+        stats = download_stats.current()
+    req = urllib2.Request ( "%s" % ( url ), None, HEADERS)
+    html = fetch_with_retry ( req, stats, policy )
+
+    listed_dates = []
+    for line in html:
+        if line.find ( "href" ) >= 0 and line.find ( "[DIR]" ) >= 0:
+            # Points to a directory
+            listed_dates.append ( line.split('href="')[1].split('"')[0].strip("/") )
+    return listed_dates
+
+def parse_modis_dates ( url, dates, product, out_dir, ruff=False, stats=None,
+                        policy=None, listed_dates=None ):
     """Parse returned MODIS dates.
     
     This function gets the dates listing for a given MODIS products, and 
@@ -85,6 +249,14 @@ def parse_modis_dates ( url, dates, product, out_dir, ruff=False ):
         The output dir
     ruff: bool
         Whether to check for present files
+    stats: download_stats.DownloadStats
+        The download telemetry to record requests in. Defaults to the
+        telemetry of the process.
+    policy: retry_policy.RetryPolicy
+        When and how long to wait before retrying the request.
+    listed_dates: list
+        The dates of the product directory, from `list_modis_dates`. The
+        directory is listed if not given.
     Returns
     -------
     A (sorted) list with the dates that will be downloaded.
@@ -95,30 +267,23 @@ def parse_modis_dates ( url, dates, product, out_dir, ruff=False ):
         already_here_dates = [ x.split(".")[-5][1:] \
             for x in already_here ]
                                       
-    req = urllib2.Request ( "%s" % ( url ), None, HEADERS)
-    html = urllib2.urlopen(req).readlines()
+    if listed_dates is None:
+        listed_dates = list_modis_dates ( url, stats, policy )
             
     available_dates = []
-    for line in html:
-        
-        if line.find ( "href" ) >= 0 and line.find ( "[DIR]" ) >= 0:
-            # Points to a directory
-            the_date = line.split('href="')[1].split('"')[0].strip("/")
-            
-            if ruff:
-                try:
-                    modis_date = time.strftime( "%Y%j", time.strptime( \
-                        the_date, "%Y.%m.%d") )
-                except ValueError:
-                    continue
-                if modis_date in already_here_dates:
-                    continue
-                else:
-                    available_dates.append ( the_date )    
+    for the_date in listed_dates:
+        if ruff:
+            try:
+                modis_date = time.strftime( "%Y%j", time.strptime( \
+                    the_date, "%Y.%m.%d") )
+            except ValueError:
+                continue
+            if modis_date in already_here_dates:
+                continue
             else:
                 available_dates.append ( the_date )    
-                
-            
+        else:
+            available_dates.append ( the_date )    
     
     dates = set ( dates )
     available_dates = set ( available_dates )
@@ -130,7 +295,8 @@ def parse_modis_dates ( url, dates, product, out_dir, ruff=False ):
 def get_modisfiles ( platform, product, year, tile, proxy,
                      username, password, doy_start=1, doy_end = -1,
                      out_dir=".", base_url="http://e4ftl01.cr.usgs.gov",
-                     ruff=False, verbose=True ):
+                     ruff=False, verbose=True, stats=None, policy=None,
+                     max_connections=retry_policy.MAX_CONNECTIONS, listings=None ):
 
     """Download MODIS products for a given tile, year & period of interest
 
@@ -145,6 +311,12 @@ def get_modisfiles ( platform, product, year, tile, proxy,
     If they are, file isn't downloaded, but if they are different, the remote 
     file is downloaded. 
 
+    Dates are fetched concurrently. Requests failing with a network error or a
+    transient HTTP status are retried with backoff, and the number of requests
+    in flight backs off when the server throttles them (see
+    `retry_policy`). Granules that still fail are logged and returned, rather
+    than skipped.
+
     Parameters
     ----------
     platform: str
@@ -172,12 +344,27 @@ def get_modisfiles ( platform, product, year, tile, proxy,
         testing for file size etc.
     verbose: Boolean
         Whether to sprout lots of text out or not.
+    stats: download_stats.DownloadStats
+        The download telemetry to record requests in. Defaults to the
+        telemetry of the process, which a progress display can poll with
+        `snapshot()` or follow with `add_callback()`.
+    policy: retry_policy.RetryPolicy
+        When and how long to wait before retrying failed requests. Defaults
+        to `retry_policy.RetryPolicy()`.
+    max_connections: int
+        The maximum number of requests in flight.
+    listings: dict
+        The dates of product directories already listed, by URL. The product
+        directory is listed, and added, if it is not in `listings`, so calls
+        sharing `listings` list each product directory once.
 
     example: MOD11A2.A2014041.h09v04.005.2014058141909.hdf
 
     Returns
     -------
-    Nothing
+    A list of the granules (or date listings) that could not be downloaded,
+    as dicts with their `url`, `file` (None for a date listing), HTTP
+    `status` and `error`.
     """
     
     # if proxy is not None:
@@ -185,6 +372,10 @@ def get_modisfiles ( platform, product, year, tile, proxy,
     #     opener = urllib2.build_opener( proxy )
     #     urllib2.install_opener( opener )
     
+    if stats is None:
+        stats = download_stats.current()
+    if policy is None:
+        policy = retry_policy.RetryPolicy()
     if not os.path.exists ( out_dir ):
         if verbose:
             LOG.info("Creating outupt dir %s" % out_dir )
@@ -213,50 +404,107 @@ def get_modisfiles ( platform, product, year, tile, proxy,
         urllib2.HTTPCookieProcessor(cookie_jar))
     urllib2.install_opener(opener)
 
-    dates = parse_modis_dates ( url, dates, product, out_dir, ruff=ruff )
-    for date in dates:
-        the_day_today = time.asctime().split()[0]
-        the_hour_now = int( time.asctime().split()[3].split(":")[0] )
-        """if the_day_today == "Wed" and 14 <= the_hour_now <= 17:
-            time.sleep ( 60*60*( 18-the_hour_now) )
-            LOG.info ( "Sleeping for %d hours... Yawn!" % ( 18 - the_hour_now) )"""
+    with run_report.timed('get_modis.list_dates') as stage:
+        if listings is None:
+            listings = {}
+        if url not in listings:
+            listings[url] = list_modis_dates ( url, stats, policy )
+        dates = parse_modis_dates ( url, dates, product, out_dir, ruff=ruff,
+                                    stats=stats, policy=policy,
+                                    listed_dates=listings[url] )
+        stage.add(len(dates))
+
+    # Dates are fetched by up to max_connections threads, while the limiter
+    # adapts the number of requests in flight to what the server sustains
+    limiter = retry_policy.AdaptiveLimiter ( maximum=max_connections )
+    failed = []
+    errors = []
+    lock = threading.Lock()
+
+    def fail ( the_url, fname, e ):
+        LOG.warning ( "Failed to get %s: %s" % ( the_url, e ) )
+        run_report.add('get_modis.failed', 1)
+        with lock:
+            failed.append ( { 'url': the_url, 'file': fname,
+                              'status': retry_policy.status_of( e ),
+                              'error': str( e ) } )
+
+    def get_date ( date ):
         req = urllib2.Request ( "%s/%s" % ( url, date), None, HEADERS )
         try:
-            html = urllib2.urlopen(req).readlines()
-            for line in html:
-                if line.find(tile) >=0  and line.find(".hdf") >= 0 and line.find(".hdf.xml") < 0:
-                    fname = line.split("href=")[1].split(">")[0].strip('"')
-                    req = urllib2.Request ( "%s/%s/%s" % ( url, date, fname), None, HEADERS )
+            with run_report.timed('get_modis.list_granules') as stage:
+                html = fetch_with_retry ( req, stats, policy, limiter )
+                stage.add(1, bytes_read=sum(len(line) for line in html))
+        except ( IOError, httplib.HTTPException ), e:
+            fail ( req.get_full_url(), None, e )
+            return
+        for line in html:
+            if line.find(tile) >=0  and line.find(".hdf") >= 0 and line.find(".hdf.xml") < 0:
+                fname = line.split("href=")[1].split(">")[0].strip('"')
+                req = urllib2.Request ( "%s/%s/%s" % ( url, date, fname), None, HEADERS )
+                out_file = os.path.join( out_dir, fname )
+                try:
                     download = False
-                    if not os.path.exists ( os.path.join( out_dir, fname ) ):
+                    if not os.path.exists ( out_file ):
                         # File not present, download
                         download = True
                     else:
-                        the_remote_file = urllib2.urlopen(req)
-                        remote_file_size = int (the_remote_file.headers.dict['content-length'] )
-                        local_file_size = os.path.getsize(os.path.join(out_dir, fname ) )
+                        remote_file_size = policy.call ( lambda attempt: \
+                            url_size ( req, stats, retries=attempt ), limiter,
+                            on_retry=log_retry ( req ) )
+                        local_file_size = os.path.getsize( out_file )
                         if remote_file_size != local_file_size:
                             download = True
-                        
+
                     if download:
                         if verbose:
                             LOG.info ( "Getting %s..... " % fname )
-                        with open ( os.path.join( out_dir, fname ), 'wb' ) \
-                                as local_file_fp:
-                            shutil.copyfileobj(urllib2.urlopen(req), \
-                                local_file_fp)
-                            if verbose:
-                                LOG.info("Done!")
+                        with run_report.timed('get_modis.download') as stage:
+                            fetch_with_retry ( req, stats, policy, limiter,
+                                               out_file=out_file )
+                            n_bytes = os.path.getsize( out_file )
+                            stage.add(1, bytes_read=n_bytes, bytes_written=n_bytes)
+                        if verbose:
+                            LOG.info("Done!")
                     else:
+                        run_report.add('get_modis.already_present', 1)
                         if verbose:
                             LOG.info ("File %s already present. Skipping" % \
                                 fname )
+                except ( IOError, httplib.HTTPException ), e:
+                    fail ( req.get_full_url(), fname, e )
+
+    def work ( queue ):
+        while True:
+            try:
+                date = queue.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                get_date ( date )
+            except Exception, e:
+                errors.append ( sys.exc_info() )
+                return
+
+    queue = Queue.Queue()
+    for date in dates:
+        queue.put ( date )
+    threads = [ threading.Thread( target=work, args=( queue, ) ) \
+        for i in xrange( min( max_connections, len( dates ) ) ) ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
 
-        except urllib2.HTTPError, e:
-            print('HTTPError = ' + str(e.code))
-            print('URLError = ' + str(e.reason))
+    for failure in failed:
+        LOG.warning ( "Not downloaded: %s (%s)" % ( failure['url'],
+                                                    failure['error'] ) )
     if verbose:
         LOG.info("Completely finished downloading all available files.")
+    return failed
         
 
 if __name__ == "__main__":
@@ -299,3 +547,4 @@ if __name__ == "__main__":
             doy_start=options.doy_start, doy_end=options.doy_end, \
             out_dir=options.dir_out, \
             verbose=options.verbose, ruff=options.quick )
+    LOG.info ( "\n" + download_stats.current().summary() )
@@ -0,0 +1,133 @@
+#-------------------------------------------------------------------------------
+# Name:         gpkg_writer.py
+#
+# Summary:      Bulk writer for predicted stream reach temperatures. Reach x date predictions
+#               are written to a GeoPackage (SQLite) attribute table in long format, with one
+#               row per reach and date, using batched transactions and a unique index on
+#               (reach_id, date).
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import sqlite3
+import datetime
+import numpy as np
+
+# Default name of the predictions table
+TABLE_NAME = 'reach_temp'
+
+# Number of rows inserted per transaction
+BATCH_SIZE = 100000
+
+# GeoPackage application ID ('GPKG') and version (1.2)
+GPKG_APPLICATION_ID = 1196444487
+GPKG_USER_VERSION = 10200
+
+
+def iso_dates(dates):
+    """Converts YYYYDDD integer dates into ISO 8601 (YYYY-MM-DD) date strings."""
+    return [(datetime.date(d // 1000, 1, 1) + datetime.timedelta(days=d % 1000 - 1)).isoformat()
+            for d in np.asarray(dates).tolist()]
+
+
+def init_geopackage(conn):
+    """Creates the required GeoPackage metadata tables in a new or existing SQLite
+    database. Existing GeoPackages (i.e. created by OGR) are left unchanged."""
+    conn.execute("PRAGMA application_id = %d" % GPKG_APPLICATION_ID)
+    if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+        conn.execute("PRAGMA user_version = %d" % GPKG_USER_VERSION)
+    conn.execute("""CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (
+                    srs_name TEXT NOT NULL, srs_id INTEGER NOT NULL PRIMARY KEY,
+                    organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL,
+                    definition TEXT NOT NULL, description TEXT)""")
+    conn.executemany("INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)", [
+        ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', None),
+        ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', None),
+        ('WGS 84 geodetic', 4326, 'EPSG', 4326,
+         'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'
+         'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'
+         'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],'
+         'AUTHORITY["EPSG","4326"]]', None)])
+    conn.execute("""CREATE TABLE IF NOT EXISTS gpkg_contents (
+                    table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL,
+                    identifier TEXT UNIQUE, description TEXT DEFAULT '',
+                    last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                    min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE,
+                    srs_id INTEGER REFERENCES gpkg_spatial_ref_sys(srs_id))""")
+
+
+def iter_rows(reach_ids, dates, values, chunk_size=BATCH_SIZE):
+    """Yields (reach_id, date, temperature) rows of the non-NaN values of a reach x date
+    array, reading one chunk of reaches at a time."""
+    reach_ids = np.asarray(reach_ids).tolist()
+    date_strings = iso_dates(dates)
+    reach_chunk = max(1, chunk_size // max(len(date_strings), 1))
+    for start in range(0, len(reach_ids), reach_chunk):
+        block = np.asarray(values[start:start + reach_chunk], dtype=np.float64)
+        rows, cols = np.nonzero(~np.isnan(block))
+        for r, c, v in zip((rows + start).tolist(), cols.tolist(), block[rows, cols].tolist()):
+            yield reach_ids[r], date_strings[c], v
+
+
+def write_predictions(gpkg_file, reach_ids, dates, values, table=TABLE_NAME, batch_size=BATCH_SIZE):
+    """Writes reach x date temperature predictions to a long-format GeoPackage attribute table.
+
+    Parameters
+    ----------
+    gpkg_file: str
+        GeoPackage file path. Created if it does not exist; an existing table with
+        the same name is replaced.
+    reach_ids: numpy.ndarray
+        Reach ID of each row of `values`.
+    dates: numpy.ndarray
+        YYYYDDD date of each column of `values`.
+    values: numpy.ndarray
+        Reach x date array of predicted temperatures, with NaN for missing values.
+    table: str
+        Name of the predictions table.
+    batch_size: int
+        Number of rows inserted per transaction.
+
+    Returns
+    -------
+    The number of rows written.
+    """
+    conn = sqlite3.connect(gpkg_file)
+    try:
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        with conn:
+            init_geopackage(conn)
+            conn.execute('DROP TABLE IF EXISTS "%s"' % table)
+            conn.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (table,))
+            conn.execute('CREATE TABLE "%s" (fid INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'reach_id INTEGER NOT NULL, date DATE NOT NULL, temp REAL)' % table)
+            conn.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier) "
+                         "VALUES (?, 'attributes', ?)", (table, table))
+
+        insert = 'INSERT INTO "%s" (reach_id, date, temp) VALUES (?, ?, ?)' % table
+        n_rows = 0
+        batch = []
+        for row in iter_rows(reach_ids, dates, values, batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with conn:
+                    conn.executemany(insert, batch)
+                n_rows += len(batch)
+                batch = []
+        with conn:
+            conn.executemany(insert, batch)
+            n_rows += len(batch)
+            # building the index once after loading is faster than maintaining it per insert
+            conn.execute('CREATE UNIQUE INDEX "%s_reach_date" ON "%s" (reach_id, date)' % (table, table))
+    finally:
+        conn.close()
+    return n_rows
@@ -0,0 +1,389 @@
+#-------------------------------------------------------------------------------
+# Name:         job_queue.py
+#
+# Summary:      File-backed job queue for sharded runs over a shared filesystem. Each unit of
+#               work (i.e. one year, date and tile) is a JSON file in the queue directory.
+#               Workers, in separate processes or on separate hosts, claim a unit by creating
+#               its lease file atomically, renew the lease while they work, and record the
+#               unit's result when it is done. Leases of crashed workers expire, so their
+#               units are claimed again. Each lease holds an owner token, so a stalled worker
+#               whose lease was taken over neither renews nor releases the new owner's
+#               lease. Units can depend on other units (i.e. a merge unit
+#               on every unit of a year), and are only claimed once their dependencies are
+#               done.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import json
+import time
+import errno
+import uuid
+import socket
+import threading
+import traceback
+import multiprocessing
+
+# Subdirectories of a queue directory
+UNITS_DIR = 'units'
+LEASES_DIR = 'leases'
+DONE_DIR = 'done'
+FAILED_DIR = 'failed'
+
+# Seconds after the last renewal before a lease expires, and can be claimed by another worker
+LEASE_SECONDS = 600
+
+# Seconds a worker waits before looking again for units that are leased or waiting on others
+POLL_SECONDS = 5
+
+
+def _rename_over(src, dst):
+    """Renames src to dst, replacing dst. os.rename does not replace an existing file on
+    Windows, so dst is then removed first."""
+    try:
+        os.rename(src, dst)
+    except OSError:
+        if not os.path.exists(dst):
+            raise
+        os.remove(dst)
+        os.rename(src, dst)
+
+# os.replace overwrites the target on all platforms, but is not available in Python 2
+_replace = getattr(os, 'replace', _rename_over)
+
+
+def worker_name():
+    """Returns a name for the current worker process, unique across hosts."""
+    return '%s-%d' % (socket.gethostname(), os.getpid())
+
+
+def write_json(json_file, data):
+    """Writes data to a JSON file atomically, so readers never see a partial file."""
+    tmp_file = '%s.%s.tmp' % (json_file, worker_name())
+    with open(tmp_file, 'w') as out_file:
+        json.dump(data, out_file)
+    _replace(tmp_file, json_file)
+    return json_file
+
+
+def read_json(json_file):
+    """Reads a JSON file."""
+    with open(json_file, 'r') as in_file:
+        return json.load(in_file)
+
+
+class JobQueue(object):
+    """A queue of units of work in a directory on a (shared) filesystem.
+
+    Units must be idempotent: a unit whose worker stalls for longer than the lease time
+    may be run again by another worker. Lease expiry compares file modification times to
+    the local clock, so hosts sharing a queue should have synchronized clocks.
+
+    :param queue_dir: Queue directory, created if it does not exist.
+    :type queue_dir: str
+
+    :param lease_seconds: Seconds after the last renewal before a lease expires.
+    :type lease_seconds: float
+    """
+
+    def __init__(self, queue_dir, lease_seconds=LEASE_SECONDS):
+        self.queue_dir = queue_dir
+        self.lease_seconds = lease_seconds
+        # units and done units never change, so they are only read from disk once
+        self._units = {}
+        self._done = set()
+        for sub_dir in (UNITS_DIR, LEASES_DIR, DONE_DIR, FAILED_DIR):
+            try:
+                os.makedirs(os.path.join(queue_dir, sub_dir))
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def _path(self, sub_dir, unit_id):
+        return os.path.join(self.queue_dir, sub_dir, '%s.json' % unit_id)
+
+    def add(self, unit_id, spec, after=()):
+        """Adds a unit of work, unless a unit with the same ID was already added, so a
+        queue can be initialized again without losing progress.
+
+        :param unit_id: Unit ID, used as a file name (i.e. '2015_001_h09v04').
+        :type unit_id: str
+
+        :param spec: JSON serializable description of the work, passed to the worker function.
+        :type spec: dict
+
+        :param after: IDs of the units that must be done before this unit is claimed.
+        :type after: list
+        """
+        unit_file = self._path(UNITS_DIR, unit_id)
+        if not os.path.exists(unit_file):
+            write_json(unit_file, {'id': unit_id, 'spec': spec, 'after': list(after)})
+        return unit_id
+
+    def unit_ids(self):
+        """Returns the IDs of all units, sorted."""
+        return sorted(os.path.splitext(f)[0] for f in os.listdir(os.path.join(self.queue_dir, UNITS_DIR))
+                      if f.endswith('.json'))
+
+    def unit(self, unit_id):
+        """Returns a unit, as a dict with 'id', 'spec' and 'after' keys."""
+        if unit_id not in self._units:
+            self._units[unit_id] = read_json(self._path(UNITS_DIR, unit_id))
+        return self._units[unit_id]
+
+    def status(self, unit_id):
+        """Returns the status of a unit: 'done', 'failed', 'leased' or 'pending'."""
+        if unit_id in self._done:
+            return 'done'
+        if os.path.exists(self._path(DONE_DIR, unit_id)):
+            self._done.add(unit_id)
+            return 'done'
+        if os.path.exists(self._path(FAILED_DIR, unit_id)):
+            return 'failed'
+        if os.path.exists(self._path(LEASES_DIR, unit_id)):
+            return 'leased'
+        return 'pending'
+
+    def counts(self):
+        """Returns the number of units with each status."""
+        counts = {'done': 0, 'failed': 0, 'leased': 0, 'pending': 0}
+        for unit_id in self.unit_ids():
+            counts[self.status(unit_id)] += 1
+        return counts
+
+    def finished(self):
+        """Whether every unit is done or failed."""
+        return all(self.status(u) in ('done', 'failed') for u in self.unit_ids())
+
+    def _create_lease(self, lease_file, worker):
+        """Creates a lease file, unless it exists. Returns the owner token of the new lease,
+        or None if it exists."""
+        try:
+            fd = os.open(lease_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            return None
+        token = uuid.uuid4().hex
+        os.write(fd, json.dumps({'worker': worker, 'token': token, 'claimed': time.time()}).encode('utf-8'))
+        os.close(fd)
+        return token
+
+    def _lock_lease(self, lease_file, owner):
+        """Creates the takeover lock of a lease, held while a worker replaces, renews or
+        removes the lease. Returns the lock file, or None if another worker holds it."""
+        takeover_file = '%s.takeover' % lease_file
+        try:
+            fd = os.open(takeover_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            if self._expired(takeover_file):
+                # left behind by a worker that stopped while holding it; try again later
+                try:
+                    os.remove(takeover_file)
+                except OSError:
+                    pass
+            return None
+        os.write(fd, owner.encode('utf-8'))
+        os.close(fd)
+        return takeover_file
+
+    def _acquire(self, unit_id, worker):
+        """Creates the lease file of a unit, taking over an expired lease. Returns the owner
+        token of the lease, or None if it was not acquired."""
+        lease_file = self._path(LEASES_DIR, unit_id)
+        token = self._create_lease(lease_file, worker)
+        if token is not None or not self._expired(lease_file):
+            return token
+        # only the worker holding the takeover lock removes an expired lease, and only if it
+        # is still expired, so a lease just taken over by another worker is never removed
+        takeover_file = self._lock_lease(lease_file, worker)
+        if takeover_file is None:
+            return None
+        try:
+            if not self._expired(lease_file):
+                return None
+            try:
+                os.remove(lease_file)
+            except OSError:
+                pass
+            return self._create_lease(lease_file, worker)
+        finally:
+            os.remove(takeover_file)
+
+    def _change_lease(self, unit_id, token, change):
+        """Calls change with the lease file of a unit if the lease is held by token, holding
+        its takeover lock, or anyway if token is None. Returns True if change was called."""
+        lease_file = self._path(LEASES_DIR, unit_id)
+        if token is None:
+            change(lease_file)
+            return True
+        takeover_file = self._lock_lease(lease_file, token)
+        if takeover_file is None:
+            # the lease expired and is being taken over
+            return False
+        try:
+            try:
+                if read_json(lease_file).get('token') != token:
+                    return False
+            except (IOError, OSError, ValueError):
+                return False
+            change(lease_file)
+            return True
+        finally:
+            os.remove(takeover_file)
+
+    def _expired(self, lease_file):
+        try:
+            return time.time() - os.path.getmtime(lease_file) > self.lease_seconds
+        except OSError:
+            return False
+
+    def claim(self, worker=None):
+        """Claims the first pending unit whose dependencies are done, or whose lease has
+        expired. Units depending on a failed unit are marked failed. Returns the unit, with
+        the owner token of its lease as 'lease', or None if no unit can be claimed now."""
+        worker = worker or worker_name()
+        for unit_id in self.unit_ids():
+            if self.status(unit_id) in ('done', 'failed'):
+                continue
+            unit = self.unit(unit_id)
+            after = [self.status(u) for u in unit['after']]
+            if 'failed' in after:
+                self.fail(unit_id, 'A unit this unit depends on failed')
+                continue
+            if any(s != 'done' for s in after):
+                continue
+            token = self._acquire(unit_id, worker)
+            if token is not None:
+                if self.status(unit_id) == 'leased':
+                    return dict(unit, lease=token)
+                self.release(unit_id, token)  # completed by another worker since it was listed
+        return None
+
+    def renew(self, unit_id, token=None):
+        """Renews the lease of a claimed unit, if it is still held by the owner token of the
+        claim (the unit's 'lease'). Returns True if the lease was renewed."""
+        try:
+            return self._change_lease(unit_id, token, lambda lease_file: os.utime(lease_file, None))
+        except OSError:
+            return False
+
+    def release(self, unit_id, token=None):
+        """Removes the lease of a unit, so it can be claimed again, if it is still held by
+        the owner token of the claim. Returns True if the lease was removed."""
+        try:
+            return self._change_lease(unit_id, token, os.remove)
+        except OSError:
+            return False
+
+    def complete(self, unit_id, result=None, token=None):
+        """Records the JSON serializable result of a unit, and releases its lease if it is
+        still held by the owner token of the claim."""
+        write_json(self._path(DONE_DIR, unit_id), {'id': unit_id, 'result': result,
+                                                   'worker': worker_name(), 'time': time.time()})
+        self.release(unit_id, token)
+
+    def fail(self, unit_id, error, token=None):
+        """Records the error of a failed unit, and releases its lease if it is still held
+        by the owner token of the claim. Failed units are not claimed again until
+        `retry_failed` is called."""
+        write_json(self._path(FAILED_DIR, unit_id), {'id': unit_id, 'error': error,
+                                                     'worker': worker_name(), 'time': time.time()})
+        self.release(unit_id, token)
+
+    def retry_failed(self):
+        """Returns failed units to the queue. Returns the number of units."""
+        unit_ids = [u for u in self.unit_ids() if self.status(u) == 'failed']
+        for unit_id in unit_ids:
+            os.remove(self._path(FAILED_DIR, unit_id))
+        return len(unit_ids)
+
+    def result(self, unit_id):
+        """Returns the result of a done unit."""
+        return read_json(self._path(DONE_DIR, unit_id))['result']
+
+    def errors(self):
+        """Returns the error of each failed unit, by unit ID."""
+        return dict((u, read_json(self._path(FAILED_DIR, u))['error'])
+                    for u in self.unit_ids() if self.status(u) == 'failed')
+
+
+def _heartbeat(queue, unit_id, token, stop):
+    """Renews a lease until stop is set, or until it is no longer held by token."""
+    while not stop.wait(queue.lease_seconds / 3.0):
+        if not queue.renew(unit_id, token):
+            return
+
+
+def run_worker(queue_dir, function, lease_seconds=LEASE_SECONDS, poll_seconds=POLL_SECONDS, worker=None):
+    """Claims and runs units until every unit in the queue is done or failed.
+
+    Parameters
+    ----------
+    queue_dir: str
+        Queue directory.
+    function: function
+        Called with the spec of each claimed unit; returns a JSON serializable result.
+        Exceptions mark the unit failed.
+    lease_seconds: float
+        Seconds after the last renewal before a lease expires. Leases are renewed in the
+        background while a unit runs.
+    poll_seconds: float
+        Seconds to wait when units remain but none can be claimed yet.
+    worker: str
+        Worker name recorded in leases. Defaults to the host name and process ID.
+
+    Returns
+    -------
+    The number of units this worker ran.
+    """
+    queue = JobQueue(queue_dir, lease_seconds)
+    worker = worker or worker_name()
+    n_units = 0
+    while True:
+        unit = queue.claim(worker)
+        if unit is None:
+            if queue.finished():
+                return n_units
+            time.sleep(poll_seconds)
+            continue
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(queue, unit['id'], unit['lease'], stop))
+        heartbeat.daemon = True
+        heartbeat.start()
+        try:
+            result = function(unit['spec'])
+        except Exception:
+            queue.fail(unit['id'], traceback.format_exc(), unit['lease'])
+        else:
+            queue.complete(unit['id'], result, unit['lease'])
+        finally:
+            stop.set()
+            heartbeat.join()
+        n_units += 1
+
+
+def run_workers(queue_dir, function, n_workers, lease_seconds=LEASE_SECONDS, poll_seconds=POLL_SECONDS):
+    """Runs n_workers worker processes on this host until the queue is finished, i.e. to
+    shard a run locally or to add one host's workers to a shared queue. The function must
+    be importable (defined at module level) to be passed to the processes. Returns the
+    queue's unit status counts."""
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=(queue_dir, function, lease_seconds, poll_seconds))
+               for i in range(n_workers)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    return JobQueue(queue_dir, lease_seconds).counts()
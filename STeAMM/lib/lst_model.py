@@ -0,0 +1,313 @@
+#-------------------------------------------------------------------------------
+# Name:         lst_model.py
+#
+# Summary:      Batched fixed-effects linear models relating stream temperature to land surface
+#               temperature (LST), and optionally julian day. Observations are held in flat
+#               arrays with a group index (i.e. per basin, per RCA, per half year), and the
+#               models of all groups are fitted together with one stacked least-squares solve.
+#               Per-group sufficient statistics (X'X, X'y, y'y, counts) can be kept with the
+#               fitted models, so new observations update the models without a full refit.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# References:   McNyset, Kristina M., Carol J. Volk, and Chris E. Jordan. "Developing
+#               an Effective Model for Predicting Spatially and Temporally Continuous
+#               Stream Temperatures from Remotely Sensed Land Surface Temperatures."
+#               Water 7.12 (2015): 6827-6846.
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import numpy as np
+
+# First julian day of the second half of the year, for half year models
+HALF_YEAR_DOY = 183
+
+# Number of stream reaches predicted at a time, to bound peak memory use
+REACH_CHUNK_SIZE = 5000
+
+# RCA key of the basin-wide models that per RCA models fall back to, for RCAs without
+# a fitted model of their own (i.e. RCAs without observed stream temperatures)
+FALLBACK_RCA = -1
+
+
+def design_matrix(lst, jday=None):
+    """Builds the observation x coefficient design matrix: an intercept, LST and,
+    if given, julian day."""
+    columns = [np.ones(len(lst)), np.asarray(lst, dtype=np.float64)]
+    if jday is not None:
+        columns.append(np.asarray(jday, dtype=np.float64))
+    return np.column_stack(columns)
+
+
+def half_year(jday):
+    """Returns 0 for julian days in the first half of the year, and 1 for the second half."""
+    return (np.asarray(jday) >= HALF_YEAR_DOY).astype(np.int64)
+
+
+def group_index(*keys):
+    """Combines one or more per-observation key arrays (i.e. RCA ID and half year) into
+    a group index. Returns the unique key combinations (one row per group) and the group
+    index of each observation."""
+    key_array = np.column_stack([np.asarray(k, dtype=np.int64) for k in keys])
+    group_keys, groups = np.unique(key_array, axis=0, return_inverse=True)
+    return group_keys, groups.ravel()
+
+
+def model_groups(rca, jday, per_rca=True, half_years=False):
+    """Groups observations for a model variant: per RCA or for the whole basin (RCA key 0),
+    and for the whole year (season key 0) or per half year. Returns the RCA and season key
+    of each group, and the group index of each observation."""
+    n_obs = len(jday)
+    rca_key = rca if per_rca else np.zeros(n_obs, dtype=np.int64)
+    season_key = half_year(jday) if half_years else np.zeros(n_obs, dtype=np.int64)
+    return group_index(rca_key, season_key)
+
+
+def add_fallback(group_keys, groups, X, y, jday, half_years=False):
+    """Adds every observation a second time, grouped for the basin-wide fallback models of
+    per RCA models (RCA key FALLBACK_RCA), by half year if half_years. Returns the group
+    keys, group index, design matrix and stream temperatures with the added rows."""
+    fallback_keys, fallback_groups = model_groups(np.full(len(y), FALLBACK_RCA, dtype=np.int64), jday,
+                                                  True, half_years)
+    return (np.vstack((group_keys, fallback_keys)),
+            np.concatenate((groups, fallback_groups + len(group_keys))),
+            np.vstack((X, X)), np.concatenate((y, y)))
+
+
+def group_sums(X, y, groups, n_groups):
+    """Sums the normal equation terms of each group: X'X, X'y, y'y, the sum of y, and
+    the number of observations."""
+    n_coef = X.shape[1]
+    outer = (X[:, :, np.newaxis] * X[:, np.newaxis, :]).reshape(len(X), -1)
+    xtx = np.column_stack([np.bincount(groups, weights=outer[:, k], minlength=n_groups)
+                           for k in range(n_coef * n_coef)]).reshape(n_groups, n_coef, n_coef)
+    xty = np.column_stack([np.bincount(groups, weights=X[:, k] * y, minlength=n_groups)
+                           for k in range(n_coef)])
+    yty = np.bincount(groups, weights=y * y, minlength=n_groups)
+    y_sum = np.bincount(groups, weights=y, minlength=n_groups)
+    n_obs = np.bincount(groups, minlength=n_groups)
+    return xtx, xty, yty, y_sum, n_obs
+
+
+def solve_normal(xtx, xty, n_obs):
+    """Solves the stacked normal equations of all groups. Groups with fewer observations
+    than coefficients get NaN coefficients, and singular groups (i.e. a constant column)
+    get the minimum norm solution."""
+    n_coef = xtx.shape[1]
+    coef = np.full(xty.shape, np.nan)
+    fit = n_obs >= n_coef
+    if fit.any():
+        try:
+            coef[fit] = np.linalg.solve(xtx[fit], xty[fit][:, :, np.newaxis])[:, :, 0]
+        except np.linalg.LinAlgError:
+            coef[fit] = np.einsum('gij,gj->gi', np.linalg.pinv(xtx[fit]), xty[fit])
+    return coef
+
+
+def predict_groups(coef, X, groups):
+    """Predicts each observation from the coefficients of its group."""
+    return np.einsum('ij,ij->i', X, coef[groups])
+
+
+def fit_groups(X, y, groups, n_groups=None):
+    """Fits a least-squares linear model per group, for all groups at once.
+
+    Parameters
+    ----------
+    X: numpy.ndarray
+        Observation x coefficient design matrix (see `design_matrix`).
+    y: numpy.ndarray
+        Observed stream temperatures.
+    groups: numpy.ndarray
+        Group index (0 to n_groups - 1) of each observation.
+    n_groups: int
+        Number of groups. Defaults to the largest group index + 1.
+
+    Returns
+    -------
+    A dict of arrays: 'coef' (group x coefficient), 'n_obs', 'r2' and 'rmse' (per
+    group), and 'residuals' (per observation).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    if n_groups is None:
+        n_groups = groups.max() + 1
+    xtx, xty, yty, y_sum, n_obs = group_sums(X, y, groups, n_groups)
+    coef = solve_normal(xtx, xty, n_obs)
+    residuals = y - predict_groups(coef, X, groups)
+    sse = np.bincount(groups, weights=residuals * residuals, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sst = yty - y_sum * y_sum / n_obs
+        r2 = 1.0 - sse / sst
+        rmse = np.sqrt(sse / n_obs)
+    return {'coef': coef, 'n_obs': n_obs, 'r2': r2, 'rmse': rmse, 'residuals': residuals}
+
+
+def init_state(X, y, group_keys, groups):
+    """Builds a model state from observations: the key of each group, the group's
+    sufficient statistics (X'X, X'y, y'y, sum of y, observation count), and the fitted
+    coefficients, R2 and RMSE computed from them."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    xtx, xty, yty, y_sum, n_obs = group_sums(X, y, np.asarray(groups, dtype=np.int64), len(group_keys))
+    state = {'group_keys': np.asarray(group_keys, dtype=np.int64), 'xtx': xtx, 'xty': xty,
+             'yty': yty, 'y_sum': y_sum, 'n_obs': n_obs}
+    return solve_state(state)
+
+
+def solve_state(state):
+    """Solves the coefficients of every group of a model state from its sufficient
+    statistics, and computes each group's R2 and RMSE without the observations."""
+    coef = solve_normal(state['xtx'], state['xty'], state['n_obs'])
+    fitted_sq = np.einsum('gi,gij,gj->g', coef, state['xtx'], coef)
+    sse = np.maximum(state['yty'] - 2.0 * np.einsum('gi,gi->g', coef, state['xty']) + fitted_sq, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sst = state['yty'] - state['y_sum'] * state['y_sum'] / state['n_obs']
+        state['r2'] = 1.0 - sse / sst
+        state['rmse'] = np.sqrt(sse / state['n_obs'])
+    state['coef'] = coef
+    return state
+
+
+def update_state(state, X, y, group_keys, groups):
+    """Adds new observations to a model state and re-solves it. Only the new observations
+    are summed, so the cost grows with the number of new rows and groups, not with the
+    observations already in the state. Groups with keys not yet in the state are added.
+
+    Parameters
+    ----------
+    state: dict
+        Model state from `init_state`, `update_state` or `load_state`.
+    X: numpy.ndarray
+        Observation x coefficient design matrix of the new observations.
+    y: numpy.ndarray
+        New observed stream temperatures.
+    group_keys: numpy.ndarray
+        Keys of the groups of the new observations, one row per group.
+    groups: numpy.ndarray
+        Index into `group_keys` of each new observation.
+
+    Returns
+    -------
+    The updated model state.
+    """
+    old_keys = state['group_keys']
+    all_keys, key_pos = np.unique(np.vstack((old_keys, np.asarray(group_keys, dtype=np.int64))),
+                                  axis=0, return_inverse=True)
+    key_pos = key_pos.ravel()
+    old_pos = key_pos[:len(old_keys)]
+    new_groups = key_pos[len(old_keys):][np.asarray(groups, dtype=np.int64)]
+    n_groups = len(all_keys)
+
+    new_sums = group_sums(np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64),
+                          new_groups, n_groups)
+    updated = {'group_keys': all_keys}
+    for name, new_sum in zip(('xtx', 'xty', 'yty', 'y_sum', 'n_obs'), new_sums):
+        merged = new_sum.copy()
+        merged[old_pos] += state[name]
+        updated[name] = merged
+    return solve_state(updated)
+
+
+def observation_keys(rca, date):
+    """Returns a key of each observation's RCA ID and YYYYDDD date, to track which
+    observations a model state was already updated with."""
+    return np.asarray(rca, dtype=np.int64) * 10000000 + np.asarray(date, dtype=np.int64)
+
+
+def new_observations(added_keys, rca, date):
+    """Returns a mask of the observations whose key (see observation_keys) is not in
+    added_keys, i.e. the observations added since a model state was last updated."""
+    keys = observation_keys(rca, date)
+    added_keys = np.sort(np.asarray(added_keys, dtype=np.int64))
+    if len(added_keys) == 0:
+        return np.ones(len(keys), dtype=bool)
+    pos = np.clip(np.searchsorted(added_keys, keys), 0, len(added_keys) - 1)
+    return added_keys[pos] != keys
+
+
+def save_state(state, out_file):
+    """Saves a model state to a numpy .npz file."""
+    np.savez(out_file, **state)
+    return out_file
+
+
+def load_state(in_file):
+    """Loads a model state saved by `save_state`."""
+    npz = np.load(in_file)
+    return dict((key, npz[key]) for key in npz.files)
+
+
+def coef_index(group_keys, rca_ids, per_rca=True, half_years=False, coef=None):
+    """Returns an RCA x season array with the group index of the model that applies to
+    each RCA in each half year (both columns are the same for whole year models), or -1
+    where no model was fitted. RCAs without a model of their own, or whose model has NaN
+    coefficients (if coef is given), use the basin-wide fallback model (see add_fallback),
+    if there is one."""
+    rca_ids = np.asarray(rca_ids, dtype=np.int64)
+    fitted = np.ones(len(group_keys), dtype=bool) if coef is None else ~np.isnan(coef).any(axis=1)
+    lookup = dict((tuple(k), g) for g, k in enumerate(np.asarray(group_keys).tolist()) if fitted[g])
+    rca_keys = rca_ids if per_rca else np.zeros(len(rca_ids), dtype=np.int64)
+    index = np.full((len(rca_ids), 2), -1, dtype=np.int64)
+    for season in (0, 1):
+        season_key = season if half_years else 0
+        fallback = lookup.get((FALLBACK_RCA, season_key), -1)
+        index[:, season] = [lookup.get((r, season_key), fallback) for r in rca_keys.tolist()]
+    return index
+
+
+def predict_reach_days(coef, rca_coef_index, lst_values, jday, reach_rca, out_values,
+                       use_jday=True, chunk_size=REACH_CHUNK_SIZE):
+    """Predicts stream temperature for every reach and day.
+
+    Each chunk of reaches gathers the LST values and model group of its reaches' RCAs,
+    and applies the coefficients to the whole reach x day block in one broadcasted
+    operation.
+
+    Parameters
+    ----------
+    coef: numpy.ndarray
+        Group x coefficient array of fitted models.
+    rca_coef_index: numpy.ndarray
+        RCA x season array of model group indexes (see `coef_index`).
+    lst_values: numpy.ndarray
+        RCA x day array of mean LST values, i.e. from the RCA store.
+    jday: numpy.ndarray
+        Julian day of each column of `lst_values`.
+    reach_rca: numpy.ndarray
+        Row of `lst_values` (RCA) of each reach, or -1 for reaches outside of all RCAs.
+    out_values: numpy.ndarray
+        Reach x day output array, i.e. a writable memory-mapped store array.
+    use_jday: bool
+        Whether the models include julian day.
+    chunk_size: int
+        Number of reaches predicted at a time.
+
+    Returns
+    -------
+    `out_values`, with NaN where there is no LST value or model.
+    """
+    jday = np.asarray(jday, dtype=np.float64)
+    season = half_year(jday)
+    coef = np.vstack((coef, np.full((1, coef.shape[1]), np.nan)))  # row -1 -> NaN model
+    reach_rca = np.asarray(reach_rca, dtype=np.int64)
+    for start in range(0, len(reach_rca), chunk_size):
+        rows = reach_rca[start:start + chunk_size]
+        mapped = rows >= 0
+        lst = np.full((len(rows), len(jday)), np.nan)
+        lst[mapped] = lst_values[rows[mapped]]
+        groups = np.full((len(rows), len(jday)), -1, dtype=np.int64)
+        groups[mapped] = rca_coef_index[rows[mapped]][:, season]
+        pred = coef[groups, 0] + coef[groups, 1] * lst
+        if use_jday:
+            pred += coef[groups, 2] * jday
+        out_values[start:start + chunk_size] = pred
+    return out_values
@@ -0,0 +1,151 @@
+#-------------------------------------------------------------------------------
+# Name:         lst_store.py
+#
+# Summary:      Compact storage of daily temperature statistics keyed by feature ID (i.e. RCA
+#               or stream reach ID) and date. A store is a directory holding three numpy
+#               arrays: the feature IDs, the dates (as YYYYDDD integers), and a float32
+#               feature x date array of values, where NaN marks missing values. Stores are
+#               queried read-only through memory-maps, without loading the full dataset.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import datetime
+import numpy as np
+
+# File names of the arrays in a store directory
+IDS_FILE = 'ids.npy'
+DATES_FILE = 'dates.npy'
+VALUES_FILE = 'values.npy'
+
+
+def date_keys(year, days):
+    """Converts a year and a list of julian days (i.e. '001') into YYYYDDD integer dates."""
+    return np.array([int(year) * 1000 + int(d) for d in days], dtype=np.int32)
+
+
+def date_key(date):
+    """Converts a date given as a YYYYDDD integer, a datetime.date or an ISO 8601
+    (YYYY-MM-DD) string into a YYYYDDD integer."""
+    if isinstance(date, (str, type(u''))):
+        date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+    if isinstance(date, datetime.date):
+        return date.year * 1000 + date.timetuple().tm_yday
+    return int(date)
+
+
+def write_store(store_dir, ids, dates, values):
+    """Writes feature IDs, YYYYDDD dates and a feature x date array of values to a store
+    directory, replacing any existing store."""
+    ids = np.asarray(ids, dtype=np.int64)
+    dates = np.asarray(dates, dtype=np.int32)
+    values = np.asarray(values, dtype=np.float32)
+    if values.shape != (len(ids), len(dates)):
+        raise ValueError("Values array shape %s does not match %d IDs and %d dates" %
+                         (values.shape, len(ids), len(dates)))
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    np.save(os.path.join(store_dir, IDS_FILE), ids)
+    np.save(os.path.join(store_dir, DATES_FILE), dates)
+    np.save(os.path.join(store_dir, VALUES_FILE), values)
+    return store_dir
+
+
+def create_store(store_dir, ids, dates):
+    """Creates a store filled with NaN, and returns its values array as a writable
+    memory-map, so large stores can be written one block of features at a time."""
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    np.save(os.path.join(store_dir, IDS_FILE), np.asarray(ids, dtype=np.int64))
+    np.save(os.path.join(store_dir, DATES_FILE), np.asarray(dates, dtype=np.int32))
+    values = np.lib.format.open_memmap(os.path.join(store_dir, VALUES_FILE), mode='w+',
+                                       dtype=np.float32, shape=(len(ids), len(dates)))
+    values[:] = np.nan
+    return values
+
+
+def read_store(store_dir, mmap_mode='r'):
+    """Reads the feature IDs, dates and values of a store. By default the values array is
+    memory-mapped, so only the parts that are accessed are read from disk."""
+    ids = np.load(os.path.join(store_dir, IDS_FILE))
+    dates = np.load(os.path.join(store_dir, DATES_FILE))
+    values = np.load(os.path.join(store_dir, VALUES_FILE), mmap_mode=mmap_mode)
+    return ids, dates, values
+
+
+def update_store(store_dir, ids, dates, values):
+    """Merges new values into a store, creating it if needed. New IDs and dates are added,
+    and values for existing ID and date pairs are replaced. Dates are kept in order."""
+    if not os.path.exists(os.path.join(store_dir, VALUES_FILE)):
+        order = np.argsort(dates)
+        return write_store(store_dir, ids, np.asarray(dates)[order], np.asarray(values)[:, order])
+    old_ids, old_dates, old_values = read_store(store_dir, mmap_mode=None)
+    new_ids = np.asarray(ids, dtype=np.int64)
+    new_dates = np.asarray(dates, dtype=np.int32)
+    all_ids = np.concatenate((old_ids, new_ids[~np.isin(new_ids, old_ids)]))
+    all_dates = np.union1d(old_dates, new_dates)
+    all_values = np.full((len(all_ids), len(all_dates)), np.nan, dtype=np.float32)
+
+    id_pos = dict((i, p) for p, i in enumerate(all_ids.tolist()))
+    all_values[:len(old_ids), np.searchsorted(all_dates, old_dates)] = old_values
+    rows = np.array([id_pos[i] for i in new_ids.tolist()], dtype=np.int64)
+    cols = np.searchsorted(all_dates, new_dates)
+    all_values[rows[:, np.newaxis], cols] = values
+    return write_store(store_dir, all_ids, all_dates, all_values)
+
+
+class TemperatureStore(object):
+    """Read-only queries of a store by feature ID and date range.
+
+    The feature ID to row offset index is built when the store is opened, and the
+    values array is memory-mapped, so a query only reads the values it returns.
+
+    :param store_dir: Store directory, i.e. from predict_temp.predict_reaches or
+        predict_temp.write_rca_store.
+    :type store_dir: str
+    """
+
+    def __init__(self, store_dir):
+        self.ids, self.dates, self.values = read_store(store_dir)
+        self.offsets = dict((i, row) for row, i in enumerate(self.ids.tolist()))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, feature_id):
+        return feature_id in self.offsets
+
+    def date_range(self, start=None, end=None):
+        """Returns the column slice of the dates from start to end, inclusive. Dates may
+        be YYYYDDD integers, datetime.date objects or ISO strings; None is open-ended."""
+        first = 0 if start is None else np.searchsorted(self.dates, date_key(start), 'left')
+        last = len(self.dates) if end is None else np.searchsorted(self.dates, date_key(end), 'right')
+        return slice(int(first), int(last))
+
+    def series(self, feature_id, start=None, end=None):
+        """Returns the dates and values of one feature from start to end, inclusive.
+        Raises KeyError for unknown feature IDs."""
+        cols = self.date_range(start, end)
+        return self.dates[cols], np.array(self.values[self.offsets[feature_id], cols])
+
+    def value(self, feature_id, date):
+        """Returns the value of one feature on one date, or NaN if the date is not stored."""
+        col = np.searchsorted(self.dates, date_key(date))
+        if col == len(self.dates) or self.dates[col] != date_key(date):
+            return np.nan
+        return float(self.values[self.offsets[feature_id], col])
+
+    def date_slice(self, start, end=None):
+        """Returns the dates and the feature x date values of all features from start to
+        end (inclusive; defaults to the start date only)."""
+        cols = self.date_range(start, start if end is None else end)
+        return self.dates[cols], np.array(self.values[:, cols])
@@ -0,0 +1,262 @@
+#-------------------------------------------------------------------------------
+# Name:         model_select.py
+#
+# Summary:      Parallel model selection for stream temperature models. Every model variant
+#               (per basin or per RCA, with or without julian day, whole year or half years)
+#               is cross-validated across a process pool, in tasks of one variant, fold and
+#               block of RCAs. Model data arrays are shared with the worker processes as
+#               memory-mapped numpy files instead of being pickled into each task. Test
+#               observations of RCAs (or half years) without a fitted model of their own are
+#               scored with the basin-wide model, as they are predicted, so every variant is
+#               scored on the same observations.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import csv
+import multiprocessing
+import numpy as np
+from . import lst_model
+
+# Model data arrays shared with worker processes
+MODEL_DATA_KEYS = ('rca', 'jday', 'lst', 'temp', 'fold')
+
+# Number of RCAs fitted per task, for per RCA model variants
+RCA_BLOCK_SIZE = 500
+
+# Columns of the model selection results table
+RESULT_FIELDS = ['variant', 'fold', 'rca', 'season', 'n_train', 'n_test', 'n_fallback', 'r2', 'rmse', 'mae',
+                 'bias']
+
+# Model data of worker processes, loaded by init_worker, and the basin-wide fallback models
+# fitted from it, by model options and fold
+_model_data = None
+_fallback = {}
+
+
+def model_variants():
+    """Returns the model variants to compare, as dicts of fit_models options and a name."""
+    variants = []
+    for per_rca in (False, True):
+        for use_jday in (True, False):
+            for half_years in (False, True):
+                name = '%s_%s_%s' % ('rca' if per_rca else 'basin',
+                                     'jday' if use_jday else 'nojday',
+                                     'half' if half_years else 'year')
+                variants.append({'name': name, 'per_rca': per_rca,
+                                 'use_jday': use_jday, 'half_years': half_years})
+    return variants
+
+
+def assign_folds(n_obs, n_folds, seed=0):
+    """Randomly assigns each observation to one of n_folds cross-validation folds."""
+    rng = np.random.RandomState(seed)
+    return rng.permutation(n_obs) % max(n_folds, 1)
+
+
+def share_model_data(model_data, folds, share_dir):
+    """Saves the model data arrays and fold assignments as numpy files, to be
+    memory-mapped by the worker processes."""
+    if not os.path.exists(share_dir):
+        os.makedirs(share_dir)
+    arrays = dict(model_data, fold=folds)
+    for key in MODEL_DATA_KEYS:
+        np.save(os.path.join(share_dir, '%s.npy' % key), arrays[key])
+    return share_dir
+
+
+def init_worker(share_dir):
+    """Memory-maps the shared model data in a worker process."""
+    global _model_data
+    _model_data = dict((key, np.load(os.path.join(share_dir, '%s.npy' % key), mmap_mode='r'))
+                       for key in MODEL_DATA_KEYS)
+    _fallback.clear()
+
+
+def fallback_models(use_jday, half_years, fold):
+    """Fits the basin-wide models that per RCA variants fall back to, to the training
+    observations of all RCAs in a fold, once per worker process. Returns a season x
+    coefficient array (both rows are the same for whole year models), NaN where a season
+    has too few observations."""
+    key = (use_jday, half_years, fold)
+    if key not in _fallback:
+        jday = np.asarray(_model_data['jday'])
+        group_keys, groups = lst_model.model_groups(_model_data['rca'], jday, False, half_years)
+        X = lst_model.design_matrix(np.asarray(_model_data['lst']), jday if use_jday else None)
+        obs_fold = np.asarray(_model_data['fold'])
+        train = obs_fold != fold if fold >= 0 else np.ones(len(jday), dtype=bool)
+        fit = lst_model.fit_groups(X[train], np.asarray(_model_data['temp'])[train], groups[train],
+                                   len(group_keys))
+        coef = np.full((2, X.shape[1]), np.nan)
+        coef[group_keys[:, 1]] = fit['coef']
+        _fallback[key] = coef if half_years else coef[[0, 0]]
+    return _fallback[key]
+
+
+def build_tasks(rca_ids, variants, n_folds, block_size=RCA_BLOCK_SIZE):
+    """Lists one (variant, fold, RCA IDs) task per variant, fold and block of RCAs. Basin
+    variants are fitted as one block. A fold of -1 fits and scores all observations."""
+    folds = range(n_folds) if n_folds > 1 else [-1]
+    rca_ids = np.unique(rca_ids)
+    tasks = []
+    for variant in variants:
+        if variant['per_rca']:
+            blocks = [rca_ids[i:i + block_size] for i in range(0, len(rca_ids), block_size)]
+        else:
+            blocks = [rca_ids]
+        for fold in folds:
+            for block in blocks:
+                tasks.append((variant, fold, block))
+    return tasks
+
+
+def fit_task(task):
+    """Fits one model variant to the training observations of a block of RCAs, and scores
+    it on the test fold. Test observations of per RCA groups without a fitted model (i.e.
+    an RCA with no training observations) are scored with the basin-wide model, and
+    counted as n_fallback. Returns one results row per model group."""
+    variant, fold, block = task
+    in_block = np.isin(_model_data['rca'], block)
+    rca = np.asarray(_model_data['rca'][in_block])
+    jday = np.asarray(_model_data['jday'][in_block])
+    lst = np.asarray(_model_data['lst'][in_block])
+    temp = np.asarray(_model_data['temp'][in_block])
+    obs_fold = np.asarray(_model_data['fold'][in_block])
+
+    group_keys, groups = lst_model.model_groups(rca, jday, variant['per_rca'], variant['half_years'])
+    n_groups = len(group_keys)
+    X = lst_model.design_matrix(lst, jday if variant['use_jday'] else None)
+    test = obs_fold == fold if fold >= 0 else np.ones(len(temp), dtype=bool)
+    train = ~test if fold >= 0 else test
+    fit = lst_model.fit_groups(X[train], temp[train], groups[train], n_groups)
+
+    coef = fit['coef'][groups[test]]
+    fallback = np.zeros(len(coef), dtype=bool)
+    if variant['per_rca']:
+        fallback = np.isnan(coef).any(axis=1)
+        season = lst_model.half_year(jday[test][fallback])
+        coef[fallback] = fallback_models(variant['use_jday'], variant['half_years'], fold)[season]
+    error = np.einsum('ij,ij->i', X[test], coef) - temp[test]
+    scored = ~np.isnan(error)
+    test_groups = groups[test][scored]
+    error = error[scored]
+    n_test = np.bincount(test_groups, minlength=n_groups)
+    n_fallback = np.bincount(test_groups[fallback[scored]], minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rmse = np.sqrt(np.bincount(test_groups, weights=error * error, minlength=n_groups) / n_test)
+        mae = np.bincount(test_groups, weights=np.abs(error), minlength=n_groups) / n_test
+        bias = np.bincount(test_groups, weights=error, minlength=n_groups) / n_test
+
+    rows = []
+    for g in range(n_groups):
+        rows.append({'variant': variant['name'], 'fold': fold,
+                     'rca': int(group_keys[g, 0]), 'season': int(group_keys[g, 1]),
+                     'n_train': int(fit['n_obs'][g]), 'n_test': int(n_test[g]),
+                     'n_fallback': int(n_fallback[g]),
+                     'r2': float(fit['r2'][g]), 'rmse': float(rmse[g]),
+                     'mae': float(mae[g]), 'bias': float(bias[g])})
+    return rows
+
+
+def run_selection(model_data, share_dir, n_folds=5, n_workers=None, variants=None,
+                  block_size=RCA_BLOCK_SIZE, seed=0):
+    """Cross-validates every model variant in parallel.
+
+    Parameters
+    ----------
+    model_data: dict
+        Model data arrays 'rca', 'jday', 'lst' and 'temp', one value per observation.
+    share_dir: str
+        Directory for the memory-mapped model data shared with worker processes.
+    n_folds: int
+        Number of cross-validation folds. With 1 fold, models are scored on the
+        observations they were fitted to.
+    n_workers: int
+        Number of worker processes. Defaults to the number of CPUs; 1 runs all
+        tasks in the current process.
+    variants: list
+        Model variants to compare. Defaults to `model_variants()`.
+    block_size: int
+        Number of RCAs fitted per task, for per RCA variants.
+    seed: int
+        Random seed for the fold assignments.
+
+    Returns
+    -------
+    A list of results rows (dicts with RESULT_FIELDS keys), one per variant, fold and
+    model group.
+    """
+    if variants is None:
+        variants = model_variants()
+    folds = assign_folds(len(model_data['temp']), n_folds, seed)
+    share_model_data(model_data, folds, share_dir)
+    tasks = build_tasks(model_data['rca'], variants, n_folds, block_size)
+    if n_workers is None:
+        n_workers = multiprocessing.cpu_count()
+
+    rows = []
+    if n_workers <= 1:
+        init_worker(share_dir)
+        for task in tasks:
+            rows.extend(fit_task(task))
+        return rows
+    pool = multiprocessing.Pool(n_workers, init_worker, (share_dir,))
+    try:
+        for task_rows in pool.imap_unordered(fit_task, tasks):
+            rows.extend(task_rows)
+    finally:
+        pool.close()
+        pool.join()
+    return rows
+
+
+def summarize(rows):
+    """Summarizes results rows per variant: total test observations, and RMSE, MAE and bias
+    over all scored test observations. Returns a list of dicts sorted by RMSE."""
+    summary = {}
+    for row in rows:
+        if row['n_test'] == 0:
+            continue
+        s = summary.setdefault(row['variant'], {'variant': row['variant'], 'n_test': 0,
+                                                'sse': 0.0, 'sae': 0.0, 'se': 0.0})
+        s['n_test'] += row['n_test']
+        s['sse'] += row['rmse'] ** 2 * row['n_test']
+        s['sae'] += row['mae'] * row['n_test']
+        s['se'] += row['bias'] * row['n_test']
+    results = []
+    for s in summary.values():
+        results.append({'variant': s['variant'], 'n_test': s['n_test'],
+                        'rmse': np.sqrt(s['sse'] / s['n_test']),
+                        'mae': s['sae'] / s['n_test'], 'bias': s['se'] / s['n_test']})
+    return sorted(results, key=lambda r: r['rmse'])
+
+
+def best_variant(summary):
+    """Returns the name of the variant with the lowest RMSE in a summary from `summarize`,
+    among the variants scored on every test observation. Variants that could not score
+    some observations (i.e. a half year without enough observations for even a basin-wide
+    model) are not ranked, as their metrics come from fewer, different observations. Raises
+    ValueError if no variant was scored, i.e. no RCA has observations in any test fold."""
+    if not summary:
+        raise ValueError("No model variant could be scored: no observations fall in any "
+                         "cross-validation test fold")
+    n_test = max(s['n_test'] for s in summary)
+    return [s for s in summary if s['n_test'] == n_test][0]['variant']
+
+
+def write_results(rows, out_csv):
+    """Writes results rows to a csv table."""
+    with open(out_csv, 'wb') as out_file:
+        writer = csv.DictWriter(out_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return out_csv
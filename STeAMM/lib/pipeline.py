@@ -0,0 +1,104 @@
+#-------------------------------------------------------------------------------
+# Name:         pipeline.py
+#
+# Summary:      Streaming stages for the preprocessing pipeline. A stage is a generator of
+#               output file paths; prefetch() runs a stage in a background thread behind a
+#               bounded queue, so the next stage can start on one date while the previous
+#               stage works on the following dates, without more than a few dates of
+#               intermediate files in flight.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Default number of items a stage may produce ahead of the stage consuming them
+MAX_IN_FLIGHT = 4
+
+# Seconds between checks of whether the consumer of a stage has stopped
+POLL_SECONDS = 0.5
+
+# Marker of the end of a stage's items
+_DONE = object()
+
+
+def prefetch(iterable, max_in_flight=MAX_IN_FLIGHT):
+    """Iterates over iterable in a background thread, yielding its items in order. At most
+    max_in_flight items are produced ahead of the consumer. An exception raised by iterable
+    is raised again in the consumer, and the background thread stops when the consumer
+    stops iterating."""
+    items = queue.Queue(max_in_flight)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except Exception as e:
+            put((_DONE, e))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def collect(iterable, out_list):
+    """Yields the items of iterable, appending each to out_list."""
+    for item in iterable:
+        out_list.append(item)
+        yield item
+
+
+def chunks(iterable, size):
+    """Yields lists of up to size consecutive items of iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def release(paths):
+    """Removes intermediate files that have been consumed, ignoring files already gone."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
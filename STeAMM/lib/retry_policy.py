@@ -0,0 +1,216 @@
+#-------------------------------------------------------------------------------
+# Name:         retry_policy.py
+#
+# Summary:      Retries and adaptive concurrency of requests to the NASA Earthdata servers.
+#               Requests failing with a network error (a URLError, an HTTPException or a
+#               socket error, but not a local file error such as a full disk) or a transient
+#               HTTP status (408, 429 and 5xx) are retried with exponential backoff and full
+#               jitter, waiting at least as long as the server's Retry-After header asks. An
+#               AdaptiveLimiter bounds the number of requests in flight, and adapts it like
+#               TCP congestion control (additive increase, multiplicative decrease): each
+#               successful request raises the limit by 1/limit, up to the maximum, and a
+#               throttling response (429 or 503) halves it, at most once per cooldown, so
+#               downloads run at the highest concurrency the server sustains without
+#               blocking them.
+#
+#                   policy = RetryPolicy(max_retries=5)
+#                   limiter = AdaptiveLimiter(maximum=4)
+#                   html = policy.call(lambda attempt: urllib2.urlopen(req).read(), limiter)
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import time
+import errno
+import socket
+import random
+import calendar
+import threading
+from email.utils import parsedate_tz
+try:
+    from urllib2 import URLError
+    from httplib import HTTPException
+except ImportError:
+    from urllib.error import URLError
+    from http.client import HTTPException
+
+# Default number of retries of a request, and backoff delays in seconds
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 120.0
+
+# Default maximum number of requests in flight
+MAX_CONNECTIONS = 4
+
+# HTTP statuses worth retrying, and those asking the client to slow down
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+# errno values of failed connections, worth retrying
+NETWORK_ERRNOS = (errno.ECONNRESET, errno.ECONNREFUSED, errno.ECONNABORTED, errno.ETIMEDOUT,
+                  errno.EPIPE, errno.ENETDOWN, errno.ENETUNREACH, errno.EHOSTUNREACH)
+
+
+def status_of(error):
+    """Returns the HTTP status of an error (i.e. urllib2.HTTPError), or None."""
+    return getattr(error, 'code', None)
+
+
+def network_error(error):
+    """Whether an error is a network error: a URLError, an HTTPException (i.e. a response
+    cut short, or a malformed status line), or a socket error such as a timeout, a failed
+    name lookup or a reset connection. Other IOErrors and OSErrors (i.e. a full disk) are
+    not."""
+    if isinstance(error, (URLError, HTTPException, socket.timeout, socket.gaierror, socket.herror)):
+        return True
+    if socket.error is not OSError and isinstance(error, socket.error):
+        # Python 2, where socket.error is not the base class of every OSError
+        return True
+    return getattr(error, 'errno', None) in NETWORK_ERRNOS
+
+
+def retry_after(error, now=None):
+    """Returns the seconds to wait asked by the Retry-After header of an HTTP error, given
+    as seconds or as an HTTP date, or None."""
+    headers = getattr(error, 'hdrs', None) or getattr(error, 'headers', None)
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    if now is None:
+        now = time.time()
+    # parsedate_tz gives the time zone offset separately; HTTP dates are in GMT
+    seconds = calendar.timegm(date[:9]) - (date[9] or 0)
+    return max(0.0, seconds - now)
+
+
+class RetryPolicy(object):
+    """When and how long to wait before retrying failed requests.
+
+    :param max_retries: Number of times a request is retried before its error is raised.
+    :type max_retries: int
+    :param base_delay: Backoff delay of the first retry, in seconds, doubled on each retry.
+    :type base_delay: float
+    :param max_delay: Upper bound of backoff delays, and of waits asked by Retry-After.
+    :type max_delay: float
+    """
+
+    def __init__(self, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 sleep=time.sleep, rand=random.random):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._random = rand
+
+    def retryable(self, error):
+        """Whether a request failing with error is worth retrying: a transient HTTP status,
+        or a network error (see network_error)."""
+        status = status_of(error)
+        if status is not None:
+            return status in RETRY_STATUSES
+        return network_error(error)
+
+    def delay(self, attempt, error=None):
+        """Returns the seconds to wait before retry number attempt + 1: a random time up to
+        the exponential backoff delay ("full jitter"), and at least the error's Retry-After."""
+        backoff = self._random() * min(self.max_delay, self.base_delay * 2 ** attempt)
+        wait = retry_after(error) if error is not None else None
+        if wait is not None:
+            backoff = max(backoff, min(wait, self.max_delay))
+        return backoff
+
+    def call(self, function, limiter=None, on_retry=None):
+        """Calls function(attempt), retrying it while it fails with a retryable error, up to
+        max_retries times. The attempt (0 for the first call) lets function count retries.
+        Each call holds a slot of the limiter, if given, and reports throttling to it;
+        on_retry(attempt, error, delay), if given, is called before each wait. Returns the
+        result of function, or raises its last error."""
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                result = function(attempt)
+            except Exception as e:
+                if limiter is not None:
+                    limiter.release(throttled=status_of(e) in THROTTLE_STATUSES, succeeded=False)
+                if attempt >= self.max_retries or not self.retryable(e):
+                    raise
+                delay = self.delay(attempt, e)
+                if on_retry is not None:
+                    on_retry(attempt, e, delay)
+                self._sleep(delay)
+                attempt += 1
+                continue
+            if limiter is not None:
+                limiter.release()
+            return result
+
+
+class AdaptiveLimiter(object):
+    """Bounds the number of requests in flight to a limit adapted by additive increase and
+    multiplicative decrease. Safe to use from several threads.
+
+    :param maximum: Highest limit.
+    :type maximum: int
+    :param minimum: Lowest limit.
+    :type minimum: int
+    :param initial: Starting limit; defaults to the lower of 2 and maximum.
+    :type initial: int
+    :param decrease: Factor the limit is multiplied by on throttling.
+    :type decrease: float
+    :param cooldown: Seconds after a decrease during which throttling responses (i.e. of
+        requests already in flight) do not decrease the limit again.
+    :type cooldown: float
+    """
+
+    def __init__(self, maximum=MAX_CONNECTIONS, minimum=1, initial=None, decrease=0.5,
+                 cooldown=1.0, clock=time.time):
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Invalid concurrency limits: %s to %s" % (minimum, maximum))
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(min(maximum, max(minimum, initial if initial is not None else 2)))
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.throttled = 0
+        self._clock = clock
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Waits until fewer requests than the limit are in flight, and counts one more."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False, succeeded=True):
+        """Counts a request as done, raising the limit if it succeeded, or lowering it if the
+        server throttled it."""
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                now = self._clock()
+                if self._last_decrease is None or now - self._last_decrease >= self.cooldown:
+                    self.limit = max(float(self.minimum), self.limit * self.decrease)
+                    self._last_decrease = now
+            elif succeeded:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
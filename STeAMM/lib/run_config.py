@@ -0,0 +1,201 @@
+#-------------------------------------------------------------------------------
+# Name:         run_config.py
+#
+# Summary:      Run configs for headless batch runs of the STeAMM pipeline. A run config is a
+#               JSON file naming the MODIS product, years, tiles and julian day range to
+#               download, the RCA and stream network shapefiles, the observed stream
+#               temperature table, and the number of worker processes. Relative paths are
+#               relative to the config file. Several basins sharing the same tiles and years
+#               can be listed under 'basins', each with its own shapefiles. Preprocessing
+#               stage outputs are kept in a size-capped stage cache, shared by runs with the
+#               same cache_dir; a cache_size_gb of 0 turns the cache off. Stages stream up to
+#               max_in_flight dates ahead of each other, and remove the intermediate files
+#               they have consumed unless keep_intermediates is true. Completed stages are
+#               recorded in a run journal, and a run resumes where it stopped unless resume
+#               is false. Stages named in 'profile' (a list, or 'all') are profiled, see
+#               lib/stage_profile.py. Failed download requests are retried up to
+#               download_retries times, with up to max_connections requests in flight, see
+#               lib/retry_policy.py; a run stops if granules still fail to download.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import json
+from . import gap_fill
+from . import job_queue
+from . import pipeline
+from . import stage_cache
+from . import retry_policy
+
+# Run config keys that must be given
+REQUIRED_KEYS = ('proj_dir', 'years', 'tiles')
+
+# Keys describing a basin, given at the top level or for each of several basins in 'basins'.
+# Top level values are shared by basins that do not give their own.
+BASIN_KEYS = ('rca_shp', 'rca_id_field', 'stream_shp', 'stream_id_field', 'obs_csv')
+
+# Default values of the optional run config keys
+DEFAULTS = {'product': 'MOD11A1.005', 'doy_start': 1, 'doy_end': 365,
+            'n_workers': None, 'n_folds': 5, 'fill_method': 'linear',
+            'area_weighted': False, 'download': True, 'proxy': None,
+            'username': None, 'password': None, 'queue_dir': None,
+            'lease_seconds': job_queue.LEASE_SECONDS, 'resolution': None,
+            'basins': None, 'cache_dir': None,
+            'cache_size_gb': stage_cache.MAX_BYTES / 1024.0 ** 3,
+            'keep_intermediates': True, 'max_in_flight': pipeline.MAX_IN_FLIGHT,
+            'resume': True, 'profile': None,
+            'download_retries': retry_policy.MAX_RETRIES,
+            'max_connections': retry_policy.MAX_CONNECTIONS}
+
+# Optional keys of each basin in 'basins'; a basin's resolution (in the units of its RCA
+# shapefile) defaults to the top level resolution, and then to the MODIS resolution
+BASIN_OPTIONAL_KEYS = ('name', 'resolution')
+
+# Run config keys holding file or directory paths
+PATH_KEYS = ('proj_dir', 'rca_shp', 'stream_shp', 'obs_csv', 'queue_dir', 'cache_dir')
+
+# Environment variables holding the NASA Earthdata login, if not in the run config
+USERNAME_ENV = 'EARTHDATA_USERNAME'
+PASSWORD_ENV = 'EARTHDATA_PASSWORD'
+
+
+def read_config(config_file):
+    """Reads a JSON run config file into a dict."""
+    with open(config_file, 'r') as in_file:
+        config = json.load(in_file)
+    if not isinstance(config, dict):
+        raise ValueError("Run config %s must be a JSON object" % config_file)
+    return config
+
+
+def validate_config(config, base_dir='', environ=None):
+    """Checks a run config and fills in defaults.
+
+    Parameters
+    ----------
+    config: dict
+        Run config, i.e. from `read_config`.
+    base_dir: str
+        Directory that relative paths in the run config are relative to.
+    environ: dict
+        Environment variables to read the Earthdata login from. Defaults to os.environ.
+
+    Returns
+    -------
+    A new dict with every REQUIRED_KEYS and DEFAULTS key, with years as a list of ints,
+    tiles as a list of strings, and absolute paths. Raises ValueError if the run config
+    is invalid.
+    """
+    if environ is None:
+        environ = os.environ
+    unknown = sorted(set(config) - set(REQUIRED_KEYS) - set(BASIN_KEYS) - set(DEFAULTS))
+    if unknown:
+        raise ValueError("Unknown run config keys: %s" % ', '.join(unknown))
+    required = REQUIRED_KEYS if config.get('basins') else REQUIRED_KEYS + BASIN_KEYS
+    missing = [key for key in required if config.get(key) in (None, '', [])]
+    if missing:
+        raise ValueError("Missing run config keys: %s" % ', '.join(missing))
+
+    checked = dict(DEFAULTS)
+    checked.update(config)
+    years = checked['years']
+    checked['years'] = [int(y) for y in (years if isinstance(years, list) else [years])]
+    tiles = checked['tiles']
+    if isinstance(tiles, (str, type(u''))):
+        tiles = tiles.split(',')
+    checked['tiles'] = [str(t).strip() for t in tiles]
+    if checked['queue_dir'] is None:
+        checked['queue_dir'] = os.path.join(checked['proj_dir'], 'queue')
+    if checked['cache_dir'] is None:
+        checked['cache_dir'] = os.path.join(checked['proj_dir'], 'cache')
+    for key in PATH_KEYS:
+        if checked.get(key) is not None:
+            checked[key] = os.path.abspath(os.path.join(base_dir, checked[key]))
+    if checked['basins']:
+        checked['basins'] = [validate_basin(checked, basin, base_dir) for basin in checked['basins']]
+        names = [basin['name'] for basin in checked['basins']]
+        if len(set(names)) < len(names):
+            raise ValueError("Basin names must be unique: %s" % ', '.join(names))
+
+    checked['doy_start'] = int(checked['doy_start'])
+    checked['doy_end'] = int(checked['doy_end'])
+    if not 1 <= checked['doy_start'] <= checked['doy_end'] <= 366:
+        raise ValueError("Invalid julian day range: %d to %d" % (checked['doy_start'], checked['doy_end']))
+    if checked['n_workers'] is not None and int(checked['n_workers']) < 1:
+        raise ValueError("n_workers must be at least 1")
+    if checked['fill_method'] not in gap_fill.FILL_METHODS:
+        raise ValueError("Unknown fill_method: %s" % checked['fill_method'])
+    if int(checked['max_in_flight']) < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    if float(checked['cache_size_gb']) < 0:
+        raise ValueError("cache_size_gb must not be negative")
+    if int(checked['download_retries']) < 0:
+        raise ValueError("download_retries must not be negative")
+    if int(checked['max_connections']) < 1:
+        raise ValueError("max_connections must be at least 1")
+
+    if checked['download']:
+        checked['username'] = checked['username'] or environ.get(USERNAME_ENV)
+        checked['password'] = checked['password'] or environ.get(PASSWORD_ENV)
+        if not checked['username'] or not checked['password']:
+            raise ValueError("An Earthdata username and password are required to download: set "
+                             "them in the run config or in %s and %s" % (USERNAME_ENV, PASSWORD_ENV))
+    return checked
+
+
+def validate_basin(config, basin, base_dir=''):
+    """Checks one basin of a multi-basin run config, filling in the basin keys it does
+    not give from the top level of the run config."""
+    unknown = sorted(set(basin) - set(BASIN_KEYS) - set(BASIN_OPTIONAL_KEYS))
+    if unknown:
+        raise ValueError("Unknown basin keys: %s" % ', '.join(unknown))
+    checked = dict((key, config.get(key)) for key in BASIN_KEYS + ('resolution',))
+    checked.update(basin)
+    missing = [key for key in ('name',) + BASIN_KEYS if checked.get(key) in (None, '')]
+    if missing:
+        raise ValueError("Missing basin keys of basin %s: %s" % (checked.get('name'), ', '.join(missing)))
+    for key in PATH_KEYS:
+        if key in basin:
+            checked[key] = os.path.abspath(os.path.join(base_dir, basin[key]))
+    return checked
+
+
+def basin_configs(config):
+    """Returns one run config per basin of a multi-basin run config, with the basin's keys
+    at the top level and the basin's name as 'name'."""
+    configs = []
+    for basin in config['basins']:
+        basin_config = dict(config)
+        basin_config.update(basin)
+        basin_config['basins'] = None
+        configs.append(basin_config)
+    return configs
+
+
+def open_cache(config):
+    """Returns the stage cache of a run config, or None if the cache is turned off."""
+    if not config['cache_size_gb']:
+        return None
+    return stage_cache.StageCache(config['cache_dir'], int(float(config['cache_size_gb']) * 1024 ** 3))
+
+
+def download_policy(config):
+    """Returns the retry policy of the download requests of a run config."""
+    return retry_policy.RetryPolicy(max_retries=int(config['download_retries']))
+
+
+def load_config(config_file, overrides=None, environ=None):
+    """Reads and checks a run config file. Values in overrides (i.e. from command line
+    options) replace values in the file."""
+    config = read_config(config_file)
+    config.update(overrides or {})
+    return validate_config(config, os.path.dirname(os.path.abspath(config_file)), environ)
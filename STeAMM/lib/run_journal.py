@@ -0,0 +1,124 @@
+#-------------------------------------------------------------------------------
+# Name:         run_journal.py
+#
+# Summary:      Run journal for checkpointing long preprocessing runs. Each completed stage
+#               unit (i.e. the geotiff of one date and tile, or the mosaic of one date) is
+#               appended to a JSON lines file with the sizes and modification times of its
+#               input and output files. A restarted run skips units whose outputs are still
+#               as recorded, checking them with a stat call instead of regenerating them.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import json
+import time
+import threading
+
+# Default name of the journal file in a project directory
+JOURNAL_FILE = 'journal.jsonl'
+
+
+def file_stamp(path):
+    """Returns the size and modification time of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, int(stat.st_mtime * 1000)]
+
+
+class RunJournal(object):
+    """An append-only journal of completed stage units.
+
+    :param journal_file: JSON lines journal file, created if it does not exist.
+    :type journal_file: str
+
+    :param resume: If False, the units recorded by previous runs are discarded.
+    :type resume: bool
+    """
+
+    def __init__(self, journal_file, resume=True):
+        self.journal_file = journal_file
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._units = {}
+        # whether the journal ends in a line cut short by a crash, which must be ended
+        # before the next record is appended
+        self._partial_line = False
+        journal_dir = os.path.dirname(os.path.abspath(journal_file))
+        if not os.path.isdir(journal_dir):
+            os.makedirs(journal_dir)
+        if not resume and os.path.exists(journal_file):
+            os.remove(journal_file)
+        self._read()
+
+    def _read(self):
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r') as in_file:
+            for line in in_file:
+                self._partial_line = not line.endswith('\n')
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                self._units[(record['stage'], record['unit'])] = record
+
+    def record(self, stage, unit, inputs, outputs):
+        """Records a completed unit of a stage, with the current state of its input and
+        output files."""
+        record = {'stage': stage, 'unit': unit, 'time': time.time(),
+                  'inputs': [[f, file_stamp(f)] for f in inputs],
+                  'outputs': [[f, file_stamp(f)] for f in outputs]}
+        with self._lock:
+            with open(self.journal_file, 'a') as out_file:
+                if self._partial_line:
+                    out_file.write('\n')
+                    self._partial_line = False
+                out_file.write(json.dumps(record) + '\n')
+                out_file.flush()
+                os.fsync(out_file.fileno())
+            self._units[(stage, unit)] = record
+
+    def completed(self, stage, unit):
+        """Returns the output files of a recorded unit if every output is unchanged since
+        it was recorded and no input still present has changed, and None otherwise."""
+        record = self._units.get((stage, unit))
+        if record is None:
+            return None
+        for path, stamp in record['outputs']:
+            if stamp is None or file_stamp(path) != stamp:
+                return None
+        for path, stamp in record['inputs']:
+            current = file_stamp(path)
+            # inputs released as intermediates are gone, which does not invalidate the unit
+            if current is not None and current != stamp:
+                return None
+        return [path for path, stamp in record['outputs']]
+
+    def completed_units(self, stage):
+        """Returns the output files of every unchanged recorded unit of a stage, by unit."""
+        units = {}
+        for (unit_stage, unit) in list(self._units):
+            if unit_stage == stage:
+                outputs = self.completed(stage, unit)
+                if outputs is not None:
+                    units[unit] = outputs
+        return units
+
+    def skip(self, stage, unit):
+        """Returns True, and counts the unit as skipped, if a unit is already completed."""
+        if self.completed(stage, unit) is None:
+            return False
+        with self._lock:
+            self.skipped += 1
+        return True
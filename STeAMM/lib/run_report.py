@@ -0,0 +1,170 @@
+#-------------------------------------------------------------------------------
+# Name:         run_report.py
+#
+# Summary:      Timing and throughput of the stages of a STeAMM run. Stages record the
+#               time they spend on each item (i.e. a granule, a date, or a table), and the
+#               bytes they read and write, into the run report of the process. At the end
+#               of a run, the report is written as JSON and printed as a summary table.
+#
+#                   with run_report.timed('preprocess.convert_hdf') as stage:
+#                       ...
+#                       stage.add(1, bytes_read=in_size, bytes_written=out_size)
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Bytes in a megabyte, for the summary table
+MB = 1024.0 * 1024.0
+
+
+def file_size(*paths):
+    """Returns the total size of the files that exist, in bytes."""
+    size = 0
+    for path in paths:
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
+
+
+class StageStats(object):
+    """Time spent, items processed and bytes read and written by one stage. The time is
+    the sum of the time spent in the stage, so stages running in parallel (i.e. streaming
+    preprocess stages) each report their own busy time; wall_seconds spans the first
+    start to the last end of the stage."""
+
+    def __init__(self, name, lock):
+        self.name = name
+        self.calls = 0
+        self.items = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = lock
+
+    def add(self, items=0, bytes_read=0, bytes_written=0):
+        """Counts items processed and bytes read and written by the stage."""
+        with self._lock:
+            self.items += items
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+
+    def add_time(self, start, end):
+        with self._lock:
+            self.calls += 1
+            self.seconds += end - start
+            if self.first_start is None or start < self.first_start:
+                self.first_start = start
+            if self.last_end is None or end > self.last_end:
+                self.last_end = end
+
+    def to_dict(self):
+        wall_seconds = (self.last_end - self.first_start) if self.calls else 0.0
+        return {'stage': self.name, 'calls': self.calls, 'items': self.items,
+                'seconds': round(self.seconds, 3), 'wall_seconds': round(wall_seconds, 3),
+                'bytes_read': self.bytes_read, 'bytes_written': self.bytes_written,
+                'items_per_second': round(self.items / self.seconds, 3) if self.seconds else None,
+                'mb_per_second': round((self.bytes_read + self.bytes_written) / MB / self.seconds, 3)
+                if self.seconds else None}
+
+
+class RunReport(object):
+    """The stage statistics of a run, in the order the stages first ran."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._stages = []
+        self._by_name = {}
+        self._lock = threading.RLock()
+
+    def stage(self, name):
+        """Returns the statistics of a stage, adding the stage if it is new."""
+        with self._lock:
+            if name not in self._by_name:
+                self._by_name[name] = StageStats(name, self._lock)
+                self._stages.append(self._by_name[name])
+            return self._by_name[name]
+
+    @contextmanager
+    def timed(self, name):
+        """Times the enclosed block as one call of a stage, yielding the stage statistics."""
+        stats = self.stage(name)
+        start = time.time()
+        try:
+            yield stats
+        finally:
+            stats.add_time(start, time.time())
+
+    def add(self, name, items=0, bytes_read=0, bytes_written=0):
+        """Counts items and bytes of a stage, without timing them."""
+        self.stage(name).add(items, bytes_read, bytes_written)
+
+    def to_dict(self):
+        with self._lock:
+            return {'started': self.started, 'wall_seconds': round(time.time() - self.started, 3),
+                    'stages': [s.to_dict() for s in self._stages]}
+
+    def write(self, out_file):
+        """Writes the report to a JSON file. Returns the file."""
+        out_dir = os.path.dirname(os.path.abspath(out_file))
+        if not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+        with open(out_file, 'w') as out_json:
+            json.dump(self.to_dict(), out_json, indent=2)
+        return out_file
+
+    def summary(self):
+        """Returns a table of the stage statistics, one stage per line."""
+        report = self.to_dict()
+        lines = ['%-36s %7s %10s %10s %10s %10s' % ('Stage', 'Items', 'Seconds', 'Items/s', 'MB read', 'MB written')]
+        for s in report['stages']:
+            lines.append('%-36s %7d %10.1f %10s %10.1f %10.1f' %
+                         (s['stage'], s['items'], s['seconds'],
+                          '%.2f' % s['items_per_second'] if s['items_per_second'] is not None else '-',
+                          s['bytes_read'] / MB, s['bytes_written'] / MB))
+        lines.append('Total run time: %.1f seconds' % report['wall_seconds'])
+        return '\n'.join(lines)
+
+
+# Run report of this process
+_report = RunReport()
+
+
+def current():
+    """Returns the run report of this process."""
+    return _report
+
+
+def reset():
+    """Starts a new run report for this process, and returns it."""
+    global _report
+    _report = RunReport()
+    return _report
+
+
+def timed(name):
+    """Times the enclosed block as one call of a stage of the current run report."""
+    return _report.timed(name)
+
+
+def add(name, items=0, bytes_read=0, bytes_written=0):
+    """Counts items and bytes of a stage of the current run report."""
+    _report.add(name, items, bytes_read, bytes_written)
+
@@ -0,0 +1,140 @@
+#-------------------------------------------------------------------------------
+# Name:         spatial_index.py
+#
+# Summary:      In-memory spatial index joining points (i.e. stream reach midpoints) to the
+#               polygons (i.e. RCAs) that contain them. Polygon extents are binned into a
+#               uniform grid with array operations, so each point is only tested against
+#               the polygons whose extent contains it, without querying the data source
+#               once per point or writing an index next to the input shapefile.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import numpy as np
+
+# Upper bound of the number of grid bins, to bound memory use for very uneven extents
+MAX_BINS = 1000000
+
+
+def _expand(starts, counts):
+    """Returns the index of each element of consecutive ranges [start, start + count), and
+    the range each element belongs to."""
+    counts = np.maximum(np.asarray(counts, dtype=np.int64), 0)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts, counts) + np.arange(counts.sum()) - np.repeat(offsets, counts), owner
+
+
+class ExtentIndex(object):
+    """A uniform grid of bins over polygon extents.
+
+    :param extents: Array of polygon extents, one (min x, max x, min y, max y) row per
+        polygon, as returned by OGR's GetEnvelope.
+    :type extents: numpy.ndarray
+    :param cell_size: Width and height of the grid bins. Defaults to the median extent
+        width or height, so a typical extent falls in a few bins.
+    :type cell_size: float
+    """
+
+    def __init__(self, extents, cell_size=None):
+        self.extents = np.asarray(extents, dtype=np.float64).reshape(-1, 4)
+        minx, maxx, miny, maxy = self.extents.T
+        if len(self.extents) == 0:
+            self.origin = (0.0, 0.0)
+            self.cell_size = 1.0
+            self.shape = (0, 0)
+            self.bins = np.zeros(0, dtype=np.int64)
+            self.zones = np.zeros(0, dtype=np.int64)
+            return
+        self.origin = (minx.min(), miny.min())
+        width = maxx.max() - self.origin[0]
+        height = maxy.max() - self.origin[1]
+        if cell_size is None:
+            cell_size = np.median(np.r_[maxx - minx, maxy - miny])
+        # never more than MAX_BINS bins, and never a zero size for point-like extents
+        cell_size = max(cell_size, np.sqrt(width * height / float(MAX_BINS)), 1e-9 * max(width, height, 1.0))
+        self.cell_size = cell_size
+        self.shape = (int(height // cell_size) + 1, int(width // cell_size) + 1)
+
+        col0, row0 = self._cell(minx, miny)
+        col1, row1 = self._cell(maxx, maxy)
+        n_cols = col1 - col0 + 1
+        local, zones = _expand(np.zeros(len(n_cols), dtype=np.int64), n_cols * (row1 - row0 + 1))
+        rows = row0[zones] + local // n_cols[zones]
+        cols = col0[zones] + local % n_cols[zones]
+        bins = rows * self.shape[1] + cols
+        order = np.argsort(bins, kind='mergesort')
+        self.bins = bins[order]
+        self.zones = zones[order]
+
+    def _cell(self, xs, ys):
+        cols = np.floor((np.asarray(xs, dtype=np.float64) - self.origin[0]) / self.cell_size).astype(np.int64)
+        rows = np.floor((np.asarray(ys, dtype=np.float64) - self.origin[1]) / self.cell_size).astype(np.int64)
+        return np.clip(cols, 0, self.shape[1] - 1), np.clip(rows, 0, self.shape[0] - 1)
+
+    def candidates(self, xs, ys):
+        """Returns the (point, polygon) index pairs of every point inside a polygon extent,
+        sorted by point, then polygon."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if len(self.bins) == 0 or len(xs) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        cols, rows = self._cell(xs, ys)
+        bins = rows * self.shape[1] + cols
+        lo = np.searchsorted(self.bins, bins, 'left')
+        hi = np.searchsorted(self.bins, bins, 'right')
+        pos, points = _expand(lo, hi - lo)
+        zones = self.zones[pos]
+        minx, maxx, miny, maxy = self.extents[zones].T
+        inside = (xs[points] >= minx) & (xs[points] <= maxx) & (ys[points] >= miny) & (ys[points] <= maxy)
+        points, zones = points[inside], zones[inside]
+        order = np.lexsort((zones, points))
+        return points[order], zones[order]
+
+
+def join_points(xs, ys, extents, contains, cell_size=None):
+    """Finds the polygon containing each point.
+
+    Parameters
+    ----------
+    xs, ys: sequence
+        Point coordinates.
+    extents: numpy.ndarray
+        Polygon extents, one (min x, max x, min y, max y) row per polygon.
+    contains: callable
+        contains(point, polygon) tests whether the polygon with index `polygon` contains
+        the point with index `point`. Only called for points inside the polygon's extent.
+    cell_size: float
+        Width and height of the index bins, see ExtentIndex.
+
+    Returns
+    -------
+    The index of the first polygon containing each point, or -1.
+    """
+    points, zones = ExtentIndex(extents, cell_size).candidates(xs, ys)
+    point_zones = np.full(len(xs), -1, dtype=np.int64)
+    for point, zone in zip(points, zones):
+        if point_zones[point] < 0 and contains(point, zone):
+            point_zones[point] = zone
+    return point_zones
+
+
+def save_join(out_file, point_ids, zone_ids):
+    """Saves the zone ID of each point ID (i.e. the RCA of each reach) to a numpy .npz file."""
+    np.savez(out_file, reach_ids=np.asarray(point_ids, dtype=np.int64),
+             reach_rca_ids=np.asarray(zone_ids, dtype=np.int64))
+    return out_file
+
+
+def load_join(in_file):
+    """Loads the point IDs and zone IDs saved by `save_join`."""
+    npz = np.load(in_file)
+    return npz['reach_ids'], npz['reach_rca_ids']
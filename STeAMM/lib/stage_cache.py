@@ -0,0 +1,263 @@
+#-------------------------------------------------------------------------------
+# Name:         stage_cache.py
+#
+# Summary:      Content-addressed cache of preprocessing stage outputs. Each output is keyed
+#               on a hash of the stage name and version, the stage parameters (i.e. SRS and
+#               resolution) and the contents of its input files (i.e. HDF granules, cutline
+#               shapefiles, and the sources of VRT mosaics). A stage whose key is cached
+#               restores its outputs instead of recomputing them. The least recently used
+#               entries are evicted to keep the cache under a size budget.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import re
+import json
+import time
+import errno
+import shutil
+import hashlib
+import threading
+
+# Version of the cache layout and keys; changing it invalidates every cached entry
+CACHE_VERSION = 1
+
+# Default size budget of a cache, in bytes
+MAX_BYTES = 20 * 1024 ** 3
+
+# Name of the file describing a cache entry
+ENTRY_FILE = 'entry.json'
+
+# Name of the file remembering the digests of input files by path, size and modification time
+DIGESTS_FILE = 'digests.json'
+
+# Bytes read at a time when hashing files
+READ_SIZE = 1024 * 1024
+
+# Source files referenced by a VRT mosaic
+VRT_SOURCE = re.compile(r'<SourceFilename relativeToVRT="(\d)"[^>]*>([^<]+)</SourceFilename>')
+
+# Files making up a shapefile
+SHAPEFILE_EXTS = ('.shp', '.shx', '.dbf', '.prj')
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def _link_or_copy(src, dst):
+    """Hard links src to dst where possible, and copies it otherwise."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except (OSError, AttributeError):
+        shutil.copy2(src, dst)
+
+
+class StageCache(object):
+    """A size-capped cache of stage output files in a directory.
+
+    Entries are written to a temporary directory and renamed into place, so processes
+    sharing a cache (i.e. sharded workers) never see partial entries. A cache can be
+    shared by the threads of a streaming pipeline.
+
+    :param cache_dir: Cache directory, created if it does not exist.
+    :type cache_dir: str
+
+    :param max_bytes: Size budget of the cache, in bytes.
+    :type max_bytes: int
+    """
+
+    def __init__(self, cache_dir, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        _makedirs(cache_dir)
+        self._digests = None
+        self._digests_changed = False
+        # size of the cache as last scanned, plus the entries stored since
+        self._total = None
+        self._lock = threading.RLock()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _load_digests(self):
+        if self._digests is None:
+            try:
+                with open(os.path.join(self.cache_dir, DIGESTS_FILE), 'r') as in_file:
+                    self._digests = json.load(in_file)
+            except (IOError, OSError, ValueError):
+                self._digests = {}
+        return self._digests
+
+    def _save_digests(self):
+        tmp_file = os.path.join(self.cache_dir, '%s.%d.tmp' % (DIGESTS_FILE, os.getpid()))
+        with open(tmp_file, 'w') as out_file:
+            json.dump(self._digests, out_file)
+        getattr(os, 'replace', os.rename)(tmp_file, os.path.join(self.cache_dir, DIGESTS_FILE))
+
+    def file_digest(self, path):
+        """Returns the SHA-1 digest of a file's contents. Digests are remembered by path,
+        size and modification time, so unchanged files are only read once. The digest of
+        a VRT file includes the digests of its source files."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digests = self._load_digests()
+        stamp = '%d:%d' % (stat.st_size, int(stat.st_mtime * 1000))
+        if path not in digests or digests[path][0] != stamp:
+            sha1 = hashlib.sha1()
+            with open(path, 'rb') as in_file:
+                for block in iter(lambda: in_file.read(READ_SIZE), b''):
+                    sha1.update(block)
+            digests[path] = [stamp, sha1.hexdigest()]
+            self._digests_changed = True
+        if not path.lower().endswith('.vrt'):
+            return digests[path][1]
+        # sources may change without the VRT changing, so their digests are not remembered in it
+        sha1 = hashlib.sha1(digests[path][1].encode('utf-8'))
+        with open(path, 'r') as in_file:
+            for relative, source in VRT_SOURCE.findall(in_file.read()):
+                if relative == '1':
+                    source = os.path.join(os.path.dirname(path), source)
+                if os.path.exists(source):
+                    sha1.update(self.file_digest(source).encode('utf-8'))
+        return sha1.hexdigest()
+
+    def shapefile_digest(self, in_shp):
+        """Returns a digest of the files making up a shapefile."""
+        base = os.path.splitext(in_shp)[0]
+        parts = [self.file_digest(base + ext) for ext in SHAPEFILE_EXTS if os.path.exists(base + ext)]
+        return hashlib.sha1(''.join(parts).encode('utf-8')).hexdigest()
+
+    def key(self, stage, inputs=(), params=None):
+        """Returns the cache key of a stage run: a hash of the stage name, the parameters
+        (a JSON serializable dict, i.e. including a stage version) and the digests of the
+        input files."""
+        with self._lock:
+            parts = {'cache_version': CACHE_VERSION, 'stage': stage, 'params': params or {},
+                     'inputs': [self.file_digest(f) for f in inputs]}
+            if self._digests_changed:
+                self._save_digests()
+                self._digests_changed = False
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def restore(self, key, out_files):
+        """Restores the cached outputs of a key to the out_files paths, in the order they
+        were stored. Returns True on a cache hit, and False otherwise."""
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE), 'r') as in_file:
+                entry = json.load(in_file)
+            if len(entry['files']) != len(out_files):
+                raise ValueError("Cached entry has %d files" % len(entry['files']))
+            for name, out_file in zip(entry['files'], out_files):
+                _makedirs(os.path.dirname(os.path.abspath(out_file)))
+                _link_or_copy(os.path.join(entry_dir, name), out_file)
+            os.utime(os.path.join(entry_dir, ENTRY_FILE), None)
+        except (IOError, OSError, ValueError, KeyError):
+            # missing, or evicted by another process while restoring
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, out_files, stage=''):
+        """Adds the output files of a key to the cache, then evicts least recently used
+        entries if the cache is over its size budget."""
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            return entry_dir
+        tmp_dir = '%s.%d.%d.tmp' % (entry_dir, os.getpid(), threading.current_thread().ident)
+        _makedirs(tmp_dir)
+        names = []
+        size = 0
+        for i, out_file in enumerate(out_files):
+            name = '%d_%s' % (i, os.path.basename(out_file))
+            _link_or_copy(out_file, os.path.join(tmp_dir, name))
+            names.append(name)
+            size += os.path.getsize(out_file)
+        with open(os.path.join(tmp_dir, ENTRY_FILE), 'w') as out_file:
+            json.dump({'stage': stage, 'files': names, 'size': size, 'created': time.time()}, out_file)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # stored by another process meanwhile
+            return entry_dir
+        with self._lock:
+            if self._total is None:
+                self._total = self.size()
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self.evict()
+        return entry_dir
+
+    def entries(self):
+        """Returns (last used time, size, entry directory) of every cache entry."""
+        entries = []
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_file = os.path.join(prefix_dir, key, ENTRY_FILE)
+                try:
+                    with open(entry_file, 'r') as in_file:
+                        size = json.load(in_file)['size']
+                    entries.append((os.path.getmtime(entry_file), size, os.path.join(prefix_dir, key)))
+                except (IOError, OSError, ValueError, KeyError):
+                    continue
+        return entries
+
+    def size(self):
+        """Returns the total size of the cached files, in bytes."""
+        return sum(size for used, size, entry_dir in self.entries())
+
+    def evict(self, max_bytes=None):
+        """Removes least recently used entries until the cache fits its size budget.
+        Returns the number of entries removed."""
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for used, size, entry_dir in entries)
+        n_removed = 0
+        for used, size, entry_dir in entries:
+            if total <= max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            n_removed += 1
+        self._total = total
+        return n_removed
+
+    def run(self, stage, inputs, params, out_files, function, *args):
+        """Restores the outputs of a stage run from the cache, or calls function(*args) to
+        create out_files and caches them. Returns True if the outputs were restored."""
+        key = self.key(stage, inputs, params)
+        if self.restore(key, out_files):
+            return True
+        # outputs may be hard links into the cache, which must not be written in place
+        for out_file in out_files:
+            if os.path.exists(out_file):
+                os.remove(out_file)
+        function(*args)
+        self.store(key, out_files, stage)
+        return False
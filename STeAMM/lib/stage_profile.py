@@ -0,0 +1,225 @@
+#-------------------------------------------------------------------------------
+# Name:         stage_profile.py
+#
+# Summary:      Opt-in profiling of chosen pipeline stages. Stages named in the STEAMM_PROFILE
+#               environment variable (comma separated, or 'all'), or in the 'profile' key of a
+#               run config, are run under cProfile and tracemalloc. For each stage, the
+#               accumulated profile is written to <stage>.prof (readable with pstats or
+#               snakeviz), the peak traced memory to <stage>.memory.json, and a tracemalloc
+#               snapshot taken after the call with the highest peak to <stage>.snapshot.
+#               Files go to STEAMM_PROFILE_DIR, or the project's temp directory in batch
+#               runs. Python 2 has no tracemalloc, so there the peak is how much a call
+#               raised the process's peak resident set size (ru_maxrss, on Unix): 0 for
+#               calls peaking below an earlier peak. The method used is written as
+#               'memory_method' ('tracemalloc', 'ru_maxrss', or null if neither is there).
+#               Either measures the whole process, so profiled calls run one at a time,
+#               and tracemalloc only runs while a profiled call does; memory allocated by
+#               stages that are not profiled, in other pipeline threads, is still counted.
+#               Profile all stages, or run with max_in_flight 1, for exact peaks.
+#
+#                   STEAMM_PROFILE=LST_to_csv,build_interpl_table,interpolate_lst python batch.py basin.json
+#
+#               When no stage is profiled, profiled() returns stage functions unchanged.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import sys
+import json
+import atexit
+import tempfile
+import threading
+import functools
+import cProfile
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+# Environment variables naming the stages to profile, and the directory to write to
+PROFILE_ENV = 'STEAMM_PROFILE'
+PROFILE_DIR_ENV = 'STEAMM_PROFILE_DIR'
+
+# Value profiling every stage
+ALL_STAGES = 'all'
+
+# How the peak memory of profiled calls is measured
+if tracemalloc is not None:
+    MEMORY_METHOD = 'tracemalloc'
+elif resource is not None:
+    MEMORY_METHOD = 'ru_maxrss'
+else:
+    MEMORY_METHOD = None
+
+# Profiled stage names (None if profiling is off), and the output directory
+_stages = None
+_out_dir = None
+
+# Profile and memory statistics of each profiled stage
+_profiles = {}
+_memory = {}
+_lock = threading.Lock()
+
+# Whether tracemalloc was started here, rather than by the user
+_tracing = False
+
+# Profiled calls run one at a time, so their memory peaks are their own. Reentrant, for
+# profiled stages called by profiled stages.
+_call_lock = threading.RLock()
+_active = 0
+
+
+def parse_stages(value):
+    """Returns the set of stage names in a comma separated string or list, or None if empty."""
+    if not value:
+        return None
+    if isinstance(value, (str, type(u''))):
+        value = value.split(',')
+    stages = set(str(s).strip() for s in value if str(s).strip())
+    return stages or None
+
+
+def configure(stages=None, out_dir=None, environ=None):
+    """Chooses the stages to profile, and where to write their profiles. Stages and the
+    directory default to the STEAMM_PROFILE and STEAMM_PROFILE_DIR environment variables;
+    the directory then defaults to a steamm_profile directory in the system temp directory.
+    Statistics of previously profiled stages are discarded. Returns the set of profiled
+    stages, or None if profiling is off."""
+    global _stages, _out_dir, _tracing
+    with _lock:
+        _profiles.clear()
+        _memory.clear()
+        if _tracing:
+            tracemalloc.stop()
+            _tracing = False
+    if environ is None:
+        environ = os.environ
+    _stages = parse_stages(stages) or parse_stages(environ.get(PROFILE_ENV))
+    _out_dir = environ.get(PROFILE_DIR_ENV) or out_dir or os.path.join(tempfile.gettempdir(), 'steamm_profile')
+    return _stages
+
+
+def max_rss():
+    """Returns the peak resident set size of the process so far, in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes, except on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def enabled(stage):
+    """Returns True if a stage is profiled."""
+    return _stages is not None and (stage in _stages or ALL_STAGES in _stages)
+
+
+def _call(stage, function, *args, **kwargs):
+    global _tracing, _active
+    method = MEMORY_METHOD
+    with _call_lock:
+        with _lock:
+            if stage not in _profiles:
+                _profiles[stage] = cProfile.Profile()
+                _memory[stage] = {'stage': stage, 'calls': 0, 'peak_bytes': None, 'memory_method': method}
+            profile = _profiles[stage]
+            if method == 'tracemalloc' and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing = True
+            _active += 1
+        if method == 'tracemalloc' and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        rss_before = max_rss() if method == 'ru_maxrss' else None
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is active in this process (Python 3.12+ allows only one)
+            profile = None
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            with _lock:
+                _active -= 1
+                memory = _memory[stage]
+                memory['calls'] += 1
+                if method == 'ru_maxrss':
+                    peak = max_rss() - rss_before
+                    if memory['peak_bytes'] is None or peak > memory['peak_bytes']:
+                        memory['peak_bytes'] = peak
+                elif method == 'tracemalloc':
+                    peak = tracemalloc.get_traced_memory()[1]
+                    if memory['peak_bytes'] is None or peak > memory['peak_bytes']:
+                        memory['peak_bytes'] = peak
+                        _makedirs(_out_dir)
+                        tracemalloc.take_snapshot().dump(os.path.join(_out_dir, '%s.snapshot' % stage))
+                    if _tracing and _active == 0:
+                        # tracing slows every allocation, so it only runs during profiled calls
+                        tracemalloc.stop()
+                        _tracing = False
+
+
+def profiled(stage, function):
+    """Returns function wrapped to run under cProfile and tracemalloc if the stage is
+    profiled, and function itself otherwise."""
+    if not enabled(stage):
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return _call(stage, function, *args, **kwargs)
+    return wrapper
+
+
+def profile(stage):
+    """Decorates a stage function to be profiled when its stage is. Whether the stage is
+    profiled is checked at each call, as profiling is configured after modules are imported."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled(stage):
+                return function(*args, **kwargs)
+            return _call(stage, function, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _makedirs(path):
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+
+def write():
+    """Writes the profile and peak memory of every stage profiled so far. Returns the
+    files written."""
+    out_files = []
+    with _lock:
+        if not _profiles:
+            return out_files
+        _makedirs(_out_dir)
+        for stage in sorted(_profiles):
+            prof_file = os.path.join(_out_dir, '%s.prof' % stage)
+            _profiles[stage].dump_stats(prof_file)
+            memory_file = os.path.join(_out_dir, '%s.memory.json' % stage)
+            with open(memory_file, 'w') as out_json:
+                json.dump(_memory[stage], out_json, indent=2)
+            out_files += [prof_file, memory_file]
+    return out_files
+
+
+# Profiling is configured from the environment, until a run config configures it again
+configure()
+atexit.register(write)
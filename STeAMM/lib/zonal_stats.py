@@ -0,0 +1,192 @@
+#-------------------------------------------------------------------------------
+# Name:         zonal_stats.py
+#
+# Summary:      Zonal statistics of gridded land surface temperature (LST) values for drainage
+#               polygons (i.e. RCAs). Polygons are represented by an integer label per grid cell,
+#               so per-polygon daily statistics are computed with array reductions over the
+#               pixel x day LST array, without building vector geometry per grid cell. Area
+#               weighted statistics use a sparse polygon x pixel matrix of covered areas.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import numpy as np
+
+# Number of pixel rows reduced at a time, to bound peak memory use
+CHUNK_SIZE = 20000
+
+# Number of days multiplied by the weight matrix at a time, to bound peak memory use
+DAY_CHUNK_SIZE = 32
+
+
+def grid_index(xs, ys, geotransform, grid_shape):
+    """Returns the flat (row-major) grid cell index of each x, y coordinate on a north-up grid.
+    Coordinates outside of the grid are assigned -1."""
+    cols = np.floor((np.asarray(xs) - geotransform[0]) / geotransform[1]).astype(np.int64)
+    rows = np.floor((np.asarray(ys) - geotransform[3]) / geotransform[5]).astype(np.int64)
+    n_rows, n_cols = grid_shape
+    inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+    return np.where(inside, rows * n_cols + cols, -1)
+
+
+def label_index(zone_ids, label_ids):
+    """Converts zone ID values burned into a label grid into sequential labels, where
+    label i + 1 is the zone `zone_ids[i]` and label 0 is outside of all zones."""
+    zone_ids = np.asarray(zone_ids)
+    label_ids = np.asarray(label_ids)
+    order = np.argsort(zone_ids)
+    pos = np.clip(np.searchsorted(zone_ids[order], label_ids), 0, len(zone_ids) - 1)
+    found = zone_ids[order][pos] == label_ids
+    return np.where(found, order[pos] + 1, 0)
+
+
+def zonal_sum(lst_array, labels, n_labels, chunk_size=CHUNK_SIZE):
+    """Sums the valid (non-NaN) LST values and counts them per label and day.
+
+    Parameters
+    ----------
+    lst_array: numpy.ndarray
+        2D array of LST values, one row per pixel and one column per date.
+    labels: numpy.ndarray
+        Label of each pixel, from 1 to `n_labels`. Pixels labelled 0 are ignored.
+    n_labels: int
+        Number of labels (zones).
+    chunk_size: int
+        Number of pixel rows reduced at a time.
+
+    Returns
+    -------
+    Two label x day arrays, with the sum and the count of valid values.
+    """
+    n_days = lst_array.shape[1]
+    labels = np.asarray(labels, dtype=np.int64)
+    size = (n_labels + 1) * n_days
+    day_idx = np.arange(n_days)
+    zone_sum = np.zeros(size)
+    zone_count = np.zeros(size)
+    for start in range(0, lst_array.shape[0], chunk_size):
+        stop = start + chunk_size
+        lst_chunk = lst_array[start:stop]
+        valid = ~np.isnan(lst_chunk)
+        bins = (labels[start:stop, np.newaxis] * n_days + day_idx)[valid]
+        zone_sum += np.bincount(bins, weights=lst_chunk[valid], minlength=size)
+        zone_count += np.bincount(bins, minlength=size)
+    zone_sum = zone_sum.reshape(n_labels + 1, n_days)[1:]
+    zone_count = zone_count.reshape(n_labels + 1, n_days)[1:]
+    return zone_sum, zone_count
+
+
+def zonal_mean(lst_array, labels, n_labels, chunk_size=CHUNK_SIZE):
+    """Returns a label x day array of mean LST values, which is NaN where a label has
+    no valid values on a day. See `zonal_sum` for parameters."""
+    zone_sum, zone_count = zonal_sum(lst_array, labels, n_labels, chunk_size)
+    zone_mean = np.full(zone_sum.shape, np.nan)
+    has_values = zone_count > 0
+    zone_mean[has_values] = zone_sum[has_values] / zone_count[has_values]
+    return zone_mean
+
+
+def strip_weights(fine_labels, factor, row_offset, n_cols):
+    """Measures the fraction of each grid cell covered by each label in a strip of grid rows.
+
+    Parameters
+    ----------
+    fine_labels: numpy.ndarray
+        Label grid rasterized at `factor` times the grid resolution, covering
+        whole grid rows. Label 0 is outside of all zones.
+    factor: int
+        Number of sub-cells per grid cell, along each axis.
+    row_offset: int
+        Index of the first grid row covered by the strip.
+    n_cols: int
+        Number of columns in the grid.
+
+    Returns
+    -------
+    Zone index (label - 1), flat grid cell index and covered fraction of each
+    non-empty zone x cell pair.
+    """
+    fine_rows, fine_cols = np.indices(fine_labels.shape)
+    cells = (fine_rows // factor + row_offset) * n_cols + fine_cols // factor
+    inside = fine_labels > 0
+    n_cells = (row_offset + fine_labels.shape[0] // factor) * n_cols
+    keys = (fine_labels[inside].astype(np.int64) - 1) * n_cells + cells[inside]
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys // n_cells, keys % n_cells, counts / float(factor * factor)
+
+
+def build_weight_matrix(zone_idx, cell_idx, weights, n_zones):
+    """Assembles zone x cell weight triples into a sparse (coordinate format) weight
+    matrix, stored as a dict of arrays sorted by zone."""
+    zone_idx = np.asarray(zone_idx, dtype=np.int64)
+    order = np.argsort(zone_idx, kind='mergesort')
+    return {'zone_idx': zone_idx[order],
+            'cell_idx': np.asarray(cell_idx, dtype=np.int64)[order],
+            'weights': np.asarray(weights, dtype=np.float64)[order],
+            'n_zones': n_zones}
+
+
+def select_cells(weight_matrix, cell_idx):
+    """Re-indexes the columns of a weight matrix from grid cells to rows of a pixel x day
+    array, given the grid cell index of each row. Cells without a row are dropped."""
+    n_cells = np.max(np.r_[weight_matrix['cell_idx'], cell_idx, 0]) + 1
+    row_of_cell = np.full(n_cells, -1, dtype=np.int64)
+    in_grid = np.asarray(cell_idx) >= 0
+    row_of_cell[np.asarray(cell_idx)[in_grid]] = np.nonzero(in_grid)[0]
+    rows = row_of_cell[weight_matrix['cell_idx']]
+    keep = rows >= 0
+    return {'zone_idx': weight_matrix['zone_idx'][keep],
+            'cell_idx': rows[keep],
+            'weights': weight_matrix['weights'][keep],
+            'n_zones': weight_matrix['n_zones']}
+
+
+def weighted_mean(weight_matrix, lst_array, day_chunk_size=DAY_CHUNK_SIZE):
+    """Returns a zone x day array of area weighted mean LST values.
+
+    The weighted sums of all zones are computed as one sparse matrix x dense array
+    product (per chunk of days), and divided by the summed weights of the valid
+    (non-NaN) values. The columns of `weight_matrix` must index rows of `lst_array`
+    (see `select_cells`).
+    """
+    zone_idx = weight_matrix['zone_idx']
+    n_zones = weight_matrix['n_zones']
+    n_days = lst_array.shape[1]
+    zone_mean = np.full((n_zones, n_days), np.nan)
+    if len(zone_idx) == 0:
+        return zone_mean
+    # start of each zone's run of entries in the zone-sorted matrix
+    starts = np.flatnonzero(np.r_[True, zone_idx[1:] != zone_idx[:-1]])
+    zones = zone_idx[starts]
+    weights = weight_matrix['weights'][:, np.newaxis]
+    for start in range(0, n_days, day_chunk_size):
+        stop = start + day_chunk_size
+        values = lst_array[weight_matrix['cell_idx'], start:stop]
+        valid = ~np.isnan(values)
+        val_sum = np.add.reduceat(np.where(valid, values, 0.0) * weights, starts, axis=0)
+        wgt_sum = np.add.reduceat(valid * weights, starts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            zone_mean[zones, start:stop] = np.where(wgt_sum > 0, val_sum / wgt_sum, np.nan)
+    return zone_mean
+
+
+def save_weight_matrix(weight_matrix, out_file):
+    """Saves a weight matrix to a numpy .npz file."""
+    np.savez(out_file, **weight_matrix)
+    return out_file
+
+
+def load_weight_matrix(in_file):
+    """Loads a weight matrix saved by `save_weight_matrix`."""
+    npz = np.load(in_file)
+    weight_matrix = dict((key, npz[key]) for key in npz.files)
+    weight_matrix['n_zones'] = int(weight_matrix['n_zones'])
+    return weight_matrix
@@ -24,13 +24,29 @@
 # Import modules
 import os
 import shutil
-from osgeo import ogr
+import csv
+import hashlib
+import numpy as np
+from osgeo import gdal, ogr, osr
+from lib import gap_fill
+from lib import zonal_stats
+from lib import lst_store
+from lib import lst_model
+from lib import model_select
+from lib import spatial_index
+from lib import gpkg_writer
+from lib import run_report
+from lib import run_journal
+from lib import stage_profile
 
 # Input variables
 
 # Stream network shapefile to which interpolated temperatures will be attached
 geo_strm = ""
 
+# Observed stream temperature csv table (RCA ID, YYYYDDD date, temperature) used to fit models
+csv_obs = ""
+
 
 # TODO move functions to new STeAMM utility module and class
 
@@ -110,57 +126,525 @@ def predict_create_year_folders(year_list, input_dir, dir_list, source_subdir_li
 
 # TODO predict_temp module starts here ---------------------------------------------------------------------
 
-# interpolate missing LST values
+# read LST interpolation table into arrays
+def read_lst_table(lst_csv):
+    """Reads the LST interpolation table built by preprocess.build_interpl_table.
+    Returns the header, an array of cell attributes (UID, X, Y), and a pixel x day
+    array of LST values."""
+    print "Reading LST table..."
+    with open(lst_csv, 'rb') as in_csv:
+        header = next(csv.reader(in_csv))
+    table = np.loadtxt(lst_csv, delimiter=',', skiprows=1, ndmin=2)
+    return header, table[:, :3], table[:, 3:]
+
+
+# write LST values and cell attributes to a csv table
+def write_lst_table(out_csv, header, cell_array, lst_array):
+    """Writes cell attributes (UID, X, Y) and a pixel x day array of LST values
+    to a csv table with the same layout as the LST interpolation table."""
+    print "Writing LST table..."
+    fmt = ['%d', '%f', '%f'] + ['%.2f'] * lst_array.shape[1]
+    np.savetxt(out_csv, np.hstack((cell_array, lst_array)), fmt=fmt,
+               delimiter=',', header=','.join(header), comments='')
+    return out_csv
 
-def interpolate_lst(  ):
-    pass
-
-    ###PSEUDO-CODE
-    #open LST_value table
-    #convert to Numpy array
-    #convert zeros to NaN
-    #per row, create list of indexes of cells that are NaN
-    #use numpy.interp to do interpolation per row
-    #fill in first day of values if NaN
-    #fill in second to last day if NaN
-    #fill in last day if NaN
-    #export interpolated array to csv
+
+# interpolate missing LST values
+@stage_profile.profile('interpolate_lst')
+def interpolate_lst(lst_csv, method='linear', max_gap=gap_fill.MAX_LINEAR_GAP, chunk_size=gap_fill.CHUNK_SIZE):
+    """Fills missing (zero or nodata) values in the LST interpolation table. The 'linear'
+    method interpolates between the nearest valid dates of each cell, filling values before
+    the first or after the last valid date with the nearest valid value. The 'harmonic'
+    method fills gaps from an annual harmonic curve fitted to each cell, and the 'hybrid'
+    method only uses the harmonic curve for gaps longer than max_gap days."""
+    print "Interpolating missing LST values..."
+    header, cell_array, lst_array = read_lst_table(lst_csv)
+    days = np.array([int(d) for d in header[3:]], dtype=np.float64)
+    lst_array = gap_fill.to_nan(lst_array)
+    intrp_array = gap_fill.fill_gaps(lst_array, days, method, max_gap, chunk_size=chunk_size)
+    intrp_lst_csv = '%s_%s.%s' % (os.path.splitext(lst_csv)[0], 'intrp', 'csv')
+    write_lst_table(intrp_lst_csv, header, cell_array, intrp_array)
     return intrp_lst_csv
 
-# convert interpolated LST csv table to grid
-def convert_to_grid( ):
-    pass
-    return grid
+# rasterize drainage polygons onto the LST grid
+def rasterize_polygons(in_ply, ref_raster, id_field):
+    """Burns the drainage polygons (i.e. RCAs) onto the grid of a reprojected LST geotiff,
+    once, as an integer label grid. Label i + 1 is the polygon with ID rca_ids[i], and
+    label 0 marks grid cells outside of all polygons."""
+    print "Rasterizing drainage polygons onto LST grid..."
+    ref_ds = gdal.Open(ref_raster)
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+    ply_ds = driver.Open(in_ply, 0)
+    ply_lyr = ply_ds.GetLayer()
+    rca_ids = np.array([f.GetField(id_field) for f in ply_lyr], dtype=np.int64)
+    ply_lyr.ResetReading()
+
+    label_ds = gdal.GetDriverByName('MEM').Create('', ref_ds.RasterXSize, ref_ds.RasterYSize, 1, gdal.GDT_Int32)
+    label_ds.SetGeoTransform(ref_ds.GetGeoTransform())
+    label_ds.SetProjection(ref_ds.GetProjection())
+    label_ds.GetRasterBand(1).Fill(-1)
+    gdal.RasterizeLayer(label_ds, [1], ply_lyr, options=["ATTRIBUTE=%s" % id_field])
+    label_ids = label_ds.GetRasterBand(1).ReadAsArray()
+    label_grid = zonal_stats.label_index(rca_ids, label_ids)
+    return label_grid, rca_ids
 
-# convert LST grid to cell polygon dataset
-def grid_to_polygon( ):
-    pass
-    return polygon
 
-# intersect grid polygon with drainage polygons, merge all attributes
-def grid_drain_intersect( ):
-    pass
-    return polygon
+# get a signature of a shapefile, to detect changes to the dataset
+def shapefile_signature(in_shp):
+    """Returns the path, size and modification time of a shapefile and its sidecar files."""
+    signature = [os.path.abspath(in_shp)]
+    base = os.path.splitext(in_shp)[0]
+    for ext in ['.shp', '.shx', '.dbf', '.prj']:
+        if os.path.exists(base + ext):
+            stat = os.stat(base + ext)
+            signature.append((ext, stat.st_size, int(stat.st_mtime)))
+    return signature
+
+
+# build, or load from cache, the area weights of grid cells in each drainage polygon
+def pixel_weights(in_ply, ref_raster, id_field, cache_dir, factor=10):
+    """Returns a sparse drainage polygon x grid cell matrix of the fraction of each cell's
+    area covered by each polygon, and the polygon IDs. Covered fractions are measured by
+    rasterizing the polygons at factor x factor sub-cells per grid cell, one strip of grid
+    rows at a time. The matrix is cached in cache_dir for each grid and polygon dataset,
+    unless cache_dir is None."""
+    ref_ds = gdal.Open(ref_raster)
+    n_cols = ref_ds.RasterXSize
+    n_rows = ref_ds.RasterYSize
+    geotransform = ref_ds.GetGeoTransform()
+    key = [geotransform, n_rows, n_cols, ref_ds.GetProjection(), shapefile_signature(in_ply), id_field, factor]
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, 'rca_weights_%s.npz' % hashlib.sha1(repr(key)).hexdigest())
+    if cache_file is not None and os.path.exists(cache_file):
+        print "Loading cached drainage polygon area weights..."
+        weight_matrix = zonal_stats.load_weight_matrix(cache_file)
+        return weight_matrix, weight_matrix['rca_ids']
+
+    print "Calculating drainage polygon area weights..."
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+    ply_ds = driver.Open(in_ply, 0)
+    ply_lyr = ply_ds.GetLayer()
+    rca_ids = np.array([f.GetField(id_field) for f in ply_lyr], dtype=np.int64)
+    ply_lyr.ResetReading()
+
+    # limit each rasterized strip to roughly ten million sub-cells
+    strip_rows = max(1, 10000000 // (n_cols * factor * factor))
+    triples = []
+    for row_offset in range(0, n_rows, strip_rows):
+        n_strip = min(strip_rows, n_rows - row_offset)
+        fine_ds = gdal.GetDriverByName('MEM').Create('', n_cols * factor, n_strip * factor, 1, gdal.GDT_Int32)
+        fine_ds.SetGeoTransform((geotransform[0], geotransform[1] / factor, 0,
+                                 geotransform[3] + row_offset * geotransform[5], 0, geotransform[5] / factor))
+        fine_ds.SetProjection(ref_ds.GetProjection())
+        fine_ds.GetRasterBand(1).Fill(-1)
+        gdal.RasterizeLayer(fine_ds, [1], ply_lyr, options=["ATTRIBUTE=%s" % id_field])
+        fine_labels = zonal_stats.label_index(rca_ids, fine_ds.GetRasterBand(1).ReadAsArray())
+        triples.append(zonal_stats.strip_weights(fine_labels, factor, row_offset, n_cols))
+    zone_idx, cell_idx, weights = [np.concatenate(t) for t in zip(*triples)]
+    weight_matrix = zonal_stats.build_weight_matrix(zone_idx, cell_idx, weights, len(rca_ids))
+    weight_matrix['rca_ids'] = rca_ids
+    if cache_file is not None:
+        zonal_stats.save_weight_matrix(weight_matrix, cache_file)
+    return weight_matrix, rca_ids
+
+
+# locate cells of the interpolated LST csv table on the LST grid
+def convert_to_grid(cell_array, ref_raster):
+    """Returns the flat grid cell index of each row of the LST table, using the cell
+    center X and Y coordinates. Rows outside of the grid are assigned -1."""
+    print "Locating LST table cells on LST grid..."
+    ref_ds = gdal.Open(ref_raster)
+    grid_shape = (ref_ds.RasterYSize, ref_ds.RasterXSize)
+    return zonal_stats.grid_index(cell_array[:, 1], cell_array[:, 2], ref_ds.GetGeoTransform(), grid_shape)
 
 
 # calculates mean LST values per polygon record, for all daily or 8-day intervals within time period
-### one attribute field will added per day interval (i.e. 45 fields for 8-day, and ~365 fields for daily?)
-def poly_stat(in_ply, clipped_raster_list):
-    pass
-    return summarized_poly
-
-
-## Generate models (in R)
-# use Rpy2 library for Python access to R?
-# build models:
-# - per basin
-# - per RCAs
-# - with simple fixed-effects linear, include Julian day
-# - with simple fixed-effects linear, no Julian day
-# - for whole year
-# - for half years
+@stage_profile.profile('poly_stat')
+def poly_stat(in_ply, ref_raster, intrp_lst_csv, id_field, area_weighted=False, cache_dir=None):
+    """Calculates the mean LST value of each drainage polygon for every date in the
+    interpolated LST table. By default, polygons are rasterized onto the LST grid once, and
+    each grid cell counts towards the polygon containing its center. If area_weighted is
+    True, each cell is weighted by the fraction of its area inside each polygon, using the
+    weight matrix cached in cache_dir (recomputed on every call if cache_dir is None).
+    Returns the polygon IDs, the dates and a polygon x date array of mean LST values."""
+    print "Calculating mean LST values per drainage polygon..."
+    header, cell_array, lst_array = read_lst_table(intrp_lst_csv)
+    lst_array = gap_fill.to_nan(lst_array)
+    cell_idx = convert_to_grid(cell_array, ref_raster)
+    if area_weighted:
+        weight_matrix, rca_ids = pixel_weights(in_ply, ref_raster, id_field, cache_dir)
+        weight_matrix = zonal_stats.select_cells(weight_matrix, cell_idx)
+        rca_mean = zonal_stats.weighted_mean(weight_matrix, lst_array)
+    else:
+        label_grid, rca_ids = rasterize_polygons(in_ply, ref_raster, id_field)
+        labels = np.where(cell_idx >= 0, label_grid.ravel()[cell_idx], 0)
+        rca_mean = zonal_stats.zonal_mean(lst_array, labels, len(rca_ids))
+    return rca_ids, header[3:], rca_mean
+
+
+# store mean LST values per polygon in the compact RCA x date store
+def write_rca_store(store_dir, rca_ids, acq_year, acq_days, rca_mean):
+    """Merges polygon x date mean LST values from poly_stat into an RCA x date store,
+    keyed by RCA ID and YYYYDDD date. Replaces values of dates already in the store."""
+    print "Writing mean LST values to RCA store..."
+    dates = lst_store.date_keys(acq_year, acq_days)
+    return lst_store.update_store(store_dir, rca_ids, dates, rca_mean)
+
+
+# join selected dates of the RCA store to the drainage polygons, for display
+def join_rca_stats(in_ply, store_dir, id_field, dates, out_ply):
+    """Copies the drainage polygon shapefile and adds one field per requested YYYYDDD
+    date (named i.e. 'L2015001') holding the mean LST of each polygon from the RCA store.
+    Intended for displaying a limited number of dates; all dates stay in the store."""
+    print "Joining RCA store to drainage polygons..."
+    if len(dates) > 250:
+        raise ValueError("Too many dates to join to a shapefile: %d (250 maximum)" % len(dates))
+    rca_ids, store_dates, values = lst_store.read_store(store_dir)
+    missing_dates = np.setdiff1d(dates, store_dates)
+    if len(missing_dates) > 0:
+        raise ValueError("Dates not found in RCA store: %s" % str(missing_dates.tolist()))
+    date_idx = np.searchsorted(store_dates, dates)
+    row_of_id = dict((i, r) for r, i in enumerate(rca_ids.tolist()))
+    join_values = np.asarray(values[:, date_idx], dtype=np.float64)
+
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+    if os.path.exists(out_ply):
+        driver.DeleteDataSource(out_ply)
+    out_ds = driver.CopyDataSource(driver.Open(in_ply, 0), out_ply)
+    out_lyr = out_ds.GetLayer()
+    field_names = ['L%d' % d for d in dates]
+    for name in field_names:
+        field = ogr.FieldDefn(name, ogr.OFTReal)
+        field.SetPrecision(2)
+        out_lyr.CreateField(field)
+    for feature in out_lyr:
+        row = row_of_id.get(feature.GetField(id_field))
+        if row is None:
+            continue
+        for name, value in zip(field_names, join_values[row]):
+            if not np.isnan(value):
+                feature.SetField(name, float(value))
+        out_lyr.SetFeature(feature)
+    out_ds = None
+    return out_ply
+
+
+## Generate models
+# read observed stream temperatures
+def read_obs_table(obs_csv):
+    """Reads the observed stream temperature table, with one row per RCA and date, and
+    RCA ID, YYYYDDD date and temperature columns. Returns one array per column."""
+    print "Reading observed stream temperatures..."
+    obs_table = np.loadtxt(obs_csv, delimiter=',', skiprows=1, ndmin=2)
+    return obs_table[:, 0].astype(np.int64), obs_table[:, 1].astype(np.int64), obs_table[:, 2]
+
+
+# pair observed stream temperatures with the mean LST of their RCA and date
+def build_model_data(store_dir, obs_rca, obs_date, obs_temp):
+    """Looks up the mean LST of each observation's RCA and date in the RCA store.
+    Observations without an LST value are dropped. Returns a dict of model data
+    arrays: 'rca', 'date', 'jday', 'lst' and 'temp'."""
+    print "Building model data..."
+    rca_ids, dates, values = lst_store.read_store(store_dir)
+    id_order = np.argsort(rca_ids)
+    rows = id_order[np.clip(np.searchsorted(rca_ids[id_order], obs_rca), 0, len(rca_ids) - 1)]
+    cols = np.clip(np.searchsorted(dates, obs_date), 0, len(dates) - 1)
+    lst = np.asarray(values[rows, cols], dtype=np.float64)
+    keep = (rca_ids[rows] == obs_rca) & (dates[cols] == obs_date) & ~np.isnan(lst)
+    return {'rca': obs_rca[keep], 'date': obs_date[keep], 'jday': obs_date[keep] % 1000,
+            'lst': lst[keep], 'temp': obs_temp[keep]}
+
+
+# fit linear stream temperature models
+def fit_models(model_data, per_rca=True, use_jday=True, half_years=False):
+    """Fits a fixed-effects linear model of stream temperature for each group of
+    observations: per RCA or for the whole basin, with or without julian day as a
+    covariate, and for the whole year or separately for each half year. The design
+    matrix is built once and all groups are fitted in one batched least-squares solve.
+    Returns the lst_model.fit_groups results, with the RCA ID (0 for the basin) and
+    half year (0 for the whole year) of each group as 'group_keys'."""
+    print "Fitting stream temperature models..."
+    group_keys, groups = lst_model.model_groups(model_data['rca'], model_data['jday'], per_rca, half_years)
+    jday = model_data['jday'] if use_jday else None
+    X = lst_model.design_matrix(model_data['lst'], jday)
+    results = lst_model.fit_groups(X, model_data['temp'], groups, len(group_keys))
+    results['group_keys'] = group_keys
+    return results
+
+# select the observations not yet added to the models
+def new_observations(model_file, model_data):
+    """Returns the model data (see build_model_data) of the observations not yet added
+    to the models saved in model_file by update_models, by RCA ID and date, or all model
+    data if model_file does not exist."""
+    if not os.path.exists(model_file):
+        return model_data
+    new = lst_model.new_observations(lst_model.load_state(model_file)['obs_keys'], model_data['rca'],
+                                     model_data['date'])
+    return dict((key, values[new]) for key, values in model_data.items())
+
+
+# update stream temperature models with new observations
+@stage_profile.profile('update_models')
+def update_models(model_file, model_data, per_rca=True, use_jday=True, half_years=False):
+    """Updates the fitted models saved in model_file (a .npz file) with new observations,
+    creating the file if it does not exist. Models keep each group's sufficient statistics,
+    so only the new observations are read, i.e. from new_observations. The keys of the
+    observations added are kept as 'obs_keys'. Per RCA models also keep basin-wide models,
+    for RCAs without observations (see lst_model.add_fallback). Returns the updated model
+    state, with 'coef', 'r2' and 'rmse' per group."""
+    print "Updating stream temperature models..."
+    options = np.array([per_rca, use_jday, half_years])
+    obs_keys = lst_model.observation_keys(model_data['rca'], model_data['date'])
+    group_keys, groups = lst_model.model_groups(model_data['rca'], model_data['jday'], per_rca, half_years)
+    X = lst_model.design_matrix(model_data['lst'], model_data['jday'] if use_jday else None)
+    temp = model_data['temp']
+    if per_rca:
+        group_keys, groups, X, temp = lst_model.add_fallback(group_keys, groups, X, temp, model_data['jday'],
+                                                             half_years)
+    if os.path.exists(model_file):
+        state = lst_model.load_state(model_file)
+        if not np.array_equal(state['options'], options):
+            raise ValueError("Model options do not match the models in %s" % model_file)
+        obs_keys = np.concatenate((state['obs_keys'], obs_keys))
+        state = lst_model.update_state(state, X, temp, group_keys, groups)
+    else:
+        state = lst_model.init_state(X, temp, group_keys, groups)
+    state['options'] = options
+    state['obs_keys'] = obs_keys
+    lst_model.save_state(state, model_file)
+    return state
+
+
+# compare model variants by cross-validation
+@stage_profile.profile('select_model')
+def select_model(model_data, temp_dir, out_csv, n_folds=5, n_workers=None):
+    """Cross-validates every model variant (per basin or per RCA, with or without julian
+    day, whole year or half years) across a pool of worker processes, and writes the
+    metrics of each variant, fold and model group to a csv table. Returns the name of
+    the variant with the lowest cross-validated RMSE. Raises ValueError if no variant
+    could be scored."""
+    print "Comparing stream temperature model variants..."
+    share_dir = os.path.join(temp_dir, 'model_data')
+    rows = model_select.run_selection(model_data, share_dir, n_folds, n_workers)
+    model_select.write_results(rows, out_csv)
+    summary = model_select.summarize(rows)
+    for s in summary:
+        print "%s: RMSE %.3f, MAE %.3f, bias %.3f (%d observations)" % \
+              (s['variant'], s['rmse'], s['mae'], s['bias'], s['n_test'])
+    return model_select.best_variant(summary)
+
+
+# get a point halfway along a stream reach
+def reach_midpoint(geom):
+    """Returns the x, y coordinates of the point halfway along a line geometry. For
+    multi-part lines, the longest part is used."""
+    if geom.GetGeometryCount() > 0:
+        geom = max([geom.GetGeometryRef(i) for i in range(geom.GetGeometryCount())],
+                   key=lambda part: part.Length())
+    xy = np.array(geom.GetPoints())[:, :2]
+    if len(xy) == 1:
+        return xy[0, 0], xy[0, 1]
+    seg_len = np.sqrt(((xy[1:] - xy[:-1]) ** 2).sum(axis=1))
+    cum_len = np.r_[0.0, np.cumsum(seg_len)]
+    half = cum_len[-1] / 2.0
+    return np.interp(half, cum_len, xy[:, 0]), np.interp(half, cum_len, xy[:, 1])
+
+
+# join stream reaches to the drainage polygon (RCA) they are in
+@stage_profile.profile('join_reaches_to_rca')
+def join_reaches_to_rca(in_strm, strm_id_field, in_ply, rca_id_field, cache_dir):
+    """Finds the RCA containing the midpoint of each stream reach. The RCAs are read once,
+    and their extents indexed in memory (see lib/spatial_index.py), so each reach is only
+    tested against the RCAs whose extent contains its midpoint. Returns an array of reach
+    IDs and an integer array with the RCA ID of each reach (-1 if outside of all RCAs).
+    The mapping is cached in cache_dir for each pair of shapefiles."""
+    key = [shapefile_signature(in_strm), strm_id_field, shapefile_signature(in_ply), rca_id_field]
+    cache_file = os.path.join(cache_dir, 'reach_rca_%s.npz' % hashlib.sha1(repr(key)).hexdigest())
+    if os.path.exists(cache_file):
+        print "Loading cached stream reach to RCA join..."
+        return spatial_index.load_join(cache_file)
+
+    print "Joining stream reaches to RCAs..."
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+    ply_ds = driver.Open(in_ply, 0)
+    ply_lyr = ply_ds.GetLayer()
+    rca_ids = []
+    rca_geoms = []
+    for rca in ply_lyr:
+        geom = rca.GetGeometryRef()
+        if geom is not None:
+            rca_ids.append(rca.GetField(rca_id_field))
+            rca_geoms.append(geom.Clone())
+    rca_ids = np.array(rca_ids, dtype=np.int64)
+    extents = np.array([geom.GetEnvelope() for geom in rca_geoms], dtype=np.float64)
+
+    strm_ds = driver.Open(in_strm, 0)
+    strm_lyr = strm_ds.GetLayer()
+    transform = None
+    strm_srs = strm_lyr.GetSpatialRef()
+    ply_srs = ply_lyr.GetSpatialRef()
+    if strm_srs is not None and ply_srs is not None and not strm_srs.IsSame(ply_srs):
+        transform = osr.CoordinateTransformation(strm_srs, ply_srs)
+
+    reach_ids = []
+    xys = []
+    point = ogr.Geometry(ogr.wkbPoint)
+    for reach in strm_lyr:
+        reach_ids.append(reach.GetField(strm_id_field))
+        x, y = reach_midpoint(reach.GetGeometryRef())
+        if transform is not None:
+            point.SetPoint_2D(0, x, y)
+            point.Transform(transform)
+            x, y = point.GetX(), point.GetY()
+        xys.append((x, y))
+    xys = np.array(xys, dtype=np.float64).reshape(-1, 2)
+
+    def contains(reach, rca):
+        point.SetPoint_2D(0, xys[reach, 0], xys[reach, 1])
+        return rca_geoms[rca].Contains(point)
+
+    reach_rca = spatial_index.join_points(xys[:, 0], xys[:, 1], extents, contains)
+    reach_ids = np.array(reach_ids, dtype=np.int64)
+    reach_rca_ids = np.full(len(reach_ids), -1, dtype=np.int64)
+    reach_rca_ids[reach_rca >= 0] = rca_ids[reach_rca[reach_rca >= 0]]
+    spatial_index.save_join(cache_file, reach_ids, reach_rca_ids)
+    return reach_ids, reach_rca_ids
+
+
+# Predict stream temperatures
+@stage_profile.profile('predict_reaches')
+def predict_reaches(model_file, rca_store_dir, reach_ids, reach_rca_ids, out_store_dir,
+                    chunk_size=lst_model.REACH_CHUNK_SIZE):
+    """Predicts the daily temperature of each stream reach from the models in model_file
+    (see update_models) and the mean LST of the reach's RCA in the RCA store, for every
+    date in the RCA store. Reaches of RCAs without a per RCA model of their own are
+    predicted with the basin-wide fallback model. Reach RCA IDs are typically from
+    join_reaches_to_rca. Reaches are predicted in chunks with broadcasted array operations,
+    and written to a reach x date store in out_store_dir."""
+    print "Predicting stream temperatures..."
+    state = lst_model.load_state(model_file)
+    per_rca, use_jday, half_years = [bool(o) for o in state['options']]
+    rca_ids, dates, lst_values = lst_store.read_store(rca_store_dir)
+    rca_coef_index = lst_model.coef_index(state['group_keys'], rca_ids, per_rca, half_years, state['coef'])
+
+    # row of each reach's RCA in the RCA store, or -1
+    reach_rca_ids = np.asarray(reach_rca_ids, dtype=np.int64)
+    id_order = np.argsort(rca_ids)
+    pos = np.clip(np.searchsorted(rca_ids[id_order], reach_rca_ids), 0, len(rca_ids) - 1)
+    reach_rca = np.where(rca_ids[id_order][pos] == reach_rca_ids, id_order[pos], -1)
+
+    out_values = lst_store.create_store(out_store_dir, reach_ids, dates)
+    lst_model.predict_reach_days(state['coef'], rca_coef_index, lst_values, dates % 1000,
+                                 reach_rca, out_values, use_jday, chunk_size)
+    out_values.flush()
+    return out_store_dir
+
+
+# write predicted stream temperatures to a GeoPackage
+@stage_profile.profile('write_predictions_gpkg')
+def write_predictions_gpkg(store_dir, out_gpkg, in_strm=None):
+    """Writes the reach x date predictions in store_dir to a long-format table (one row
+    per reach and date, indexed on reach_id and date) in a GeoPackage. If in_strm is
+    given and the GeoPackage does not exist yet, the stream network is copied into it
+    first, so the table can be joined to the reaches in QGIS."""
+    print "Writing predicted stream temperatures to GeoPackage..."
+    if in_strm is not None and not os.path.exists(out_gpkg):
+        strm_ds = ogr.GetDriverByName('ESRI Shapefile').Open(in_strm, 0)
+        gpkg_ds = ogr.GetDriverByName('GPKG').CreateDataSource(out_gpkg)
+        strm_lyr = strm_ds.GetLayer()
+        gpkg_ds.CopyLayer(strm_lyr, strm_lyr.GetName())
+        gpkg_ds = None
+    reach_ids, dates, values = lst_store.read_store(store_dir)
+    n_rows = gpkg_writer.write_predictions(out_gpkg, reach_ids, dates, values)
+    print "%d predictions written." % n_rows
+    return out_gpkg
+
 
 # Output stats for modeling results
 ## use matplotlib to display graphs on-screen
 
-## Summarize predictions
\ No newline at end of file
+## Summarize predictions
+
+# report progress to the QGIS task running main, if any
+def _progress(feedback, percent, message=None):
+    """Reports progress to the feedback of a QGIS task (see steamm_task.py), if given."""
+    if feedback is not None:
+        feedback.report(percent, message)
+
+
+# main function
+def main(lst_csv, ref_raster, in_ply, rca_id_field, in_strm, strm_id_field, obs_csv, out_dir,
+         n_folds=5, n_workers=None, fill_method='linear', area_weighted=False, feedback=None):
+    """Predicts daily stream temperatures from the LST interpolation table built by
+    preprocess.main. Missing LST values are interpolated, mean LST values per RCA are
+    merged into the RCA store, the model variant with the lowest cross-validated RMSE is
+    updated with the observed stream temperatures not yet added to it by previous runs
+    (tracked in the run journal of out_dir), and every stream reach is predicted for
+    every date in the RCA store. Outputs are written to out_dir; returns the GeoPackage
+    of predictions. The time, items and bytes of each step are counted in the run report
+    (lib/run_report.py) as 'predict_temp.<step>'. Progress is reported to the feedback of a
+    QGIS task (see steamm_task.py), if given, which can cancel the run between steps."""
+    temp_dir = os.path.join(out_dir, 'temp')
+    if not os.path.exists(temp_dir):
+        os.makedirs(temp_dir)
+    rca_store_dir = os.path.join(out_dir, 'rca_store')
+    reach_store_dir = os.path.join(out_dir, 'reach_store')
+
+    # LST per RCA, for the year of the LST table (i.e. LST_2015.csv)
+    acq_year = os.path.splitext(os.path.basename(lst_csv))[0].split('_')[-1]
+    _progress(feedback, 0, "Interpolating LST values...")
+    with run_report.timed('predict_temp.interpolate_lst') as stats:
+        intrp_lst_csv = interpolate_lst(lst_csv, fill_method)
+        stats.add(1, run_report.file_size(lst_csv), run_report.file_size(intrp_lst_csv))
+    _progress(feedback, 10, "Summarizing LST per RCA...")
+    with run_report.timed('predict_temp.poly_stat') as stats:
+        rca_ids, acq_days, rca_mean = poly_stat(in_ply, ref_raster, intrp_lst_csv, rca_id_field,
+                                                area_weighted, temp_dir)
+        stats.add(len(rca_ids), run_report.file_size(intrp_lst_csv, ref_raster))
+    _progress(feedback, 30)
+    with run_report.timed('predict_temp.write_rca_store') as stats:
+        write_rca_store(rca_store_dir, rca_ids, acq_year, acq_days, rca_mean)
+        stats.add(len(acq_days), bytes_written=rca_mean.nbytes)
+
+    # Generate models
+    _progress(feedback, 35, "Fitting models...")
+    with run_report.timed('predict_temp.build_model_data') as stats:
+        obs_rca, obs_date, obs_temp = read_obs_table(obs_csv)
+        model_data = build_model_data(rca_store_dir, obs_rca, obs_date, obs_temp)
+        stats.add(len(model_data['temp']), run_report.file_size(obs_csv))
+    _progress(feedback, 40)
+    with run_report.timed('predict_temp.select_model') as stats:
+        best = select_model(model_data, temp_dir, os.path.join(out_dir, 'model_selection.csv'),
+                            n_folds, n_workers)
+        stats.add(len(model_select.model_variants()))
+    variant = [v for v in model_select.model_variants() if v['name'] == best][0]
+    model_file = os.path.join(out_dir, 'models_%s.npz' % best)
+    # models are updated with the observations added since the last run; a model file that
+    # changed since its last recorded update (i.e. cut short by a crash) is refitted
+    journal = run_journal.RunJournal(os.path.join(out_dir, run_journal.JOURNAL_FILE))
+    model_unit = os.path.basename(model_file)
+    if os.path.exists(model_file) and journal.completed('update_models', model_unit) is None:
+        os.remove(model_file)
+    _progress(feedback, 60)
+    with run_report.timed('predict_temp.update_models') as stats:
+        new_data = new_observations(model_file, model_data)
+        if len(new_data['temp']) > 0:
+            update_models(model_file, new_data, variant['per_rca'], variant['use_jday'], variant['half_years'])
+            journal.record('update_models', model_unit, [obs_csv], [model_file])
+        stats.add(len(new_data['temp']), bytes_written=run_report.file_size(model_file))
+
+    # Predict stream temperatures
+    _progress(feedback, 65, "Predicting stream temperatures...")
+    with run_report.timed('predict_temp.join_reaches_to_rca') as stats:
+        reach_ids, reach_rca_ids = join_reaches_to_rca(in_strm, strm_id_field, in_ply, rca_id_field, temp_dir)
+        stats.add(len(reach_ids))
+    _progress(feedback, 75)
+    with run_report.timed('predict_temp.predict_reaches') as stats:
+        predict_reaches(model_file, rca_store_dir, reach_ids, reach_rca_ids, reach_store_dir)
+        stats.add(len(reach_ids))
+    _progress(feedback, 90, "Writing predictions...")
+    with run_report.timed('predict_temp.write_predictions_gpkg') as stats:
+        out_gpkg = write_predictions_gpkg(reach_store_dir, os.path.join(out_dir, 'stream_temp.gpkg'), in_strm)
+        stats.add(len(reach_ids), bytes_written=run_report.file_size(out_gpkg))
+    return out_gpkg
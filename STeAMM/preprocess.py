@@ -23,58 +23,101 @@
 # Import modules
 import os
 import csv
+import hashlib
 import gdal
 import gdalconst
 import ogr
+import numpy as np
+from lib import gap_fill
+from lib import pipeline
+from lib import run_report
+from lib import stage_profile
 
 
 # Drainage polygon shapefile to summarize values (i.e. watersheds, RCAs, etc.): ')
 geo_rca = ""
 
-
-def convert_hdf(proj_dir, dir_list, hdf_filepath_list, hdf_filename_list):
-    """Converts downloaded HDF file into geotiff file format."""
-    global src_xres
-    global src_yres
-    geotiff_list = []
-    """Converts MODIS HDF files to a geotiff format."""
+# Version of the preprocessing stages; changing how a stage builds its outputs must change
+# it, so that outputs cached by the previous version are not reused
+STAGE_VERSION = 1
+
+
+def run_stage(cache, journal, stage, inputs, params, out_files, function, *args):
+    """Calls function(*args) to create out_files, or restores them from a stage cache
+    (lib/stage_cache.py) if the stage already ran on the same inputs and params. If a run
+    journal (lib/run_journal.py) is given, units it records as completed are skipped, and
+    completed units are recorded, by the name of their first output file. Returns True if
+    the outputs were skipped or restored. The stage's time and bytes are counted in the
+    run report (lib/run_report.py) as 'preprocess.<stage>', and the stage is profiled if
+    it is chosen for profiling (lib/stage_profile.py)."""
+    unit = os.path.basename(out_files[0])
+    if journal is not None and journal.skip(stage, unit):
+        run_report.add('preprocess.%s.skipped' % stage, 1)
+        return True
+    function = stage_profile.profiled(stage, function)
+    with run_report.timed('preprocess.%s' % stage) as stats:
+        if cache is None:
+            function(*args)
+            restored = False
+        else:
+            params = dict(params, stage_version=STAGE_VERSION)
+            restored = cache.run(stage, inputs, params, out_files, function, *args)
+        stats.add(1, run_report.file_size(*inputs), run_report.file_size(*out_files))
+    if journal is not None:
+        journal.record(stage, unit, inputs, out_files)
+    return restored
+
+
+def hdf_to_geotiff(in_filepath, out_file, out_format='GTiff'):
+    """Converts the LST sub-dataset of a MODIS HDF file to a geotiff."""
+    # Open the LST_Day_1km dataset
+    src_open = gdal.Open(in_filepath, gdalconst.GA_ReadOnly) # open file with all sub-datasets
+    src_subdatasets = src_open.GetSubDatasets() # make a list of sub-datasets in the HDF file
+    subdataset = gdal.Open(src_subdatasets[0][0])
+
+    # Get parameters from LST dataset
+    src_cols = subdataset.RasterXSize
+    src_rows = subdataset.RasterYSize
+    src_band_count = subdataset.RasterCount
+    src_geotransform = subdataset.GetGeoTransform()
+    src_proj = subdataset.GetProjection()
+
+    # Read dataset to array
+    src_band = subdataset.GetRasterBand(1)
+    src_array = src_band.ReadAsArray(0, 0, src_cols, src_rows)
+
+    # Set up output file
+    driver = gdal.GetDriverByName(out_format)
+    out_geotiff = driver.Create(out_file, src_cols, src_rows, src_band_count, gdal.GDT_Float32)
+    out_geotiff.SetGeoTransform(src_geotransform)
+    out_geotiff.SetProjection(src_proj)
+    out_geotiff.GetRasterBand(1).WriteArray(src_array)
+    out_geotiff.FlushCache()
+
+
+def iter_convert_hdf(dir_list, hdf_filepath_list, hdf_filename_list, cache=None, journal=None):
+    """Converts MODIS HDF files to a geotiff format, yielding each geotiff as it is written."""
     print "Converting MODIS HDF files to geotiff format..."
     out_format = 'GTiff'
     local_array = zip(hdf_filepath_list, hdf_filename_list)
 
     for dir in dir_list:
         for in_filepath, out_filename in local_array:
+            out_file = os.path.join(dir, "%s.%s" % (out_filename, "tif"))
+            run_stage(cache, journal, 'convert_hdf', [in_filepath], {'format': out_format}, [out_file],
+                      hdf_to_geotiff, in_filepath, out_file, out_format)
+            yield out_file
 
-            # Open the LST_Day_1km dataset
-            src_open = gdal.Open(in_filepath, gdalconst.GA_ReadOnly) # open file with all sub-datasets
-            src_subdatasets = src_open.GetSubDatasets() # make a list of sub-datasets in the HDF file
-            subdataset = gdal.Open(src_subdatasets[0][0])
-
-            # Get parameters from LST dataset
-            src_cols = subdataset.RasterXSize
-            src_rows = subdataset.RasterYSize
-            src_band_count = subdataset.RasterCount
-            src_geotransform = subdataset.GetGeoTransform()
-            src_xres = src_geotransform[1]
-            src_yres = src_geotransform[5]
-            src_proj = subdataset.GetProjection()
-
-            # Read dataset to array
-            src_band = subdataset.GetRasterBand(1)
-            src_array = src_band.ReadAsArray(0, 0, src_cols, src_rows)
-
-            # Set up output file
-            driver = gdal.GetDriverByName(out_format)
-            out_file = "%s\%s.%s" % (dir, out_filename, "tif")
-            out_geotiff = driver.Create(out_file, src_cols, src_rows, src_band_count, gdal.GDT_Float32)
-            out_geotiff.SetGeoTransform(src_geotransform)
-            out_geotiff.SetProjection(src_proj)
-            out_geotiff.GetRasterBand(1).WriteArray(src_array)
-            out_geotiff.FlushCache()
-
-            # Create list of output geotiffs
-            geotiff_list.append(out_file)
 
+def convert_hdf(proj_dir, dir_list, hdf_filepath_list, hdf_filename_list, cache=None):
+    """Converts MODIS HDF files to a geotiff format. Geotiffs of granules already converted
+    are restored from the stage cache, if given."""
+    global src_xres
+    global src_yres
+    geotiff_list = list(iter_convert_hdf(dir_list, hdf_filepath_list, hdf_filename_list, cache))
+    src_geotransform = gdal.Open(geotiff_list[-1]).GetGeoTransform()
+    src_xres = src_geotransform[1]
+    src_yres = src_geotransform[5]
     return geotiff_list, src_xres, src_yres
 
 
@@ -89,22 +132,53 @@ def build_mosaic_io_array(geotiff_list, hdf_dates):
     return mosaic_io_array
 
 
-def convert_to_vrt(mosaic_io_array, swath_id, input_dir, dir_list, modis_wkt):
-    """Generates mosaics as GDAL VRT files for MODIS tiles collected on the same day."""
+def iter_mosaic_rows(geotiffs, hdf_dates, n_tiles):
+    """Groups a stream of geotiffs by collection date, yielding a mosaic_io_array row (the
+    geotiffs of a date, then the date) as soon as all n_tiles tiles of the date have arrived.
+    Dates missing tiles are yielded at the end of the stream, in hdf_dates order."""
+    pending = dict((date, []) for date in hdf_dates)
+    for geotiff in geotiffs:
+        date = [d for d in pending if d in geotiff]
+        if not date:
+            continue
+        pending[date[0]].append(geotiff)
+        if len(pending[date[0]]) == n_tiles:
+            yield sorted(pending.pop(date[0])) + [date[0]]
+    for date in hdf_dates:
+        if date in pending:
+            yield sorted(pending.pop(date)) + [date]
+
+
+def date_order(paths, hdf_dates):
+    """Sorts output files of a streaming pipeline back into hdf_dates order."""
+    def index(path):
+        return [i for i, date in enumerate(hdf_dates) if date in os.path.basename(path)][0]
+    return sorted(paths, key=index)
+
+
+def iter_convert_to_vrt(mosaic_rows, swath_id, input_dir, dir_list, modis_wkt, cache=None, journal=None):
+    """Generates mosaics as GDAL VRT files for MODIS tiles collected on the same day,
+    yielding each VRT as it is written."""
     print "Generating GDAL VRT files from geotiffs..."
-    out_vrt_list = []
     # iterate through list of geotiff file names
-    for row in mosaic_io_array:
+    for row in mosaic_rows:
+        out_vrt = os.path.join(input_dir, dir_list[1], '%s.%s' % (row[-1], "vrt"))
         if len(swath_id) > 1: # if more than one geotiff in list, mosaic into a vrt file
-            in_rasters = ' '.join(row[0:2])
-            out_vrt = '%s\\%s\\%s.%s' % (input_dir, dir_list[1], row[2], "vrt")
+            in_rasters = ' '.join(row[:-1])
             expr = 'gdalbuildvrt -a_srs %s %s %s' % (modis_wkt, out_vrt, in_rasters)
         else: # otherwise, just convert the geotiff to a vrt file
-            out_vrt = '%s\\%s\\%s.%s' % (input_dir, dir_list[1], row[1], "vrt")
             expr = 'gdal_translate -of %s -a_srs %s %s %s' % ("VRT", modis_wkt, row[0], out_vrt)
-        os.system(expr)
-        out_vrt_list.append(out_vrt)
-    return out_vrt_list
+        # a VRT refers to its geotiffs by path, so the paths are part of its key
+        run_stage(cache, journal, 'convert_to_vrt', row[:-1] + [modis_wkt],
+                  {'sources': [os.path.abspath(f) for f in row[:-1]], 'mosaic': len(swath_id) > 1},
+                  [out_vrt], os.system, expr)
+        yield out_vrt
+
+
+def convert_to_vrt(mosaic_io_array, swath_id, input_dir, dir_list, modis_wkt, cache=None):
+    """Generates mosaics as GDAL VRT files for MODIS tiles collected on the same day.
+    Mosaics of unchanged geotiffs are restored from the stage cache, if given."""
+    return list(iter_convert_to_vrt(mosaic_io_array, swath_id, input_dir, dir_list, modis_wkt, cache))
 
 
 def get_poly_wkt(in_poly):
@@ -119,15 +193,23 @@ def get_poly_wkt(in_poly):
     return poly_wkt
 
 
-def reproject_rasters(in_vrt_list, input_dir, dir_list, modis_wkt, poly_wkt, bbox_list, xres, yres, in_ply):
-    """Re-projects VRT mosaics to same projection as drainage polygons, then clips extent to polygon envelope."""
+def iter_reproject_rasters(in_vrts, input_dir, dir_list, modis_wkt, poly_wkt, bbox_list, xres, yres, in_ply,
+                           cache=None, keep_intermediates=True, journal=None):
+    """Re-projects VRT mosaics to same projection as drainage polygons, then clips extent to polygon envelope,
+    yielding each grid as it is written. If xres and yres are None, the resolution of the first mosaic is used.
+    Unless keep_intermediates is True, each mosaic and its geotiffs are removed once warped."""
     print "Reprojecting VRT mosaics..."
     xmin = bbox_list[0]
     xmax = bbox_list[1]
     ymin = bbox_list[2]
     ymax = bbox_list[3]
-    out_reprj_list = []
-    for in_vrt in in_vrt_list:
+    cutline = cache.shapefile_digest(in_ply) if cache is not None else None
+    for in_vrt in in_vrts:
+        if xres is None or yres is None:
+            geotransform = gdal.Open(in_vrt).GetGeoTransform()
+            xres, yres = abs(geotransform[1]), abs(geotransform[5])
+        params = {'t_srs': poly_wkt, 'tr': [float(xres), float(yres)], 'r': 'bilinear', 'of': 'GTiff',
+                  'dstnodata': -999, 'cblend': 5, 'cutline': cutline}
         out_file = '%s_%s.%s' % (in_vrt, "reprj", 'tif')
         expr = 'gdalwarp -overwrite -t_srs %s -tr %f %f -r %s -of %s -dstnodata %d -cutline %s -cblend %d %s %s' % \
                (poly_wkt, xres, yres, 'bilinear', 'GTiff', -999, in_ply, 5, in_vrt, out_file)
@@ -135,9 +217,126 @@ def reproject_rasters(in_vrt_list, input_dir, dir_list, modis_wkt, poly_wkt, bbo
         expr = 'gdalwarp -overwrite -t_srs %s -te %f %f %f %f -tr %f %f -r %s -of %s -dstnodata %d -cutline %s %s %s' % \
                (poly_wkt, xmin, ymin, xmax, ymax, xres, yres, 'bilinear', 'GTiff', 0, in_ply, in_vrt, out_file)
         """
-        os.system(expr)
-        out_reprj_list.append(out_file)
-    return out_reprj_list
+        run_stage(cache, journal, 'reproject_rasters', [in_vrt], params, [out_file], os.system, expr)
+        if not keep_intermediates and os.path.exists(in_vrt):
+            pipeline.release(gdal.Open(in_vrt).GetFileList())
+        yield out_file
+
+
+def reproject_rasters(in_vrt_list, input_dir, dir_list, modis_wkt, poly_wkt, bbox_list, xres, yres, in_ply,
+                      cache=None):
+    """Re-projects VRT mosaics to same projection as drainage polygons, then clips extent to polygon envelope.
+    Grids already warped from the same mosaic, projection, resolution and cutline are restored from
+    the stage cache, if given."""
+    return list(iter_reproject_rasters(in_vrt_list, input_dir, dir_list, modis_wkt, poly_wkt, bbox_list,
+                                       xres, yres, in_ply, cache))
+
+
+# get a short key of a target projection and resolution, to name shared warped grids
+def warp_key(poly_wkt, xres, yres):
+    """Returns a short key identifying a target projection and resolution."""
+    return hashlib.sha1(repr((poly_wkt, float(xres), float(yres)))).hexdigest()[:10]
+
+
+def warp_rasters(in_vrt_list, out_dir, poly_wkt, xres, yres, cache=None, journal=None):
+    """Re-projects VRT mosaics to the projection of a drainage polygon dataset, without
+    clipping, so the warped grids can be shared by every basin with the same projection
+    and resolution. Grids already warped from the same mosaic and geotiffs, projection
+    and resolution are restored from the stage cache, or skipped if the run journal
+    records them as completed."""
+    print "Reprojecting VRT mosaics for shared use..."
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    params = {'t_srs': poly_wkt, 'tr': [float(xres), float(yres)], 'r': 'bilinear', 'of': 'GTiff',
+              'dstnodata': -999}
+    out_warp_list = []
+    for in_vrt in in_vrt_list:
+        out_file = os.path.join(out_dir, '%s_%s.%s' % (os.path.basename(in_vrt), "warp", 'tif'))
+        expr = 'gdalwarp -overwrite -t_srs %s -tr %f %f -r %s -of %s -dstnodata %d %s %s' % \
+               (poly_wkt, xres, yres, 'bilinear', 'GTiff', -999, in_vrt, out_file)
+        # the VRT and the geotiffs it refers to
+        run_stage(cache, journal, 'warp_rasters', gdal.Open(in_vrt).GetFileList(), params, [out_file],
+                  os.system, expr)
+        out_warp_list.append(out_file)
+    return out_warp_list
+
+
+def clip_to_polygons(in_warp, out_file, bbox_list, in_ply):
+    """Clips a warped grid to the extent envelope of drainage polygons, and masks the cells
+    outside the polygons with -999, like the cutline of reproject_rasters. Grid cells are
+    copied without resampling."""
+    xmin, xmax, ymin, ymax = bbox_list
+    os.system('gdal_translate -of %s -a_nodata %d -projwin %f %f %f %f %s %s' %
+              ('GTiff', -999, xmin, ymax, xmax, ymin, in_warp, out_file))
+    os.system('gdal_rasterize -i -burn %d -l %s %s %s' %
+              (-999, os.path.splitext(os.path.basename(in_ply))[0], in_ply, out_file))
+
+
+def clip_rasters(in_warp_list, out_dir, bbox_list, in_ply, cache=None, journal=None):
+    """Clips shared warped grids to a basin's drainage polygons (see clip_to_polygons), so
+    every basin sees the same cell values. Grids already clipped from the same grid and
+    polygons are restored from the stage cache, or skipped if the run journal records them
+    as completed."""
+    print "Clipping reprojected grids to drainage polygons..."
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    cutline = cache.shapefile_digest(in_ply) if cache is not None else None
+    params = {'projwin': [float(v) for v in bbox_list], 'cutline': cutline, 'nodata': -999}
+    out_clip_list = []
+    for in_warp in in_warp_list:
+        out_file = os.path.join(out_dir, '%s_%s.%s' % (os.path.splitext(os.path.basename(in_warp))[0], "clip", 'tif'))
+        run_stage(cache, journal, 'clip_rasters', [in_warp, in_ply], params, [out_file],
+                  clip_to_polygons, in_warp, out_file, bbox_list, in_ply)
+        out_clip_list.append(out_file)
+    return out_clip_list
+
+
+# fill missing cells of reprojected LST grids from neighboring cells
+def iter_spatial_fill_rasters(in_reprjs, size=3, min_neighbors=gap_fill.MIN_NEIGHBORS,
+                              day_chunk_size=gap_fill.DAY_CHUNK_SIZE, journal=None):
+    """Fills missing cells in a stream of reprojected LST geotiffs, in batches of up to
+    day_chunk_size dates, yielding each filled geotiff as it is written. Dates the run
+    journal records as filled are not filled again."""
+    print "Filling missing LST cells from neighboring cells..."
+    for tif_chunk in pipeline.chunks(in_reprjs, day_chunk_size):
+        out_files = ['%s_%s.%s' % (os.path.splitext(tif_file)[0], 'fill', 'tif') for tif_file in tif_chunk]
+        todo = [(tif_file, out_file) for tif_file, out_file in zip(tif_chunk, out_files)
+                if journal is None or not journal.skip('spatial_fill', os.path.basename(out_file))]
+        if journal is not None:
+            run_report.add('preprocess.spatial_fill.skipped', len(tif_chunk) - len(todo))
+        if todo:
+            # one call of the stage per chunk, reading, filling and writing its dates
+            with run_report.timed('preprocess.spatial_fill') as stats:
+                lst_cube = np.array([gdal.Open(tif_file).ReadAsArray() for tif_file, out_file in todo])
+                # only missing (0) cells are filled; cells outside the cutline stay -999, so
+                # every date's table has the same cells for build_interpl_table
+                fill_cube = stage_profile.profiled('spatial_fill', gap_fill.fill_missing_cells)(
+                    lst_cube, size, min_neighbors=min_neighbors)
+                for (tif_file, out_file), fill_array in zip(todo, fill_cube):
+                    src_ds = gdal.Open(tif_file)
+                    driver = gdal.GetDriverByName('GTiff')
+                    out_geotiff = driver.Create(out_file, src_ds.RasterXSize, src_ds.RasterYSize, 1,
+                                                gdal.GDT_Float32)
+                    out_geotiff.SetGeoTransform(src_ds.GetGeoTransform())
+                    out_geotiff.SetProjection(src_ds.GetProjection())
+                    out_geotiff.GetRasterBand(1).SetNoDataValue(-999)
+                    out_geotiff.GetRasterBand(1).WriteArray(fill_array)
+                    out_geotiff.FlushCache()
+                    out_geotiff = None  # close the geotiff before the next stage reads it
+                    if journal is not None:
+                        journal.record('spatial_fill', os.path.basename(out_file), [tif_file], [out_file])
+                stats.add(len(todo), run_report.file_size(*[tif_file for tif_file, out_file in todo]),
+                          run_report.file_size(*[out_file for tif_file, out_file in todo]))
+        for out_file in out_files:
+            yield out_file
+
+
+def spatial_fill_rasters(in_reprj_list, size=3, min_neighbors=gap_fill.MIN_NEIGHBORS,
+                         day_chunk_size=gap_fill.DAY_CHUNK_SIZE):
+    """Fills missing cells in the reprojected LST geotiffs with the mean of valid neighboring
+    cells on the same date. The geotiffs are read into a date x row x column cube and filled
+    in batches of dates, before missing values are interpolated over time."""
+    return list(iter_spatial_fill_rasters(in_reprj_list, size, min_neighbors, day_chunk_size))
 
 
 # get julian date from the mosaicked geotiff file name array
@@ -147,31 +346,47 @@ def get_first_acq_date(mosaic_io_array):
     return acq_date
 
 
-# Convert LST geotiffs to csv files
-def LST_to_csv(in_reprj_list, input_dir, dir_list):
-    """Converts mosaicked, reprojected LST geotiffs into tables in
-    a CSV file format."""
-    print "Converting geotiffs to csv files..."
+# Convert an LST geotiff to a csv file
+def tif_to_csv(tif_file, xyz_filename, csv_filename, acq_date):
+    """Converts an LST geotiff into a table of the valid grid cells in a CSV file format."""
     import gdal2xyz
-    out_csv_list = []
-    for tif_file in in_reprj_list:
+    gdal2xyz.main(tif_file, xyz_filename)
+    with open(xyz_filename, 'rb') as input, open(csv_filename, 'wb') as output:
+        reader = csv.reader(input, delimiter=' ')
+        writer = csv.writer(output, delimiter=',', quoting=csv.QUOTE_NONNUMERIC)
+        all_rows = []
+        all_rows.insert(0, ["UID", "X", "Y", str(acq_date)])
+        row = next(reader)
+        for i, row in enumerate(reader):
+            if row[2] != '-999':
+                all_rows.append([str(i + 1)] + row)
+        writer.writerows(all_rows)
+
+
+# Convert a stream of LST geotiffs to csv files
+def iter_LST_to_csv(in_reprjs, input_dir, dir_list, cache=None, keep_intermediates=True, journal=None):
+    """Converts mosaicked, reprojected LST geotiffs into tables in a CSV file format,
+    yielding each table as it is written. Unless keep_intermediates is True, the xyz
+    table and the geotiff are removed once the table is written."""
+    print "Converting geotiffs to csv files..."
+    for tif_file in in_reprjs:
         tif_name_split = tif_file.split('.')
         acq_date = tif_name_split[0][-3:]
         xyz_filename = '%s_%s.%s' % (tif_name_split[0], 'xyz', 'csv')
         csv_filename = '%s_%s.%s' % (tif_name_split[0], 'tbl', 'csv')
-        gdal2xyz.main(tif_file, xyz_filename)
-        with open(xyz_filename, 'rb') as input, open(csv_filename, 'wb') as output:
-            reader = csv.reader(input, delimiter=' ')
-            writer = csv.writer(output, delimiter=',', quoting=csv.QUOTE_NONNUMERIC)
-            all_rows = []
-            all_rows.insert(0, ["UID", "X", "Y", str(acq_date)])
-            row = next(reader)
-            for i, row in enumerate(reader):
-                if row[2] != '-999':
-                    all_rows.append([str(i + 1)] + row)
-            writer.writerows(all_rows)
-        out_csv_list.append(csv_filename)
-    return out_csv_list
+        run_stage(cache, journal, 'LST_to_csv', [tif_file], {'acq_date': acq_date}, [csv_filename],
+                  tif_to_csv, tif_file, xyz_filename, csv_filename, acq_date)
+        if not keep_intermediates:
+            pipeline.release([xyz_filename, tif_file])
+        yield csv_filename
+
+
+# Convert LST geotiffs to csv files
+def LST_to_csv(in_reprj_list, input_dir, dir_list, cache=None):
+    """Converts mosaicked, reprojected LST geotiffs into tables in
+    a CSV file format. Tables of unchanged geotiffs are restored
+    from the stage cache, if given."""
+    return list(iter_LST_to_csv(in_reprj_list, input_dir, dir_list, cache))
 
 
 # build a list with julian dates of tile and csv table file paths
@@ -189,38 +404,41 @@ def build_acq_date_list(in_csv_list):
 
 
 # build csv table to serve as input to LST interpolation process
+@stage_profile.profile('build_interpl_table')
 def build_interpl_table(acq_date_list, input_dir, dir_list):
     """Builds a csv table comprised of grid cell LST values from
     each tile. The csv table will serve as input to the LST value
     interpolation process."""
     print "Building LST interpolation input table..."
     acq_year = acq_date_list[0][1]
-    out_dir = '%s\\%s\\' % (input_dir, dir_list[1])
-    out_file = '%s%s_%s.%s' % (out_dir, 'LST', acq_year, 'csv')
-    first_filename = acq_date_list[0][2]
-    file1_rows = []
-
-    with open(first_filename, 'rb') as file1:
-        reader1 = csv.reader(file1)
-        for r1 in reader1:
-            file1_rows.append(r1)
-
-    for acq_date in acq_date_list[1:]:  # skips the first csv file in list
-        with open(acq_date[2], 'rb') as fileX:
-            readerX = csv.reader(fileX, delimiter=',')
-            fileX_rows = []
-            for rX in readerX:
-                fileX_rows.append(rX)
-            LST_col_list = [row[3] for row in fileX_rows]
-            for (f1, LST_val) in zip(file1_rows, LST_col_list):
-                f1.append(LST_val)
-
-    with open(out_file, 'wb') as out_csv:
-        writer = csv.writer(out_csv, delimiter=',')
-        for f in file1_rows:
-            writer.writerow(f)
+    out_file = os.path.join(input_dir, dir_list[1], '%s_%s.%s' % ('LST', acq_year, 'csv'))
+    with run_report.timed('preprocess.build_interpl_table') as stats:
+        first_filename = acq_date_list[0][2]
+        file1_rows = []
+
+        with open(first_filename, 'rb') as file1:
+            reader1 = csv.reader(file1)
+            for r1 in reader1:
+                file1_rows.append(r1)
+
+        for acq_date in acq_date_list[1:]:  # skips the first csv file in list
+            with open(acq_date[2], 'rb') as fileX:
+                readerX = csv.reader(fileX, delimiter=',')
+                fileX_rows = []
+                for rX in readerX:
+                    fileX_rows.append(rX)
+                LST_col_list = [row[3] for row in fileX_rows]
+                for (f1, LST_val) in zip(file1_rows, LST_col_list):
+                    f1.append(LST_val)
+
+        with open(out_file, 'wb') as out_csv:
+            writer = csv.writer(out_csv, delimiter=',')
+            for f in file1_rows:
+                writer.writerow(f)
+        stats.add(len(acq_date_list), run_report.file_size(*[a[2] for a in acq_date_list]),
+                  run_report.file_size(out_file))
     print "Data pre-processing complete!"
-    return out_csv
+    return out_file
 
 
 def get_modis_wkt(steamm_script):
@@ -232,6 +450,15 @@ def get_modis_wkt(steamm_script):
     return modis_wkt_filepath
 
 
+def find_modis_wkt():
+    """Returns the MODIS Sin WKT projection file shipped with STeAMM, in STeAMM/lib. Raises
+    IOError if it is missing, as HDF subdatasets would be mosaicked without a projection."""
+    modis_wkt = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib', 'MODIS_sin.wkt')
+    if not os.path.exists(modis_wkt):
+        raise IOError("MODIS WKT projection file not found: %s" % modis_wkt)
+    return modis_wkt
+
+
 def get_bbox(in_poly):
     """Gets the extent envelope values of drainage polygons."""
     print "Calculating the extent envelope vaues of drainage polygon dataset..."
@@ -247,15 +474,73 @@ def get_bbox(in_poly):
     return bbox_list
 
 
-# File conversion
-# geotiff_list, xres, yres = convert_hdf(proj_dir, dirs, hdf_filepath_list, hdf_file_list)
-poly_wkt = get_poly_wkt(geo_rca)
-bbox_list = get_bbox(geo_rca)
-mosaic_io_array = build_mosaic_io_array(geotiff_list, hdf_dates)
-modis_wkt = get_modis_wkt("steamm.py")
-vrt_list = convert_to_vrt(mosaic_io_array, swath_id, proj_dir, dir_list, modis_wkt)
-reprj_list = reproject_rasters(vrt_list, proj_dir, dir_list, modis_wkt, poly_wkt, bbox_list, xres, yres, geo_rca)
-csv_list = LST_to_csv(reprj_list, proj_dir, dir_list)
-acq_date_list = build_acq_date_list(csv_list)
-LST_csv = build_interpl_table(acq_date_list, proj_dir, dir_list)
-print LST_csv
\ No newline at end of file
+# Subdirectories of the project directory for geotiffs, and for mosaics and LST tables
+PREPROCESS_DIRS = ['geotiff', 'mosaic']
+
+
+# main function
+def main(proj_dir, hdf_filepath_list, hdf_filename_list, hdf_dates, swath_id, geo_rca, cache=None,
+         keep_intermediates=True, max_in_flight=pipeline.MAX_IN_FLIGHT, journal=None):
+    """Converts the HDF files from get_swaths.main to geotiffs, mosaics the swaths of each
+    date, reprojects and clips the mosaics to the drainage polygons, fills missing cells, and
+    builds the LST interpolation table. Returns the LST table and the reprojected LST grids.
+    Stage outputs are reused from the stage cache (lib/stage_cache.py), if given.
+
+    The stages are streamed: each runs in its own thread, at most max_in_flight dates ahead
+    of the next stage, so one date is warped and tabulated while the following dates are
+    still being converted. Unless keep_intermediates is True, geotiffs, mosaics and filled
+    grids are removed as soon as the next stage has consumed them.
+
+    If a run journal (lib/run_journal.py) is given, each stage records the dates it has
+    completed, and a restarted run only streams the dates whose LST table or grid is
+    missing or has changed since it was recorded."""
+    dir_list = PREPROCESS_DIRS
+    for sub_dir in dir_list:
+        if not os.path.exists(os.path.join(proj_dir, sub_dir)):
+            os.makedirs(os.path.join(proj_dir, sub_dir))
+
+    reprj_list = []
+    csv_list = []
+    todo_dates = list(hdf_dates)
+    if journal is not None:
+        done_reprjs = journal.completed_units('reproject_rasters')
+        done_csvs = journal.completed_units('LST_to_csv')
+        for date in hdf_dates:
+            reprjs = [outputs[0] for unit, outputs in done_reprjs.items() if date in unit]
+            csvs = [outputs[0] for unit, outputs in done_csvs.items() if date in unit]
+            if reprjs and csvs:
+                reprj_list.append(reprjs[0])
+                csv_list.append(csvs[0])
+                todo_dates.remove(date)
+        if len(todo_dates) < len(hdf_dates):
+            print "Resuming: %d of %d dates already preprocessed." % (len(hdf_dates) - len(todo_dates), len(hdf_dates))
+        todo = [i for i, filename in enumerate(hdf_filename_list) if [d for d in todo_dates if d in filename]]
+        hdf_filepath_list = [hdf_filepath_list[i] for i in todo]
+        hdf_filename_list = [hdf_filename_list[i] for i in todo]
+
+    poly_wkt = get_poly_wkt(geo_rca)
+    bbox_list = get_bbox(geo_rca)
+    modis_wkt = find_modis_wkt()
+    geotiffs = pipeline.prefetch(iter_convert_hdf([os.path.join(proj_dir, dir_list[0])], hdf_filepath_list,
+                                                  hdf_filename_list, cache, journal), max_in_flight)
+    mosaic_rows = iter_mosaic_rows(geotiffs, todo_dates, len(swath_id))
+    vrts = pipeline.prefetch(iter_convert_to_vrt(mosaic_rows, swath_id, proj_dir, dir_list, modis_wkt, cache,
+                                                 journal), max_in_flight)
+    reprjs = pipeline.collect(iter_reproject_rasters(vrts, proj_dir, dir_list, modis_wkt, poly_wkt, bbox_list,
+                                                     None, None, geo_rca, cache, keep_intermediates, journal),
+                              reprj_list)
+    fills = pipeline.prefetch(iter_spatial_fill_rasters(pipeline.prefetch(reprjs, max_in_flight),
+                                                        journal=journal), max_in_flight)
+    csv_list.extend(iter_LST_to_csv(fills, proj_dir, dir_list, cache, keep_intermediates, journal))
+
+    # dates finish in the order their tiles are converted
+    reprj_list = date_order(reprj_list, hdf_dates)
+    csv_list = date_order(csv_list, hdf_dates)
+    if cache is not None:
+        print "Stage cache hits: %d, misses: %d" % (cache.hits, cache.misses)
+    if journal is not None:
+        print "Stage units skipped as already completed: %d" % journal.skipped
+    acq_date_list = build_acq_date_list(csv_list)
+    LST_csv = build_interpl_table(acq_date_list, proj_dir, dir_list)
+    print LST_csv
+    return LST_csv, reprj_list
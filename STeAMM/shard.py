@@ -0,0 +1,239 @@
+#-------------------------------------------------------------------------------
+# Name:         shard.py
+#
+# Summary:      Sharded execution of the download and preprocessing steps of a run config,
+#               through a file-backed job queue on a shared filesystem. The work is split
+#               into units: one per year, date and tile (download and convert the HDF file),
+#               one per year and date (mosaic, reproject, fill and tabulate the date's LST
+#               grid), and one per year (merge the dates into the LST table). Any number of
+#               worker processes, on any number of hosts, can work on the same queue:
+#
+#                   python shard.py init basin.json
+#                   python shard.py work basin.json --processes 8     (on each host)
+#                   python shard.py status basin.json
+#                   python shard.py predict basin.json
+#
+#               Each worker process writes the run report (lib/run_report.py) of the units
+#               it has run to reports/<worker>.json in the queue directory, and the telemetry
+#               of its download requests (lib/download_stats.py) to reports/<worker>.downloads.json.
+#
+# Project:      Stream Temperature Automated Modeler using MODIS (STeAMM)
+#
+# Author:       Jesse Langdon
+#
+# Last Updated: 10/19/2026
+# Copyright:    (c) South Fork Research, Inc. 2017
+# Licence:      FreeBSD License
+# Version:      0.1
+#-------------------------------------------------------------------------------
+
+# Import modules
+import os
+import sys
+import argparse
+import calendar
+import gdal
+import get_swaths
+import preprocess
+import predict_temp
+from lib import run_config
+from lib import job_queue
+from lib import run_report
+from lib import stage_profile
+from lib import download_stats
+
+# Run configs and stage caches of worker processes, by config file
+_configs = {}
+_caches = {}
+
+# Dates of the MODIS product directories listed by a worker process, by URL, so each is
+# listed once per process rather than by every tile unit
+_listings = {}
+
+
+def year_days(config, year):
+    """Returns the julian days of a year within the run config's day range."""
+    last_day = 366 if calendar.isleap(year) else 365
+    return range(config['doy_start'], min(config['doy_end'], last_day) + 1)
+
+
+def hdf_dir(config, year):
+    """Returns the download directory of the HDF files of a year."""
+    return get_swaths.build_dir_list(config['proj_dir'], [year], [config['product']])[0]
+
+
+def year_dir(config, year):
+    """Returns the preprocessing directory of a year."""
+    return os.path.join(config['proj_dir'], str(year))
+
+
+def init_queue(config_file, config):
+    """Creates the download and preprocessing directories, and adds the units of every year,
+    date and tile of a run config to its job queue. Units already in the queue are kept,
+    so a queue can be initialized again to extend it. Returns the queue."""
+    print "Initializing job queue %s..." % config['queue_dir']
+    queue = job_queue.JobQueue(config['queue_dir'], config['lease_seconds'])
+    for year in config['years']:
+        for out_dir in [hdf_dir(config, year)] + [os.path.join(year_dir(config, year), d)
+                                                  for d in preprocess.PREPROCESS_DIRS]:
+            if not os.path.exists(out_dir):
+                os.makedirs(out_dir)
+        date_units = []
+        for doy in year_days(config, year):
+            tile_units = [queue.add('tile_%d_%03d_%s' % (year, doy, tile),
+                                    {'stage': 'tile', 'config': config_file, 'year': year,
+                                     'doy': doy, 'tile': tile})
+                          for tile in config['tiles']]
+            date_units.append(queue.add('date_%d_%03d' % (year, doy),
+                                        {'stage': 'date', 'config': config_file, 'year': year, 'doy': doy},
+                                        after=tile_units))
+        queue.add('merge_%d' % year,
+                  {'stage': 'merge', 'config': config_file, 'year': year, 'dates': date_units},
+                  after=date_units)
+    print "%d units queued." % len(queue.unit_ids())
+    return queue
+
+
+def run_tile(config, year, doy, tile, cache=None):
+    """Downloads the HDF file of one date and tile, if needed, and converts it to a geotiff.
+    Returns the geotiff, or None if there is no HDF file for the date. The unit fails if the
+    HDF file cannot be downloaded, so it can be retried later."""
+    if config['download']:
+        get_swaths.download_hdf([config['product']], [year], [tile], doy, doy, config['proj_dir'],
+                                config['username'], config['password'], config['proxy'],
+                                run_config.download_policy(config), int(config['max_connections']),
+                                strict=True, listings=_listings)
+    date_tile = '.A%d%03d.%s.' % (year, doy, tile)
+    names, paths = get_swaths.get_hdf_filepaths([hdf_dir(config, year)])
+    found = [(n, p) for n, p in zip(names, paths) if date_tile in os.path.basename(p)]
+    if not found:
+        return None
+    tif_dir = os.path.join(year_dir(config, year), preprocess.PREPROCESS_DIRS[0])
+    geotiff_list, xres, yres = preprocess.convert_hdf(year_dir(config, year), [tif_dir],
+                                                      [found[0][1]], [found[0][0]], cache)
+    return geotiff_list[0]
+
+
+def run_date(config, year, doy, cache=None):
+    """Mosaics, reprojects and clips, fills and tabulates the LST grid of one date. Returns
+    the LST csv table and reprojected grid of the date, or None if a tile is missing."""
+    date = 'A%d%03d' % (year, doy)
+    tif_dir = os.path.join(year_dir(config, year), preprocess.PREPROCESS_DIRS[0])
+    tif_list = sorted(os.path.join(tif_dir, f) for f in os.listdir(tif_dir)
+                      if '.%s.' % date in f and f.endswith('.tif'))
+    if len(tif_list) < len(config['tiles']):
+        return None
+    proj_dir = year_dir(config, year)
+    modis_wkt = preprocess.find_modis_wkt()
+    geotransform = gdal.Open(tif_list[0]).GetGeoTransform()
+    mosaic_io_array = preprocess.build_mosaic_io_array(tif_list, [date])
+    vrt_list = preprocess.convert_to_vrt(mosaic_io_array, config['tiles'], proj_dir,
+                                         preprocess.PREPROCESS_DIRS, modis_wkt, cache)
+    reprj_list = preprocess.reproject_rasters(vrt_list, proj_dir, preprocess.PREPROCESS_DIRS, modis_wkt,
+                                              preprocess.get_poly_wkt(config['rca_shp']),
+                                              preprocess.get_bbox(config['rca_shp']),
+                                              abs(geotransform[1]), abs(geotransform[5]), config['rca_shp'],
+                                              cache)
+    fill_list = preprocess.spatial_fill_rasters(reprj_list)
+    csv_list = preprocess.LST_to_csv(fill_list, proj_dir, preprocess.PREPROCESS_DIRS, cache)
+    return {'csv': csv_list[0], 'grid': reprj_list[0]}
+
+
+def run_merge(config, year, date_units):
+    """Merges the LST csv tables of every date of a year into the LST table. Returns the
+    LST table and the reprojected grid of the first date."""
+    queue = job_queue.JobQueue(config['queue_dir'], config['lease_seconds'])
+    results = [r for r in (queue.result(u) for u in date_units) if r is not None]
+    if not results:
+        raise ValueError("No LST grids were processed for %d" % year)
+    acq_date_list = preprocess.build_acq_date_list([r['csv'] for r in results])
+    lst_csv = preprocess.build_interpl_table(acq_date_list, year_dir(config, year), preprocess.PREPROCESS_DIRS)
+    return {'lst_csv': lst_csv, 'grid': results[0]['grid']}
+
+
+def run_unit(spec):
+    """Runs one unit of the job queue. Used as the job_queue worker function."""
+    if spec['config'] not in _configs:
+        _configs[spec['config']] = run_config.load_config(spec['config'])
+        _caches[spec['config']] = run_config.open_cache(_configs[spec['config']])
+        stage_profile.configure(_configs[spec['config']]['profile'],
+                                os.path.join(_configs[spec['config']]['proj_dir'], 'temp', 'profiles',
+                                             job_queue.worker_name()))
+    config = _configs[spec['config']]
+    cache = _caches[spec['config']]
+    try:
+        if spec['stage'] == 'tile':
+            return run_tile(config, spec['year'], spec['doy'], spec['tile'], cache)
+        if spec['stage'] == 'date':
+            return run_date(config, spec['year'], spec['doy'], cache)
+        if spec['stage'] == 'merge':
+            return run_merge(config, spec['year'], spec['dates'])
+        raise ValueError("Unknown unit stage: %s" % spec['stage'])
+    finally:
+        run_report.current().write(os.path.join(config['queue_dir'], 'reports',
+                                                '%s.json' % job_queue.worker_name()))
+        download_stats.current().write(os.path.join(config['queue_dir'], 'reports',
+                                                    '%s.downloads.json' % job_queue.worker_name()))
+        stage_profile.write()
+
+
+def predict(config):
+    """Predicts stream temperatures from the merged LST table of every year, in order.
+    Returns the GeoPackage of predictions."""
+    queue = job_queue.JobQueue(config['queue_dir'], config['lease_seconds'])
+    out_gpkg = None
+    for year in config['years']:
+        if queue.status('merge_%d' % year) != 'done':
+            raise ValueError("The LST table of %d has not been merged yet" % year)
+        merged = queue.result('merge_%d' % year)
+        out_gpkg = predict_temp.main(merged['lst_csv'], merged['grid'], config['rca_shp'],
+                                     config['rca_id_field'], config['stream_shp'],
+                                     config['stream_id_field'], config['obs_csv'],
+                                     os.path.join(config['proj_dir'], 'output'), config['n_folds'],
+                                     config['n_workers'], config['fill_method'], config['area_weighted'])
+    return out_gpkg
+
+
+def parse_args(argv=None):
+    """Parses the command line options."""
+    parser = argparse.ArgumentParser(description="Run STeAMM preprocessing through a shared job queue.")
+    parser.add_argument('command', choices=['init', 'work', 'status', 'retry', 'predict'])
+    parser.add_argument('config', help="JSON run config file")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="number of worker processes to run on this host")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config_file = os.path.abspath(args.config)
+    try:
+        config = run_config.load_config(config_file)
+    except ValueError as e:
+        print "Invalid run config: %s" % e
+        return 2
+    if config['basins']:
+        print "Sharded runs take single basin run configs; use batch.py for multi-basin runs."
+        return 2
+    queue = job_queue.JobQueue(config['queue_dir'], config['lease_seconds'])
+    if args.command == 'init':
+        init_queue(config_file, config)
+    elif args.command == 'work':
+        if args.processes > 1:
+            job_queue.run_workers(config['queue_dir'], run_unit, args.processes, config['lease_seconds'])
+        else:
+            job_queue.run_worker(config['queue_dir'], run_unit, config['lease_seconds'])
+    elif args.command == 'retry':
+        print "%d failed units queued again." % queue.retry_failed()
+    elif args.command == 'predict':
+        print "Predictions written to %s" % predict(config)
+    counts = queue.counts()
+    print "Units done: %d, failed: %d, running: %d, pending: %d" % \
+          (counts['done'], counts['failed'], counts['leased'], counts['pending'])
+    for unit_id, error in sorted(queue.errors().items()):
+        print "%s failed:\n%s" % (unit_id, error)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -22,11 +22,16 @@
 """
 
 import os
+import glob
 
-from PyQt4 import QtGui, uic
+from PyQt4 import QtGui
 
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'dialog_predict.ui'))
+# Dialog class precompiled from dialog_predict.ui with pyuic4
+from ui_dialog_predict import Ui_PredictTempDialog as FORM_CLASS
+
+# ID fields of the polygon (RCA) and stream network shapefiles
+RCA_ID_FIELD = 'RCA_ID'
+STREAM_ID_FIELD = 'REACH_ID'
 
 
 class PredictDialog(QtGui.QDialog, FORM_CLASS):
@@ -39,3 +44,17 @@ class PredictDialog(QtGui.QDialog, FORM_CLASS):
         # http://qt-project.org/doc/qt-4.8/designer-using-a-ui-file.html
         # #widgets-and-dialogs-with-auto-connect
         self.setupUi(self)
+
+    def tool_args(self):
+        """Returns the arguments of predict_temp.main entered in the dialog. The MODIS
+        directory is the mosaic directory of a preprocessed year, holding its LST table and
+        LST grids; predictions are written to 'output' beside it. Raises ValueError if the
+        directory holds no LST table or grids."""
+        modis_dir = self.lineEdit_MODISData.text()
+        lst_csvs = sorted(glob.glob(os.path.join(modis_dir, 'LST_*.csv')))
+        ref_rasters = sorted(glob.glob(os.path.join(modis_dir, '*_reprj.tif')))
+        if not lst_csvs or not ref_rasters:
+            raise ValueError("No preprocessed LST table and grids found in %s" % modis_dir)
+        return (lst_csvs[0], ref_rasters[0], self.lineEdit_PolygonShp.text(), RCA_ID_FIELD,
+                self.lineEdit_StreamShp.text(), STREAM_ID_FIELD, self.lineEdit.text(),
+                os.path.join(os.path.dirname(os.path.abspath(modis_dir)), 'output'))
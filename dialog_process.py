@@ -21,14 +21,12 @@
  ***************************************************************************/
 """
 
-import os
 import datetime
-import steamm
 
-from PyQt4 import QtGui, uic
+from PyQt4 import QtGui
 
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'dialog_process.ui'))
+# Dialog class precompiled from dialog_process.ui with pyuic4
+from ui_dialog_process import Ui_ProcessDialog as FORM_CLASS
 
 
 class ProcessDialog(QtGui.QDialog, FORM_CLASS):
@@ -41,6 +39,9 @@ class ProcessDialog(QtGui.QDialog, FORM_CLASS):
         # http://qt-project.org/doc/qt-4.8/designer-using-a-ui-file.html
         # #widgets-and-dialogs-with-auto-connect
         self.setupUi(self)
+        self.load_product_id()
+        self.load_swath_id()
+        self.load_years()
 
         # self.cbo_ProductID()
         # self.cbo_SwathID()
@@ -53,14 +54,14 @@ class ProcessDialog(QtGui.QDialog, FORM_CLASS):
         # self.text_StatusConsole()
 
     def load_product_id(self):
-        product_list = ['MOD11A1.005''MOD11A2.005']
+        product_list = ['MOD11A1.005', 'MOD11A2.005']
         self.cbo_ProductID.clear()
         self.cbo_ProductID.addItems(product_list)
 
     def load_swath_id(self):
         swath_list = ['h08v04', 'h08v05',
-                      'h09v03', 'h09v04', 'h09v05', 'h09v06'
-                      'h10v03', 'h10v04', 'h10v05', 'h10v06'
+                      'h09v03', 'h09v04', 'h09v05', 'h09v06',
+                      'h10v03', 'h10v04', 'h10v05', 'h10v06',
                       'h11v03', 'h11v04', 'h11v05', 'h11v06']
         self.cbo_SwathID.clear()
         self.cbo_SwathID.addItems(swath_list)
@@ -69,12 +70,18 @@ class ProcessDialog(QtGui.QDialog, FORM_CLASS):
         now = datetime.datetime.now()
         year_list = []
         for yr in range(2000, now.year, 1):
-            year_list.append(yr)
+            year_list.append(str(yr))
 
         self.cbo_ProcessYear.clear()
         self.cbo_ProcessYear.addItems(year_list)
 
-    def exec(self):
-
-
-if __name__ == "__main__":
+    def tool_args(self):
+        """Returns the arguments of get_swaths.main entered in the dialog."""
+        return (self.lineEdit_DataDir.text(),
+                [self.cbo_ProductID.currentText()],
+                [int(self.cbo_ProcessYear.currentText())],
+                [self.cbo_SwathID.currentText()],
+                int(self.lineEdit_DoYStart.text()),
+                int(self.lineEdit_DoYEnd.text()),
+                self.lineEdit_Username.text(),
+                self.lineEdit_Password.text())
@@ -22,22 +22,20 @@
 """
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
+from qgis.core import QgsMessageLog
+from qgis.gui import QgsMessageBar
 # Initialize Qt resources from file resources.py
 import resources
-# Import the code for the dialog
-from dialog_process import ProcessDialog
-from dialog_predict import PredictDialog
+# Import the background task runner
+from steamm_task import SteammTask, TaskQueue
 
 import os
 import os.path
 
 # TODO refactor to include Get MODIS Data and Preprocess MODIS Data tools.
 
-# Import the preprocessing module
-import get_swaths.preprocess as process
-
-# Import the prediction module
-import predict_temp.predict_temp as predict
+# The dialogs and the processing modules (which import GDAL and numpy) are
+# imported when a tool is first run, so loading the plugin stays fast.
 
 
 class STeAMM:
@@ -69,10 +67,10 @@ class STeAMM:
             if qVersion() > '4.3.3':
                 QCoreApplication.installTranslator(self.translator)
 
-        # Create the dialog (after translation) and keep reference
+        # The dialogs are created (after translation) when first shown
         #TODO add entry for 'Get MODIS Data' tool
-        self.dlg1 = ProcessDialog()
-        self.dlg2 = PredictDialog()
+        self.dlg1 = None
+        self.dlg2 = None
 
         # Declare instance attributes
         self.actions = []
@@ -81,6 +79,15 @@ class STeAMM:
         self.toolbar = self.iface.addToolBar(u'STeAMM')
         self.toolbar.setObjectName(u'STeAMM')
 
+        # Long running tools are queued and run in a background thread
+        self.tasks = TaskQueue()
+        self.tasks.task_started.connect(self.task_started)
+        self.tasks.task_progress.connect(self.task_progress)
+        self.tasks.task_message.connect(self.task_message)
+        self.tasks.task_finished.connect(self.task_finished)
+        self.tasks.task_canceled.connect(self.task_canceled)
+        self.tasks.task_error.connect(self.task_error)
+
 
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
@@ -192,8 +199,17 @@ class STeAMM:
             parent=self.iface.mainWindow()
         )
 
+        self.add_action(
+            icon_path2,
+            text=self.tr(u'Cancel Running Tasks'),
+            callback=self.tasks.cancel_all,
+            add_to_toolbar=False,
+            parent=self.iface.mainWindow()
+        )
+
     def unload(self):
         """Removes the plugin menu item and icon from QGIS GUI."""
+        self.tasks.shutdown()
         for action in self.actions:
             self.iface.removePluginMenu(
                 self.tr(u'&STeAMM'),
@@ -204,23 +220,86 @@ class STeAMM:
 
     #TODO add get Get MODIS Data tool run method here
 
+    def submit_task(self, description, function, *args):
+        """Queue a tool to run in a background thread. The function is called
+        with args, and a feedback keyword argument to report progress and to
+        check for cancellation.
+
+        :param description: Task description shown to the user.
+        :type description: str
+
+        :param function: Function that runs the tool.
+        :type function: function
+
+        :returns: The queued task.
+        :rtype: SteammTask
+        """
+        task = SteammTask(description, function, args, use_feedback=True)
+        self.tasks.submit(task)
+        return task
+
+    def task_started(self, task):
+        """Show the running task in the status bar."""
+        self.iface.mainWindow().statusBar().showMessage(
+            self.tr(u'Running {}...').format(task.description))
+
+    def task_progress(self, task, percent):
+        """Show the progress of the running task in the status bar."""
+        self.iface.mainWindow().statusBar().showMessage(
+            u'{}: {:.0f}%'.format(task.description, percent))
+
+    def task_message(self, task, message):
+        """Write a task status message to the message log."""
+        QgsMessageLog.logMessage(message, u'STeAMM')
+
+    def task_finished(self, task, result):
+        """Report a finished task in the message bar."""
+        self.iface.messageBar().pushMessage(
+            u'STeAMM', self.tr(u'{} finished.').format(task.description),
+            level=QgsMessageBar.INFO)
+
+    def task_canceled(self, task):
+        """Report a canceled task in the message bar."""
+        self.iface.messageBar().pushMessage(
+            u'STeAMM', self.tr(u'{} canceled.').format(task.description),
+            level=QgsMessageBar.WARNING)
+
+    def task_error(self, task, trace):
+        """Report a failed task in the message bar and the message log."""
+        QgsMessageLog.logMessage(trace, u'STeAMM', QgsMessageLog.CRITICAL)
+        self.iface.messageBar().pushMessage(
+            u'STeAMM', self.tr(u'{} failed. See the message log.').format(task.description),
+            level=QgsMessageBar.CRITICAL)
+
     def run1(self):
         """Run method that performs all the real work"""
+        if self.dlg1 is None:
+            from dialog_process import ProcessDialog
+            self.dlg1 = ProcessDialog()
         self.dlg1.show() # show the dialog
         result = self.dlg1.exec_() # Run the dialog event loop
         if result: # See if OK was pressed
-            process.main()
-            #process.main(data_dir, data_product, process_yr, swath_id, geo_rca, doy_start_str, doy_end_str, username, password)
+            from STeAMM import get_swaths as process
+            self.submit_task(self.tr(u'Get MODIS Swaths'), process.main, *self.dlg1.tool_args())
         pass
 
 
     def run2(self):
         """Run method for the Predict Temperature tool."""
+        if self.dlg2 is None:
+            from dialog_predict import PredictDialog
+            self.dlg2 = PredictDialog()
         # show the dialog
         self.dlg2.show()
         # Run the dialog event loop
         result = self.dlg2.exec_()
         # See if OK was pressed
         if result:
-            predict.main()
+            from STeAMM import predict_temp as predict
+            try:
+                args = self.dlg2.tool_args()
+            except ValueError as e:
+                self.iface.messageBar().pushMessage(u'STeAMM', str(e), level=QgsMessageBar.WARNING)
+                return
+            self.submit_task(self.tr(u'Predict Stream Temperatures'), predict.main, *args)
             pass
\ No newline at end of file
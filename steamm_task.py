@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ STeAMMTask
+                                 A QGIS plugin
+ Stream Temperature Automated Modeler using MODIS
+                             -------------------
+        begin                : 2016-09-08
+        git sha              : $Format:%H$
+        copyright            : (C) 2016 by South Fork Research, Inc.
+        email                : jesse@southforkresearch.org
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+ Background execution of long running STeAMM tools, so QGIS stays
+ responsive while MODIS data is downloaded, processed and modeled.
+"""
+import traceback
+
+from PyQt4.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+
+class TaskCanceled(Exception):
+    """Raised inside a task function when the task has been canceled."""
+    pass
+
+
+class TaskFeedback(object):
+    """Progress reporting and cancellation handle passed to task functions."""
+
+    def __init__(self, task):
+        self._task = task
+        self._canceled = False
+
+    def set_progress(self, percent):
+        """Report task progress, from 0 to 100.
+
+        :param percent: Percentage of the task completed.
+        :type percent: float
+        """
+        self._task.progress.emit(float(percent))
+
+    def set_message(self, message):
+        """Report a status message.
+
+        :param message: Status message to show to the user.
+        :type message: str
+        """
+        self._task.message.emit(message)
+
+    def cancel(self):
+        """Request cancellation of the task."""
+        self._canceled = True
+
+    def is_canceled(self):
+        """Whether cancellation of the task has been requested.
+
+        :returns: True if the task has been canceled.
+        :rtype: bool
+        """
+        return self._canceled
+
+    def check_canceled(self):
+        """Raise TaskCanceled if cancellation of the task has been requested.
+        Long running functions should call this between units of work."""
+        if self._canceled:
+            raise TaskCanceled()
+
+    def report(self, percent, message=None):
+        """Report progress between the steps of a tool, raising TaskCanceled
+        first if cancellation of the task has been requested.
+
+        :param percent: Percentage of the task completed.
+        :type percent: float
+
+        :param message: Status message of the next step, if any.
+        :type message: str
+        """
+        self.check_canceled()
+        if message is not None:
+            self.set_message(message)
+        self.set_progress(percent)
+
+
+class SteammTask(QObject):
+    """A function call to be run in a background thread.
+
+    The function is called with a ``feedback`` keyword argument (a TaskFeedback)
+    if ``use_feedback`` is True, which it can use to report progress and to
+    check for cancellation.
+
+    :param description: Task description shown to the user.
+    :type description: str
+
+    :param function: Function to call in the background thread.
+    :type function: function
+
+    :param use_feedback: Whether to pass the feedback keyword argument.
+    :type use_feedback: bool
+    """
+    progress = pyqtSignal(float)
+    message = pyqtSignal(str)
+    finished = pyqtSignal(object)
+    canceled = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, description, function, args=(), kwargs=None, use_feedback=False):
+        super(SteammTask, self).__init__()
+        self.description = description
+        self.function = function
+        self.args = args
+        self.kwargs = dict(kwargs or {})
+        self.feedback = TaskFeedback(self)
+        if use_feedback:
+            self.kwargs['feedback'] = self.feedback
+
+    def cancel(self):
+        """Request cancellation of the task."""
+        self.feedback.cancel()
+
+    @pyqtSlot()
+    def run(self):
+        """Run the task function and deliver the result, cancellation or error by signal."""
+        try:
+            self.feedback.check_canceled()
+            result = self.function(*self.args, **self.kwargs)
+        except TaskCanceled:
+            self.canceled.emit()
+        except Exception:
+            self.error.emit(traceback.format_exc())
+        else:
+            self.progress.emit(100.0)
+            self.finished.emit(result)
+
+
+class TaskQueue(QObject):
+    """Runs queued SteammTasks one at a time in a background thread.
+
+    Task signals are relayed by the queue, which lives in the GUI thread, so
+    handlers connected to the queue's signals can safely update the GUI.
+
+    :param parent: Parent object of the queue.
+    :type parent: QObject
+    """
+    task_started = pyqtSignal(object)
+    task_progress = pyqtSignal(object, float)
+    task_message = pyqtSignal(object, str)
+    task_finished = pyqtSignal(object, object)
+    task_canceled = pyqtSignal(object)
+    task_error = pyqtSignal(object, str)
+
+    def __init__(self, parent=None):
+        super(TaskQueue, self).__init__(parent)
+        self.pending = []
+        self.current = None
+        self.thread = None
+
+    def submit(self, task):
+        """Add a task to the queue, and start it if no other task is running.
+
+        :param task: Task to run.
+        :type task: SteammTask
+        """
+        self.pending.append(task)
+        if self.current is None:
+            self._start_next()
+
+    def cancel_all(self):
+        """Cancel the running task and drop all queued tasks."""
+        pending = self.pending
+        self.pending = []
+        for task in pending:
+            self.task_canceled.emit(task)
+        if self.current is not None:
+            self.current.cancel()
+
+    def shutdown(self):
+        """Cancel all tasks, and wait for the running task to stop and its
+        thread to finish. Called when the plugin is unloaded."""
+        self.cancel_all()
+        task = self.current
+        thread = self.thread
+        if thread is not None:
+            # the plugin is going away, so its handlers must not see the task end
+            for signal in (task.progress, task.message, task.finished, task.canceled, task.error):
+                signal.disconnect()
+            thread.finished.disconnect(self._task_done)
+            thread.quit()
+            thread.wait()
+            self.current = None
+            self.thread = None
+
+    def is_running(self):
+        """Whether a task is running.
+
+        :rtype: bool
+        """
+        return self.current is not None
+
+    def _start_next(self):
+        if not self.pending:
+            return
+        task = self.pending.pop(0)
+        thread = QThread()
+        task.moveToThread(thread)
+        thread.started.connect(task.run)
+        task.progress.connect(self._progress)
+        task.message.connect(self._message)
+        task.finished.connect(self._finished)
+        task.canceled.connect(self._canceled)
+        task.error.connect(self._error)
+        for signal in (task.finished, task.canceled, task.error):
+            signal.connect(thread.quit)
+        thread.finished.connect(self._task_done)
+        self.current = task
+        self.thread = thread
+        self.task_started.emit(task)
+        thread.start()
+
+    @pyqtSlot(float)
+    def _progress(self, percent):
+        self.task_progress.emit(self.current, percent)
+
+    @pyqtSlot(str)
+    def _message(self, message):
+        self.task_message.emit(self.current, message)
+
+    @pyqtSlot(object)
+    def _finished(self, result):
+        self.task_finished.emit(self.current, result)
+
+    @pyqtSlot()
+    def _canceled(self):
+        self.task_canceled.emit(self.current)
+
+    @pyqtSlot(str)
+    def _error(self, trace):
+        self.task_error.emit(self.current, trace)
+
+    @pyqtSlot()
+    def _task_done(self):
+        self.current = None
+        self.thread = None
+        self._start_next()
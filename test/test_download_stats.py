@@ -0,0 +1,159 @@
+# coding=utf-8
+"""Tests for the download telemetry module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+from STeAMM.lib import download_stats
+try:
+    # get_modis is Python 2 only
+    import urllib2
+    import SimpleHTTPServer
+    import SocketServer
+    from STeAMM.lib import get_modis
+except ImportError:
+    get_modis = None
+
+HOST = 'http://e4ftl01.cr.usgs.gov'
+MB = 1024 * 1024
+
+
+class DownloadStatsTest(unittest.TestCase):
+    """Test recording download requests."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.stats = download_stats.DownloadStats()
+
+    def request(self, url, n_bytes=0, status=200, retries=0, error=None):
+        start = self.stats.start()
+        return self.stats.record(url, start, 0.01, n_bytes, status, retries, error)
+
+    def test_snapshot(self):
+        """Requests add up per host, by status, and into the latency histograms."""
+        self.request(HOST + '/MOLT/MOD11A1.005/2015.01.01/', 4096)
+        self.request(HOST + '/MOLT/MOD11A1.005/2015.01.01/a.hdf', 1024 * 1024, retries=1)
+        self.request(HOST + '/MOLT/MOD11A1.005/2015.01.01/a.hdf', 1024 * 1024, retries=2)
+        self.request('https://urs.earthdata.nasa.gov/oauth', status=503, error='Service Unavailable')
+        s = self.stats.snapshot()
+        self.assertEqual((s['requests'], s['errors'], s['retries'], s['in_flight']), (4, 1, 2, 0))
+        self.assertEqual(s['bytes'], 4096 + 2 * 1024 * 1024)
+        self.assertEqual(s['status'], {'200': 3, '503': 1})
+        self.assertEqual(s['hosts']['e4ftl01.cr.usgs.gov']['requests'], 3)
+        self.assertEqual(s['hosts']['urs.earthdata.nasa.gov']['errors'], 1)
+        self.assertEqual((s['latency']['count'], s['ttfb']['count']), (4, 4))
+        self.assertEqual(s['ttfb']['p50'], 0.01)
+
+    def test_throughput(self):
+        """Host throughput is over the wall time of its requests, and download throughput
+        only counts successful granule downloads."""
+        now = time.time()
+        for start, url, n_bytes, error, download in (
+                (now - 3.0, HOST + '/MOLT/MOD11A1.005/2015.01.01/', 4096, None, False),
+                (now - 2.0, HOST + '/MOLT/MOD11A1.005/2015.01.01/a.hdf', MB, None, True),
+                (now - 2.0, HOST + '/MOLT/MOD11A1.005/2015.01.01/b.hdf', MB, None, True),
+                (now - 1.0, HOST + '/MOLT/MOD11A1.005/2015.01.01/c.hdf', 0, 'timed out', True)):
+            self.stats.start()
+            self.stats.record(url, start, n_bytes=n_bytes, error=error, download=download)
+        host = self.stats.snapshot()['hosts']['e4ftl01.cr.usgs.gov']
+        self.assertEqual((host['requests'], host['downloads'], host['download_bytes']), (4, 2, 2 * MB))
+        self.assertTrue(7.9 < host['seconds'] < 8.5)
+        self.assertTrue(2.9 < host['wall_seconds'] < 3.5)
+        self.assertTrue(1.9 < host['download_seconds'] < 2.5)
+        self.assertTrue(0.55 < host['mb_per_second'] < 0.7)
+        self.assertTrue(0.8 < host['download_mb_per_second'] < 1.05)
+        self.assertTrue('2 downloads at' in self.stats.summary())
+
+    def test_histogram(self):
+        """Percentiles are bounded by the bucket holding them, or the maximum."""
+        histogram = download_stats.Histogram((1.0, 10.0))
+        self.assertTrue(histogram.percentile(50) is None)
+        for value in (0.2, 0.5, 3.0, 4.0, 50.0):
+            histogram.add(value)
+        self.assertEqual(histogram.counts, [2, 2, 1])
+        self.assertEqual((histogram.percentile(40), histogram.percentile(80), histogram.percentile(99)),
+                         (1.0, 10.0, 50.0))
+
+    def test_callbacks(self):
+        """Callbacks see every request, from every thread, and cannot break a download."""
+        seen = []
+        self.stats.add_callback(lambda request: seen.append(request['bytes']))
+        self.stats.add_callback(lambda request: 1 / 0)
+
+        def work():
+            for i in range(50):
+                self.request(HOST + '/a.hdf', 10)
+        threads = [threading.Thread(target=work) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(seen), 200)
+        self.assertEqual(self.stats.snapshot()['bytes'], 2000)
+
+    def test_write(self):
+        """The snapshot is written as JSON, and the module level telemetry keeps callbacks on reset."""
+        out_dir = tempfile.mkdtemp()
+        try:
+            self.request(HOST + '/a.hdf', 10)
+            out_file = self.stats.write(os.path.join(out_dir, 'reports', 'download_stats.json'))
+            with open(out_file, 'r') as in_json:
+                self.assertEqual(json.load(in_json)['hosts']['e4ftl01.cr.usgs.gov']['bytes'], 10)
+            self.assertTrue('e4ftl01.cr.usgs.gov' in self.stats.summary())
+        finally:
+            shutil.rmtree(out_dir)
+        seen = []
+        download_stats.current().add_callback(seen.append)
+        stats = download_stats.reset()
+        stats.record(HOST + '/a.hdf', stats.start())
+        self.assertEqual(len(seen), 1)
+        download_stats.current().remove_callback(seen.append)
+
+    @unittest.skipIf(get_modis is None, "get_modis requires Python 2")
+    def test_fetch_url(self):
+        """get_modis records the requests it makes, including failed ones."""
+        out_dir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        with open(os.path.join(out_dir, 'a.hdf'), 'wb') as out:
+            out.write('LST' * 1000)
+        os.chdir(out_dir)
+        server = SocketServer.TCPServer(('127.0.0.1', 0), SimpleHTTPServer.SimpleHTTPRequestHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            url = 'http://127.0.0.1:%d/' % server.server_address[1]
+            lines = get_modis.fetch_url(urllib2.Request(url + 'a.hdf'), self.stats)
+            self.assertEqual(''.join(lines), 'LST' * 1000)
+            self.assertEqual(get_modis.url_size(urllib2.Request(url + 'a.hdf'), self.stats), 3000)
+            self.assertRaises(urllib2.HTTPError, get_modis.fetch_url,
+                              urllib2.Request(url + 'missing.hdf'), self.stats)
+            s = self.stats.snapshot()
+            self.assertEqual((s['requests'], s['errors'], s['bytes']), (3, 1, 3000))
+            self.assertEqual(s['status'], {'200': 2, '404': 1})
+        finally:
+            server.shutdown()
+            server.server_close()
+            os.chdir(cwd)
+            shutil.rmtree(out_dir)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(DownloadStatsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
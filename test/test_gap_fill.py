@@ -0,0 +1,158 @@
+# coding=utf-8
+"""Tests for the LST gap filling module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+
+import numpy as np
+
+from STeAMM.lib import gap_fill
+
+
+class FillLinearTest(unittest.TestCase):
+    """Test linear gap filling along the day axis."""
+
+    def test_interior_gaps(self):
+        """Interior gaps are interpolated between the nearest valid days."""
+        lst = np.array([[1.0, np.nan, np.nan, 4.0],
+                        [2.0, np.nan, 6.0, np.nan]])
+        filled = gap_fill.fill_linear(lst)
+        np.testing.assert_allclose(filled[0], [1.0, 2.0, 3.0, 4.0])
+        np.testing.assert_allclose(filled[1], [2.0, 4.0, 6.0, 6.0])
+
+    def test_edges_and_empty_rows(self):
+        """Leading gaps are back-filled and empty rows remain empty."""
+        lst = np.array([[np.nan, np.nan, 5.0, 7.0],
+                        [np.nan, np.nan, np.nan, np.nan]])
+        filled = gap_fill.fill_linear(lst)
+        np.testing.assert_allclose(filled[0], [5.0, 5.0, 5.0, 7.0])
+        self.assertTrue(np.isnan(filled[1]).all())
+
+    def test_uneven_days_and_chunks(self):
+        """Uneven day spacing is honoured regardless of chunk size."""
+        lst = np.tile([10.0, np.nan, 20.0], (5, 1))
+        filled = gap_fill.fill_linear(lst, days=[1, 2, 5], chunk_size=2)
+        np.testing.assert_allclose(filled[:, 1], 12.5)
+
+    def test_to_nan(self):
+        """Zero and nodata values are converted to NaN."""
+        lst = gap_fill.to_nan([[0, 300, -999]])
+        self.assertTrue(np.isnan(lst[0, 0]) and np.isnan(lst[0, 2]))
+        self.assertEqual(lst[0, 1], 300)
+
+
+class FillHarmonicTest(unittest.TestCase):
+    """Test harmonic regression gap filling."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.days = np.arange(1, 366, dtype=np.float64)
+        design = gap_fill.harmonic_design(self.days)
+        self.coef = np.array([[290.0, -10.0, 2.0, 1.0, 0.5],
+                              [280.0, -5.0, 1.0, 0.0, 0.0]])
+        self.truth = self.coef.dot(design.T)
+
+    def test_fit_recovers_coefficients(self):
+        """Coefficients of a noise free series are recovered with gaps present."""
+        lst = self.truth.copy()
+        lst[0, 100:200] = np.nan
+        lst[1, ::3] = np.nan
+        coef = gap_fill.fit_harmonic(lst, self.days, chunk_size=1)
+        np.testing.assert_allclose(coef, self.coef, atol=1e-4)
+
+    def test_sparse_rows_not_fitted(self):
+        """Rows with too few valid days get NaN coefficients."""
+        lst = np.full((1, 365), np.nan)
+        lst[0, :5] = 290.0
+        self.assertTrue(np.isnan(gap_fill.fit_harmonic(lst, self.days)).all())
+
+    def test_hybrid_fill(self):
+        """Short gaps are filled linearly and long gaps from the harmonic curve."""
+        lst = self.truth.copy()
+        lst[0, 10] = np.nan
+        lst[0, 100:200] = np.nan
+        filled = gap_fill.fill_gaps(lst, self.days, method='hybrid', max_gap=8)
+        linear = gap_fill.fill_linear(lst, self.days)
+        self.assertEqual(filled[0, 10], linear[0, 10])
+        np.testing.assert_allclose(filled[0, 100:200], self.truth[0, 100:200], atol=1e-4)
+
+
+class FillSpatialTest(unittest.TestCase):
+    """Test spatial gap filling of gridded LST values."""
+
+    def test_fill_from_neighbors(self):
+        """Missing cells are filled with the mean of valid neighbors on the same day."""
+        lst = np.arange(2 * 4 * 4, dtype=np.float64).reshape(2, 4, 4)
+        lst[0, 1, 1] = np.nan
+        lst[1, 0, 0] = np.nan
+        filled = gap_fill.fill_spatial(lst, day_chunk_size=1)
+        self.assertAlmostEqual(filled[0, 1, 1], 5.0)
+        self.assertAlmostEqual(filled[1, 0, 0], (17.0 + 20.0 + 21.0) / 3)
+
+    def test_too_few_neighbors(self):
+        """Cells with fewer than min_neighbors valid neighbors remain missing."""
+        lst = np.full((1, 3, 3), np.nan)
+        lst[0, 0, 0] = 1.0
+        lst[0, 0, 1] = 2.0
+        filled = gap_fill.fill_spatial(lst, min_neighbors=2)
+        self.assertAlmostEqual(filled[0, 1, 1], 1.5)
+        self.assertTrue(np.isnan(filled[0, 2, 2]))
+
+    def test_asymmetric_kernel(self):
+        """Asymmetric kernels are applied as a convolution, including their zero weights."""
+        kernel = np.array([[0.0, 2.0, 0.0],
+                           [0.0, 0.0, 3.0],
+                           [0.0, 0.0, 0.0]])
+        lst = np.random.RandomState(0).rand(2, 5, 6)
+        lst[0, 2, 3] = np.nan
+        lst[1, 0, 1] = np.nan
+        val_sum, wgt_sum = gap_fill.masked_convolve(lst, kernel)
+        expected_val = np.zeros(lst.shape)
+        expected_wgt = np.zeros(lst.shape)
+        for d in range(2):
+            for r in range(5):
+                for c in range(6):
+                    for a in range(3):
+                        for b in range(3):
+                            rr, cc = r - (a - 1), c - (b - 1)
+                            if 0 <= rr < 5 and 0 <= cc < 6 and not np.isnan(lst[d, rr, cc]):
+                                expected_val[d, r, c] += kernel[a, b] * lst[d, rr, cc]
+                                expected_wgt[d, r, c] += kernel[a, b]
+        np.testing.assert_allclose(val_sum, expected_val)
+        np.testing.assert_allclose(wgt_sum, expected_wgt)
+
+    def test_fill_missing_cells(self):
+        """Dates with different cloud masks keep the same cells outside the cutline, and only
+        their missing cells are filled."""
+        grids = np.full((2, 4, 4), 10.0)
+        grids[:, :, 3] = -999
+        grids[0, 1, 1] = 0
+        grids[1, 2, 2] = 0
+        grids[1, 0, 0] = 0
+        grids[1, 0, 1] = 0
+        filled = gap_fill.fill_missing_cells(grids, min_neighbors=3)
+        for day in range(2):
+            np.testing.assert_array_equal(filled[day] == -999, grids[0] == -999)
+        self.assertEqual((filled[0, 1, 1], filled[1, 2, 2]), (10.0, 10.0))
+        self.assertEqual(filled[1, 0, 0], 0.0)
+        filled = gap_fill.fill_missing_cells(grids, min_neighbors=9)
+        self.assertEqual((filled[0, 1, 1], filled[1, 2, 2]), (0.0, 0.0))
+        np.testing.assert_array_equal(filled[:, :, 3], -999)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(FillLinearTest)
+    suite.addTest(unittest.makeSuite(FillHarmonicTest))
+    suite.addTest(unittest.makeSuite(FillSpatialTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
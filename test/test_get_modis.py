@@ -0,0 +1,119 @@
+# coding=utf-8
+"""Tests for downloading MODIS granules with retries.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import shutil
+import tempfile
+
+try:
+    import httplib
+    import urllib2
+    from STeAMM.lib import get_modis
+    from STeAMM.lib import retry_policy
+    from STeAMM.lib import download_stats
+except (ImportError, SyntaxError):
+    # get_modis is Python 2 only
+    get_modis = None
+
+BASE_URL = 'http://e4ftl01.cr.usgs.gov'
+GRANULES = ['MOD11A1.A2015001.h09v04.005.2015005123456.hdf', 'MOD11A1.A2015002.h09v04.005.2015005123457.hdf']
+
+
+class FakeResponse(object):
+    """Stands in for the response of urllib2.urlopen, raising error after the body."""
+
+    def __init__(self, url, body, error=None):
+        self.url = url
+        self.body = body
+        self.error = error
+
+    def getcode(self):
+        return 200
+
+    def geturl(self):
+        return self.url
+
+    def read(self, size):
+        body, self.body = self.body, ''
+        if not body and self.error is not None:
+            raise self.error
+        return body
+
+    def close(self):
+        pass
+
+
+@unittest.skipIf(get_modis is None, "get_modis requires Python 2")
+class GetModisTest(unittest.TestCase):
+    """Test listing dates, and that granules failing with any network error are recorded,
+    not fatal."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.out_dir = tempfile.mkdtemp()
+        self.requests = []
+        self.urlopen = urllib2.urlopen
+        urllib2.urlopen = self.fake_urlopen
+
+    def tearDown(self):
+        """Runs after each test."""
+        urllib2.urlopen = self.urlopen
+        shutil.rmtree(self.out_dir)
+
+    def fake_urlopen(self, req):
+        """Serves the product and date listings, one granule, and a granule whose response
+        is cut short."""
+        url = req.get_full_url()
+        self.requests.append(url)
+        if url.endswith('MOD11A1.005/'):
+            return FakeResponse(url, '<img alt="[DIR]"> <a href="2015.01.01/">2015.01.01/</a>\n'
+                                     '<img alt="[DIR]"> <a href="2015.01.02/">2015.01.02/</a>\n')
+        if url.endswith('/2015.01.01') or url.endswith('/2015.01.02'):
+            day = int(url[-2:])
+            return FakeResponse(url, '<a href="%s">granule</a>\n' % GRANULES[day - 1])
+        if url.endswith(GRANULES[0]):
+            return FakeResponse(url, 'HDF')
+        return FakeResponse(url, 'HD', httplib.IncompleteRead('HD', 1))
+
+    def test_incomplete_read(self):
+        """A granule whose response is cut short is retried, then recorded as failed, and
+        the other granules are still downloaded."""
+        failed = get_modis.get_modisfiles('MOLT', 'MOD11A1.005', 2015, 'h09v04', None, 'user', 'password',
+                                          doy_start=1, doy_end=3, out_dir=self.out_dir, base_url=BASE_URL,
+                                          verbose=False, stats=download_stats.DownloadStats(),
+                                          policy=retry_policy.RetryPolicy(max_retries=2, sleep=lambda s: None),
+                                          max_connections=1)
+        self.assertEqual([f['file'] for f in failed], [GRANULES[1]])
+        self.assertTrue('IncompleteRead' in failed[0]['error'])
+        self.assertEqual(len([url for url in self.requests if url.endswith(GRANULES[1])]), 3)
+        self.assertEqual(sorted(os.listdir(self.out_dir)), [GRANULES[0]])
+
+    def test_listings(self):
+        """Calls sharing listings list the product directory once."""
+        listings = {}
+        for doy in (1, 2):
+            get_modis.get_modisfiles('MOLT', 'MOD11A1.005', 2015, 'h09v04', None, 'user', 'password',
+                                     doy_start=doy, doy_end=doy + 1, out_dir=self.out_dir, base_url=BASE_URL,
+                                     verbose=False, stats=download_stats.DownloadStats(),
+                                     policy=retry_policy.RetryPolicy(max_retries=0), listings=listings)
+        self.assertEqual(len([url for url in self.requests if url.endswith('MOD11A1.005/')]), 1)
+        self.assertEqual(listings, {BASE_URL + '/MOLT/MOD11A1.005/': ['2015.01.01', '2015.01.02']})
+        self.assertEqual(len([url for url in self.requests if url.endswith('.hdf')]), 2)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(GetModisTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,69 @@
+# coding=utf-8
+"""Tests for the MODIS download directories and the record of failed granules.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# get_swaths imports its lib modules as a top level script does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'STeAMM'))
+try:
+    import get_swaths
+except (ImportError, SyntaxError):
+    # get_swaths is Python 2 only
+    get_swaths = None
+
+URL = 'http://e4ftl01.cr.usgs.gov/MOLT/MOD11A1.005/2015.01.01/'
+GRANULE = 'MOD11A1.A2015001.h09v04.005.2015005123456.hdf'
+
+
+@unittest.skipIf(get_swaths is None, "get_swaths requires Python 2")
+class GetSwathsTest(unittest.TestCase):
+    """Test keeping downloaded granules and the record of failed ones between runs."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.proj_dir = tempfile.mkdtemp()
+        self.hdf_dir = get_swaths.build_dir_list(self.proj_dir, [2015], ['MOD11A1.005'])[0]
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.proj_dir)
+
+    def test_failed_record(self):
+        """Granules and the failed granules record survive a new run, and granules
+        downloaded since are dropped from the record."""
+        get_swaths.make_dirs([self.hdf_dir])
+        with open(os.path.join(self.hdf_dir, 'MOD11A1.A2015002.h09v04.005.hdf'), 'w') as out_file:
+            out_file.write('HDF')
+        failed = [{'url': URL + GRANULE, 'file': GRANULE, 'error': 'timed out'},
+                  {'url': 'http://e4ftl01.cr.usgs.gov/MOLT/MOD11A1.005/2015.01.03/', 'file': None,
+                   'error': 'timed out'}]
+        self.assertEqual(len(get_swaths.record_failed(self.hdf_dir, failed)), 2)
+
+        get_swaths.make_dirs([self.hdf_dir])
+        self.assertTrue(os.path.exists(os.path.join(self.hdf_dir, 'MOD11A1.A2015002.h09v04.005.hdf')))
+        self.assertEqual(len(get_swaths.record_failed(self.hdf_dir, [])), 2)
+        with open(os.path.join(self.hdf_dir, GRANULE), 'w') as out_file:
+            out_file.write('HDF')
+        missing = get_swaths.record_failed(self.hdf_dir, [])
+        self.assertEqual([r['file'] for r in missing], [None])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(GetSwathsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
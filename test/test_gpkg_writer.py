@@ -0,0 +1,71 @@
+# coding=utf-8
+"""Tests for the GeoPackage prediction writer.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import os
+import unittest
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from STeAMM.lib import gpkg_writer
+
+
+class WritePredictionsTest(unittest.TestCase):
+    """Test writing long-format predictions to a GeoPackage."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.gpkg_file = os.path.join(self.temp_dir, 'predictions.gpkg')
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_iso_dates(self):
+        """YYYYDDD dates are converted to ISO dates."""
+        self.assertEqual(gpkg_writer.iso_dates([2015001, 2016366]), ['2015-01-01', '2016-12-31'])
+
+    def test_write(self):
+        """Non-missing values are written in batches, one row per reach and date."""
+        values = np.array([[10.0, np.nan, 12.0], [13.0, 14.0, 15.0]], dtype=np.float32)
+        n_rows = gpkg_writer.write_predictions(self.gpkg_file, [101, 102], [2015001, 2015002, 2015003],
+                                               values, batch_size=2)
+        self.assertEqual(n_rows, 5)
+        conn = sqlite3.connect(self.gpkg_file)
+        rows = conn.execute("SELECT reach_id, date, temp FROM reach_temp ORDER BY reach_id, date").fetchall()
+        self.assertEqual(rows[1], (101, '2015-01-03', 12.0))
+        self.assertEqual(len(rows), 5)
+        data_type = conn.execute("SELECT data_type FROM gpkg_contents WHERE table_name = 'reach_temp'").fetchone()
+        self.assertEqual(data_type[0], 'attributes')
+        self.assertEqual(conn.execute("PRAGMA application_id").fetchone()[0], gpkg_writer.GPKG_APPLICATION_ID)
+        self.assertRaises(sqlite3.IntegrityError, conn.execute,
+                          "INSERT INTO reach_temp (reach_id, date, temp) VALUES (101, '2015-01-01', 1.0)")
+        conn.close()
+
+    def test_replace(self):
+        """Writing again replaces the predictions table."""
+        gpkg_writer.write_predictions(self.gpkg_file, [1], [2015001], np.ones((1, 1)))
+        gpkg_writer.write_predictions(self.gpkg_file, [2, 3], [2015001], np.ones((2, 1)))
+        conn = sqlite3.connect(self.gpkg_file)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM reach_temp").fetchone()[0], 2)
+        conn.close()
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(WritePredictionsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,170 @@
+# coding=utf-8
+"""Tests for the file-backed job queue module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import time
+import shutil
+import tempfile
+
+from STeAMM.lib import job_queue
+
+
+def record_unit(spec):
+    """Worker function: creates one file per unit, failing if the unit already ran. The
+    merge unit counts the files of the other units."""
+    if spec['name'] == 'merge':
+        return len(os.listdir(spec['out_dir']))
+    if spec['name'] == 'bad':
+        raise ValueError('bad unit')
+    fd = os.open(os.path.join(spec['out_dir'], spec['name']), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    os.close(fd)
+    time.sleep(0.01)
+    return spec['name']
+
+
+class JobQueueTest(unittest.TestCase):
+    """Test claiming and completing queued units."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.queue_dir = os.path.join(self.tmp_dir, 'queue')
+        self.out_dir = os.path.join(self.tmp_dir, 'out')
+        os.makedirs(self.out_dir)
+        self.queue = job_queue.JobQueue(self.queue_dir, lease_seconds=60)
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmp_dir)
+
+    def add_units(self, n_units):
+        unit_ids = [self.queue.add('u%02d' % i, {'name': 'u%02d' % i, 'out_dir': self.out_dir})
+                    for i in range(n_units)]
+        self.queue.add('merge', {'name': 'merge', 'out_dir': self.out_dir}, after=unit_ids)
+        return unit_ids
+
+    def test_claim_order(self):
+        """A claimed unit is not claimed again, and dependent units wait."""
+        self.add_units(2)
+        first = self.queue.claim('a')
+        second = self.queue.claim('b')
+        self.assertEqual((first['id'], second['id']), ('u00', 'u01'))
+        self.assertTrue(self.queue.claim('c') is None)
+        self.queue.complete('u00', 'u00')
+        self.queue.complete('u01', 'u01')
+        self.assertEqual(self.queue.claim('c')['id'], 'merge')
+        self.assertEqual(self.queue.result('u01'), 'u01')
+
+    def test_expired_lease(self):
+        """Units of workers whose lease expired are claimed again."""
+        self.add_units(1)
+        self.queue.claim('crashed')
+        lease_file = os.path.join(self.queue_dir, job_queue.LEASES_DIR, 'u00.json')
+        os.utime(lease_file, (time.time() - 120, time.time() - 120))
+        self.assertEqual(self.queue.claim('b')['id'], 'u00')
+        self.assertTrue(self.queue.claim('c') is None)
+
+    def test_takeover(self):
+        """An expired lease is taken over by one worker only, and a worker that saw it
+        expired before does not remove the new lease."""
+        self.add_units(1)
+        self.queue.claim('crashed')
+        lease_file = os.path.join(self.queue_dir, job_queue.LEASES_DIR, 'u00.json')
+        os.utime(lease_file, (time.time() - 120, time.time() - 120))
+        takeover_file = lease_file + '.takeover'
+        open(takeover_file, 'w').close()
+        self.assertTrue(self.queue.claim('b') is None)
+        # a takeover lock left behind by a stopped worker expires too
+        os.utime(takeover_file, (time.time() - 120, time.time() - 120))
+        self.assertTrue(self.queue.claim('b') is None)
+        self.assertFalse(os.path.exists(takeover_file))
+        self.assertEqual(self.queue.claim('b')['id'], 'u00')
+
+        late = job_queue.JobQueue(self.queue_dir, lease_seconds=60)
+        seen = []
+        expired = late._expired
+
+        def stale_view(path):
+            seen.append(path)
+            return len(seen) == 1 or expired(path)
+        late._expired = stale_view
+        self.assertFalse(late._acquire('u00', 'c'))
+        self.assertEqual(job_queue.read_json(lease_file)['worker'], 'b')
+        self.assertFalse(os.path.exists(takeover_file))
+
+    def test_stale_owner(self):
+        """A worker whose lease was taken over neither renews nor releases the new lease."""
+        self.add_units(1)
+        stale = self.queue.claim('stalled')
+        self.assertTrue(self.queue.renew('u00', stale['lease']))
+        lease_file = os.path.join(self.queue_dir, job_queue.LEASES_DIR, 'u00.json')
+        os.utime(lease_file, (time.time() - 120, time.time() - 120))
+        owner = self.queue.claim('b')
+        self.assertEqual(owner['id'], 'u00')
+        self.assertNotEqual(owner['lease'], stale['lease'])
+
+        os.utime(lease_file, (time.time() - 30, time.time() - 30))
+        self.assertFalse(self.queue.renew('u00', stale['lease']))
+        self.assertTrue(time.time() - os.path.getmtime(lease_file) > 20)
+        self.queue.complete('u00', 'stale', stale['lease'])
+        self.assertEqual(job_queue.read_json(lease_file)['worker'], 'b')
+        self.assertTrue(self.queue.renew('u00', owner['lease']))
+        self.queue.complete('u00', 'u00', owner['lease'])
+        self.assertFalse(os.path.exists(lease_file))
+        self.assertEqual(self.queue.result('u00'), 'u00')
+
+    def test_rename_over(self):
+        """Files are replaced where os.rename does not overwrite the target (Windows)."""
+        src, dst = os.path.join(self.tmp_dir, 'a.tmp'), os.path.join(self.tmp_dir, 'a.json')
+        for path, text in ((src, 'new'), (dst, 'old')):
+            with open(path, 'w') as out_file:
+                out_file.write(text)
+        rename = os.rename
+
+        def windows_rename(a, b):
+            if os.path.exists(b):
+                raise OSError(17, 'Cannot create a file when that file already exists')
+            rename(a, b)
+        os.rename = windows_rename
+        try:
+            job_queue._rename_over(src, dst)
+        finally:
+            os.rename = rename
+        with open(dst, 'r') as in_file:
+            self.assertEqual(in_file.read(), 'new')
+        self.assertFalse(os.path.exists(src))
+
+    def test_failed_dependency(self):
+        """Units depending on a failed unit fail, and failed units can be retried."""
+        self.queue.add('bad', {'name': 'bad', 'out_dir': self.out_dir})
+        self.queue.add('merge', {'name': 'merge', 'out_dir': self.out_dir}, after=['bad'])
+        job_queue.run_worker(self.queue_dir, record_unit, poll_seconds=0.01)
+        self.assertEqual(sorted(self.queue.errors()), ['bad', 'merge'])
+        self.assertEqual(self.queue.retry_failed(), 2)
+        self.assertEqual(self.queue.counts()['pending'], 2)
+
+    def test_worker_processes(self):
+        """Several worker processes run every unit exactly once, then the merge unit."""
+        self.add_units(30)
+        counts = job_queue.run_workers(self.queue_dir, record_unit, 4, poll_seconds=0.01)
+        self.assertEqual(counts['done'], 31)
+        self.assertEqual(self.queue.errors(), {})
+        self.assertEqual(self.queue.result('merge'), 30)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(JobQueueTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
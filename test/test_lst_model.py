@@ -0,0 +1,173 @@
+# coding=utf-8
+"""Tests for the stream temperature model module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+
+import numpy as np
+
+from STeAMM.lib import lst_model
+
+
+class FitGroupsTest(unittest.TestCase):
+    """Test batched least-squares model fitting."""
+
+    def setUp(self):
+        """Runs before each test."""
+        rng = np.random.RandomState(0)
+        self.jday = np.tile(np.arange(1, 101), 3)
+        self.lst = rng.uniform(270.0, 310.0, len(self.jday))
+        self.rca = np.repeat([11, 12, 13], 100)
+        self.coef = np.array([[-250.0, 0.9, 0.01],
+                              [-200.0, 0.7, 0.02],
+                              [-150.0, 0.5, 0.0]])
+        group_keys, self.groups = lst_model.group_index(self.rca)
+        self.X = lst_model.design_matrix(self.lst, self.jday)
+        self.temp = lst_model.predict_groups(self.coef, self.X, self.groups)
+
+    def test_group_index(self):
+        """Key combinations are converted to a group index."""
+        group_keys, groups = lst_model.group_index([5, 3, 5, 3], [0, 1, 1, 1])
+        np.testing.assert_array_equal(group_keys, [[3, 1], [5, 0], [5, 1]])
+        np.testing.assert_array_equal(groups, [1, 0, 2, 0])
+
+    def test_exact_fit(self):
+        """Coefficients of noise free groups are recovered with R2 of 1."""
+        results = lst_model.fit_groups(self.X, self.temp, self.groups)
+        np.testing.assert_allclose(results['coef'], self.coef, atol=1e-6)
+        np.testing.assert_allclose(results['r2'], 1.0)
+        np.testing.assert_array_equal(results['n_obs'], [100, 100, 100])
+
+    def test_matches_lstsq(self):
+        """Noisy fits match a separate least-squares solve per group."""
+        temp = self.temp + np.random.RandomState(1).normal(0.0, 0.5, len(self.temp))
+        results = lst_model.fit_groups(self.X, temp, self.groups)
+        for g in range(3):
+            in_group = self.groups == g
+            expected = np.linalg.lstsq(self.X[in_group], temp[in_group], rcond=None)[0]
+            np.testing.assert_allclose(results['coef'][g], expected, rtol=1e-6)
+        self.assertTrue((results['r2'] < 1.0).all())
+
+    def test_small_group(self):
+        """Groups with fewer observations than coefficients are not fitted."""
+        groups = np.where(np.arange(len(self.temp)) < 2, 3, self.groups)
+        results = lst_model.fit_groups(self.X, self.temp, groups)
+        self.assertTrue(np.isnan(results['coef'][3]).all())
+
+
+class ModelStateTest(unittest.TestCase):
+    """Test incremental model updates from sufficient statistics."""
+
+    def setUp(self):
+        """Runs before each test."""
+        rng = np.random.RandomState(0)
+        self.rca = np.repeat([1, 2, 3], 60)
+        self.jday = np.tile(np.arange(1, 361, 6), 3)
+        self.X = lst_model.design_matrix(rng.uniform(270.0, 310.0, 180), self.jday)
+        self.temp = self.X.dot([-250.0, 0.9, 0.01]) + rng.normal(0.0, 0.3, 180) + self.rca
+
+    def test_state_matches_fit(self):
+        """Coefficients, R2 and RMSE from sufficient statistics match a direct fit."""
+        group_keys, groups = lst_model.model_groups(self.rca, self.jday)
+        state = lst_model.init_state(self.X, self.temp, group_keys, groups)
+        results = lst_model.fit_groups(self.X, self.temp, groups)
+        for name in ('coef', 'r2', 'rmse'):
+            np.testing.assert_allclose(state[name], results[name], rtol=1e-6)
+
+    def test_update_matches_refit(self):
+        """Updating with new observations and groups matches refitting all observations."""
+        first = self.jday < 200
+        new_rca = np.where(self.rca == 3, 4, self.rca)
+        group_keys, groups = lst_model.model_groups(self.rca[first], self.jday[first])
+        state = lst_model.init_state(self.X[first], self.temp[first], group_keys, groups)
+        group_keys, groups = lst_model.model_groups(new_rca[~first], self.jday[~first])
+        state = lst_model.update_state(state, self.X[~first], self.temp[~first], group_keys, groups)
+
+        all_rca = np.where(first, self.rca, new_rca)
+        group_keys, groups = lst_model.model_groups(all_rca, self.jday)
+        results = lst_model.fit_groups(self.X, self.temp, groups)
+        np.testing.assert_array_equal(state['group_keys'], group_keys)
+        np.testing.assert_array_equal(state['n_obs'], results['n_obs'])
+        np.testing.assert_allclose(state['coef'], results['coef'], rtol=1e-6)
+
+    def test_new_observations(self):
+        """Observations already added to a state are not added again by a later run."""
+        date = 2015000 + self.jday
+        first = self.jday < 200
+        group_keys, groups = lst_model.model_groups(self.rca[first], self.jday[first])
+        state = lst_model.init_state(self.X[first], self.temp[first], group_keys, groups)
+        added_keys = lst_model.observation_keys(self.rca[first], date[first])
+
+        new = lst_model.new_observations(added_keys, self.rca, date)
+        np.testing.assert_array_equal(new, ~first)
+        group_keys, groups = lst_model.model_groups(self.rca[new], self.jday[new])
+        state = lst_model.update_state(state, self.X[new], self.temp[new], group_keys, groups)
+        group_keys, groups = lst_model.model_groups(self.rca, self.jday)
+        results = lst_model.fit_groups(self.X, self.temp, groups)
+        np.testing.assert_allclose(state['coef'], results['coef'], rtol=1e-6)
+        added_keys = np.concatenate((added_keys, lst_model.observation_keys(self.rca[new], date[new])))
+        self.assertFalse(lst_model.new_observations(added_keys, self.rca, date).any())
+
+
+class PredictReachTest(unittest.TestCase):
+    """Test reach x day predictions."""
+
+    def test_coef_index(self):
+        """RCAs are matched to the model of each half year, or -1."""
+        group_keys = np.array([[1, 0], [1, 1], [2, 1]])
+        index = lst_model.coef_index(group_keys, [1, 2, 3], half_years=True)
+        np.testing.assert_array_equal(index, [[0, 1], [-1, 2], [-1, -1]])
+        index = lst_model.coef_index(np.array([[0, 0]]), [1, 2], per_rca=False)
+        np.testing.assert_array_equal(index, [[0, 0], [0, 0]])
+
+    def test_predict_reach_days(self):
+        """Reaches are predicted from their RCA's LST and model, by half year."""
+        coef = np.array([[1.0, 2.0, 0.0], [10.0, 1.0, 1.0]])
+        rca_coef_index = np.array([[0, 1], [-1, -1]])
+        lst_values = np.array([[5.0, 6.0], [7.0, 8.0]])
+        jday = np.array([100, 200])
+        out = np.zeros((4, 2))
+        lst_model.predict_reach_days(coef, rca_coef_index, lst_values, jday,
+                                     np.array([0, 0, 1, -1]), out, chunk_size=3)
+        np.testing.assert_allclose(out[0], [11.0, 216.0])
+        np.testing.assert_allclose(out[1], out[0])
+        self.assertTrue(np.isnan(out[2:]).all())
+
+    def test_ungauged_rca(self):
+        """Reaches of RCAs without observations, or without enough observations for a model
+        of their own, are predicted with the basin-wide fallback model."""
+        rng = np.random.RandomState(0)
+        rca = np.append(np.repeat([1, 2], 60), [3, 3])
+        jday = np.append(np.tile(np.arange(1, 361, 6), 2), [100, 250])
+        X = lst_model.design_matrix(rng.uniform(270.0, 310.0, len(rca)), jday)
+        temp = X.dot([-250.0, 0.9, 0.01]) + rng.normal(0.0, 0.3, len(rca))
+        group_keys, groups = lst_model.model_groups(rca, jday, half_years=True)
+        group_keys, groups, X, temp = lst_model.add_fallback(group_keys, groups, X, temp, jday, half_years=True)
+        state = lst_model.init_state(X, temp, group_keys, groups)
+
+        rca_coef_index = lst_model.coef_index(state['group_keys'], [1, 2, 3, 4], half_years=True, coef=state['coef'])
+        fallback = [lst_model.coef_index(state['group_keys'], [lst_model.FALLBACK_RCA], half_years=True)[0]] * 2
+        np.testing.assert_array_equal(rca_coef_index[2:], fallback)
+        self.assertTrue((rca_coef_index[:2] != fallback).all())
+        out = np.zeros((4, 2))
+        lst_model.predict_reach_days(state['coef'], rca_coef_index, rng.uniform(270.0, 310.0, (4, 2)),
+                                     np.array([100, 250]), np.array([0, 1, 2, 3]), out)
+        self.assertFalse(np.isnan(out).any())
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(FitGroupsTest)
+    suite.addTest(unittest.makeSuite(ModelStateTest))
+    suite.addTest(unittest.makeSuite(PredictReachTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,118 @@
+# coding=utf-8
+"""Tests for the temperature store module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import datetime
+import shutil
+import tempfile
+
+import numpy as np
+
+from STeAMM.lib import lst_store
+
+
+class StoreTest(unittest.TestCase):
+    """Test writing and updating temperature stores."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.store_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.store_dir)
+
+    def test_date_keys(self):
+        """Julian days are converted to YYYYDDD dates."""
+        np.testing.assert_array_equal(lst_store.date_keys(2015, ['001', '032']), [2015001, 2015032])
+
+    def test_write_read(self):
+        """Values are stored as float32 and read back memory-mapped."""
+        lst_store.write_store(self.store_dir, [7, 3], [2015001, 2015002], [[1.0, np.nan], [3.0, 4.0]])
+        ids, dates, values = lst_store.read_store(self.store_dir)
+        np.testing.assert_array_equal(ids, [7, 3])
+        self.assertEqual(values.dtype, np.float32)
+        self.assertTrue(isinstance(values, np.memmap))
+        self.assertTrue(np.isnan(values[0, 1]))
+
+    def test_create_store(self):
+        """Created stores are filled with NaN and written through a memory-map."""
+        values = lst_store.create_store(self.store_dir, [1, 2, 3], [2015001, 2015002])
+        values[1] = [4.0, 5.0]
+        values.flush()
+        del values
+        ids, dates, values = lst_store.read_store(self.store_dir)
+        np.testing.assert_allclose(values[1], [4.0, 5.0])
+        self.assertTrue(np.isnan(values[[0, 2]]).all())
+
+    def test_shape_mismatch(self):
+        """Values must have one row per ID and one column per date."""
+        self.assertRaises(ValueError, lst_store.write_store, self.store_dir, [1], [2015001], [[1.0, 2.0]])
+
+    def test_update(self):
+        """Updates add IDs and dates, keep dates ordered and replace values."""
+        lst_store.update_store(self.store_dir, [7, 3], [2015002, 2015001], [[1.0, 2.0], [3.0, 4.0]])
+        lst_store.update_store(self.store_dir, [3, 9], [2015001, 2015003], [[5.0, 6.0], [7.0, 8.0]])
+        ids, dates, values = lst_store.read_store(self.store_dir)
+        np.testing.assert_array_equal(ids, [7, 3, 9])
+        np.testing.assert_array_equal(dates, [2015001, 2015002, 2015003])
+        np.testing.assert_allclose(values, [[2.0, 1.0, np.nan],
+                                            [5.0, 3.0, 6.0],
+                                            [7.0, np.nan, 8.0]])
+
+
+class TemperatureStoreTest(unittest.TestCase):
+    """Test store queries by feature ID and date range."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.store_dir = tempfile.mkdtemp()
+        dates = lst_store.date_keys(2015, range(180, 190))
+        values = np.arange(30, dtype=np.float32).reshape(3, 10)
+        lst_store.write_store(self.store_dir, [11, 22, 33], dates, values)
+        self.store = lst_store.TemperatureStore(self.store_dir)
+
+    def tearDown(self):
+        """Runs after each test."""
+        del self.store
+        shutil.rmtree(self.store_dir)
+
+    def test_date_key(self):
+        """Dates in any supported form are converted to YYYYDDD."""
+        self.assertEqual(lst_store.date_key(datetime.date(2015, 7, 1)), 2015182)
+        self.assertEqual(lst_store.date_key('2016-12-31'), 2016366)
+        self.assertEqual(lst_store.date_key(2015001), 2015001)
+
+    def test_series(self):
+        """A feature's series is sliced by inclusive date range."""
+        dates, values = self.store.series(22, datetime.date(2015, 7, 1), '2015-07-03')
+        np.testing.assert_array_equal(dates, [2015182, 2015183, 2015184])
+        np.testing.assert_allclose(values, [12.0, 13.0, 14.0])
+        self.assertEqual(len(self.store.series(33)[1]), 10)
+        self.assertRaises(KeyError, self.store.series, 44)
+
+    def test_value_and_slice(self):
+        """Single values and all features for a date range are returned."""
+        self.assertEqual(self.store.value(33, 2015180), 20.0)
+        self.assertTrue(np.isnan(self.store.value(33, 2015200)))
+        dates, values = self.store.date_slice(2015189)
+        np.testing.assert_allclose(values[:, 0], [9.0, 19.0, 29.0])
+        self.assertTrue(11 in self.store and len(self.store) == 3)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(StoreTest)
+    suite.addTest(unittest.makeSuite(TemperatureStoreTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,104 @@
+# coding=utf-8
+"""Tests for the model selection module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import shutil
+import tempfile
+
+import numpy as np
+
+from STeAMM.lib import model_select
+
+
+class RunSelectionTest(unittest.TestCase):
+    """Test parallel cross-validation of model variants."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.share_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        jday = np.tile(np.arange(1, 366, 4), 4)
+        rca = np.repeat([1, 2, 3, 4], len(jday) // 4)
+        lst = 290.0 + 10.0 * np.sin(2 * np.pi * jday / 365.0) + rng.normal(0, 1, len(jday))
+        temp = 0.5 * lst - 130.0 + rca + 0.01 * jday + rng.normal(0, 0.2, len(jday))
+        self.model_data = {'rca': rca, 'jday': jday, 'lst': lst, 'temp': temp}
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.share_dir)
+
+    def test_variants(self):
+        """All eight combinations of model options are compared."""
+        names = set(v['name'] for v in model_select.model_variants())
+        self.assertEqual(len(names), 8)
+        self.assertTrue('rca_jday_half' in names and 'basin_nojday_year' in names)
+
+    def test_build_tasks(self):
+        """Per RCA variants are split into blocks of RCAs."""
+        variants = [v for v in model_select.model_variants() if v['name'] in ('rca_jday_year', 'basin_jday_year')]
+        tasks = model_select.build_tasks([1, 2, 3, 4, 4], variants, 3, block_size=3)
+        self.assertEqual(len(tasks), 3 * 1 + 3 * 2)
+
+    def test_parallel_matches_serial(self):
+        """Worker processes produce the same results as a serial run."""
+        serial = model_select.run_selection(self.model_data, self.share_dir, n_folds=3, n_workers=1, block_size=2)
+        parallel = model_select.run_selection(self.model_data, self.share_dir, n_folds=3, n_workers=2, block_size=2)
+        sort_key = lambda r: (r['variant'], r['fold'], r['rca'], r['season'])
+        serial = sorted(serial, key=sort_key)
+        parallel = sorted(parallel, key=sort_key)
+        self.assertEqual(len(serial), len(parallel))
+        for s, p in zip(serial, parallel):
+            self.assertEqual(sort_key(s), sort_key(p))
+            np.testing.assert_allclose(s['rmse'], p['rmse'])
+
+    def test_best_variant(self):
+        """The per RCA model with julian day scores best on data generated from it."""
+        rows = model_select.run_selection(self.model_data, self.share_dir, n_folds=3, n_workers=1)
+        summary = model_select.summarize(rows)
+        self.assertEqual(summary[0]['variant'][:8], 'rca_jday')
+        self.assertEqual(summary[0]['n_test'], len(self.model_data['temp']))
+        self.assertEqual(model_select.best_variant(summary), summary[0]['variant'])
+
+    def test_untrained_groups(self):
+        """Test observations of RCAs missing from the training data are scored with the
+        basin-wide model, so every variant is scored on the same observations."""
+        model_data = dict((key, np.append(values, values[:1])) for key, values in self.model_data.items())
+        model_data['rca'][-1] = 5
+        rows = model_select.run_selection(model_data, self.share_dir, n_folds=3, n_workers=1)
+        summary = model_select.summarize(rows)
+        self.assertEqual(len(summary), 8)
+        self.assertEqual(set(s['n_test'] for s in summary), set([len(model_data['temp'])]))
+        untrained = [r for r in rows if r['rca'] == 5 and r['n_test']]
+        self.assertEqual(len(untrained), 4)
+        self.assertTrue(all(r['n_train'] == 0 and r['n_fallback'] == 1 for r in untrained))
+        self.assertTrue(all(r['n_fallback'] == 0 for r in rows if r['rca'] != 5))
+
+    def test_rank_same_observations(self):
+        """Variants scored on fewer observations are not ranked."""
+        summary = [{'variant': 'rca_jday_half', 'n_test': 90, 'rmse': 0.1},
+                   {'variant': 'rca_jday_year', 'n_test': 100, 'rmse': 0.2},
+                   {'variant': 'basin_jday_year', 'n_test': 100, 'rmse': 0.3}]
+        self.assertEqual(model_select.best_variant(summary), 'rca_jday_year')
+
+    def test_no_scores(self):
+        """Selecting a variant fails clearly when no fold has test observations."""
+        rows = [{'variant': 'rca_jday', 'n_test': 0, 'rmse': np.nan, 'mae': np.nan, 'bias': np.nan}]
+        self.assertEqual(model_select.summarize(rows), [])
+        self.assertRaises(ValueError, model_select.best_variant, model_select.summarize(rows))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RunSelectionTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
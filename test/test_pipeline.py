@@ -0,0 +1,80 @@
+# coding=utf-8
+"""Tests for the streaming pipeline module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import time
+import shutil
+import tempfile
+
+from STeAMM.lib import pipeline
+
+
+class PipelineTest(unittest.TestCase):
+    """Test streaming stages through bounded queues."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.produced = []
+
+    def stage(self, n, fail_at=None):
+        for i in range(n):
+            if i == fail_at:
+                raise ValueError("bad granule %d" % i)
+            self.produced.append(i)
+            yield i
+
+    def test_prefetch(self):
+        """Items are passed on in order, through chained stages."""
+        squares = (i * i for i in pipeline.prefetch(self.stage(20), 2))
+        self.assertEqual(list(pipeline.prefetch(squares, 3)), [i * i for i in range(20)])
+
+    def test_bounded(self):
+        """A stage runs at most max_in_flight items ahead of its consumer."""
+        items = pipeline.prefetch(self.stage(100), 3)
+        self.assertEqual(next(items), 0)
+        time.sleep(0.2)
+        # one item consumed, three queued, and one waiting to be queued
+        self.assertTrue(len(self.produced) <= 5)
+        items.close()
+
+    def test_error(self):
+        """An exception in a stage is raised in its consumer."""
+        items = pipeline.prefetch(self.stage(10, fail_at=4), 2)
+        self.assertRaises(ValueError, list, items)
+
+    def test_chunks(self):
+        """Items are batched in order, with a shorter last batch."""
+        self.assertEqual(list(pipeline.chunks(range(7), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_collect_release(self):
+        """Collected items are recorded, and released files are removed."""
+        work_dir = tempfile.mkdtemp()
+        try:
+            paths = [os.path.join(work_dir, '%d.tif' % i) for i in range(3)]
+            for path in paths:
+                open(path, 'w').close()
+            collected = []
+            self.assertEqual(list(pipeline.collect(paths, collected)), paths)
+            self.assertEqual(collected, paths)
+            pipeline.release(paths + [os.path.join(work_dir, 'missing.tif')])
+            self.assertEqual(os.listdir(work_dir), [])
+        finally:
+            shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PipelineTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
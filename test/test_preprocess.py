@@ -0,0 +1,103 @@
+# coding=utf-8
+"""Tests for clipping shared grids to a basin's drainage polygons.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+import numpy as np
+
+# preprocess imports its lib modules as a top level script does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'STeAMM'))
+try:
+    from osgeo import gdal, ogr, osr
+    import preprocess
+except ImportError:
+    preprocess = None
+
+
+def write_grid(out_file, values, srs):
+    """Writes a grid of 1 unit cells with its upper left corner at (0, 10)."""
+    grid = gdal.GetDriverByName('GTiff').Create(out_file, values.shape[1], values.shape[0], 1, gdal.GDT_Float32)
+    grid.SetGeoTransform((0.0, 1.0, 0.0, 10.0, 0.0, -1.0))
+    grid.SetProjection(srs.ExportToWkt())
+    grid.GetRasterBand(1).SetNoDataValue(-999)
+    grid.GetRasterBand(1).WriteArray(values)
+    grid.FlushCache()
+
+
+def write_polygon(out_shp, srs):
+    """Writes a shapefile of one polygon in the square (2, 2) to (8, 8), below the line
+    x + y = 10.5, so no cell center is on its edge."""
+    data_source = ogr.GetDriverByName('ESRI Shapefile').CreateDataSource(out_shp)
+    layer = data_source.CreateLayer(os.path.splitext(os.path.basename(out_shp))[0], srs, ogr.wkbPolygon)
+    feature = ogr.Feature(layer.GetLayerDefn())
+    feature.SetGeometry(ogr.CreateGeometryFromWkt('POLYGON ((2 2, 8 2, 8 2.5, 2.5 8, 2 8, 2 2))'))
+    layer.CreateFeature(feature)
+    data_source = None
+
+
+@unittest.skipIf(preprocess is None, "preprocess requires GDAL")
+class ClipRastersTest(unittest.TestCase):
+    """Test clipping warped grids to drainage polygons."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_clip_rasters(self):
+        """Cells are clipped to the polygon envelope without resampling, and cells outside
+        the polygons are masked."""
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(32611)
+        values = np.arange(100, dtype=np.float32).reshape(10, 10) + 1
+        in_warp = os.path.join(self.tmp_dir, '2015001.vrt_warp.tif')
+        in_ply = os.path.join(self.tmp_dir, 'rca.shp')
+        write_grid(in_warp, values, srs)
+        write_polygon(in_ply, srs)
+        out_dir = os.path.join(self.tmp_dir, 'mosaic')
+        clip_list = preprocess.clip_rasters([in_warp], out_dir, preprocess.get_bbox(in_ply), in_ply)
+        self.assertEqual(clip_list, [os.path.join(out_dir, '2015001.vrt_warp_clip.tif')])
+        clipped = gdal.Open(clip_list[0]).ReadAsArray()
+        # rows 2 to 7 and columns 2 to 7 of the grid; cells centered inside the polygon are kept
+        self.assertEqual(clipped.shape, (6, 6))
+        for row in range(6):
+            for col in range(6):
+                x, y = 2.5 + col, 7.5 - row
+                inside = x + y <= 10
+                self.assertEqual(clipped[row, col], values[row + 2, col + 2] if inside else -999)
+
+
+@unittest.skipIf(preprocess is None, "preprocess requires GDAL")
+class ModisWktTest(unittest.TestCase):
+    """Test finding the MODIS projection file shipped with STeAMM."""
+
+    def test_find_modis_wkt(self):
+        """The MODIS Sin WKT projection file is found in STeAMM/lib."""
+        modis_wkt = preprocess.find_modis_wkt()
+        self.assertEqual(os.path.basename(os.path.dirname(modis_wkt)), 'lib')
+        self.assertTrue(os.path.isfile(modis_wkt))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ClipRastersTest)
+    suite.addTest(unittest.makeSuite(ModisWktTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,143 @@
+# coding=utf-8
+"""Tests for the download retry policy module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import time
+import errno
+import socket
+import threading
+from email.utils import formatdate
+try:
+    from httplib import IncompleteRead, BadStatusLine
+except ImportError:
+    from http.client import IncompleteRead, BadStatusLine
+
+from STeAMM.lib import retry_policy
+
+
+class HTTPError(IOError):
+    """Stands in for urllib2.HTTPError, with a status code and headers."""
+
+    def __init__(self, code, headers=None):
+        IOError.__init__(self, 'HTTP Error %d' % code)
+        self.code = code
+        self.hdrs = headers or {}
+
+
+class RetryPolicyTest(unittest.TestCase):
+    """Test retrying requests and adapting their concurrency."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.waits = []
+        self.policy = retry_policy.RetryPolicy(max_retries=3, base_delay=1.0, max_delay=30.0,
+                                               sleep=self.waits.append, rand=lambda: 1.0)
+
+    def failing(self, errors, result='html'):
+        """Returns a request function raising errors in turn, then returning result."""
+        attempts = []
+
+        def request(attempt):
+            attempts.append(attempt)
+            if errors:
+                raise errors.pop(0)
+            return result
+        return request, attempts
+
+    def test_retry(self):
+        """Transient errors are retried with exponential backoff."""
+        request, attempts = self.failing([HTTPError(503), socket.error(errno.ECONNRESET, 'Connection reset by peer'),
+                                          HTTPError(500)])
+        self.assertEqual(self.policy.call(request), 'html')
+        self.assertEqual(attempts, [0, 1, 2, 3])
+        self.assertEqual(self.waits, [1.0, 2.0, 4.0])
+
+    def test_give_up(self):
+        """Errors that are not transient, or that persist, are raised."""
+        request, attempts = self.failing([HTTPError(404)])
+        self.assertRaises(HTTPError, self.policy.call, request)
+        self.assertEqual(attempts, [0])
+        request, attempts = self.failing([HTTPError(502)] * 5)
+        self.assertRaises(HTTPError, self.policy.call, request)
+        self.assertEqual(attempts, [0, 1, 2, 3])
+        request, attempts = self.failing([ValueError("bad listing")])
+        self.assertRaises(ValueError, self.policy.call, request)
+
+    def test_network_errors(self):
+        """Network errors, including responses cut short, are retried, and local file errors
+        are not."""
+        for error in (retry_policy.URLError('timed out'), socket.timeout('timed out'),
+                      socket.gaierror(-2, 'Name or service not known'),
+                      socket.error(errno.ECONNREFUSED, 'Connection refused'),
+                      IncompleteRead(b'partial granule'), BadStatusLine('')):
+            self.assertTrue(self.policy.retryable(error), repr(error))
+        for error in (IOError(errno.ENOSPC, 'No space left on device'),
+                      OSError(errno.EACCES, 'Permission denied'), IOError('Bad file descriptor')):
+            self.assertFalse(self.policy.retryable(error), repr(error))
+        request, attempts = self.failing([IOError(errno.ENOSPC, 'No space left on device')])
+        self.assertRaises(IOError, self.policy.call, request)
+        self.assertEqual(attempts, [0])
+        request, attempts = self.failing([IncompleteRead(b'partial granule')])
+        self.assertEqual(self.policy.call(request), 'html')
+        self.assertEqual(attempts, [0, 1])
+
+    def test_retry_after(self):
+        """Retry-After is honored, in seconds or as an HTTP date, up to the maximum delay."""
+        self.assertEqual(self.policy.delay(0, HTTPError(429, {'Retry-After': '12'})), 12.0)
+        self.assertEqual(self.policy.delay(0, HTTPError(429, {'Retry-After': '3600'})), 30.0)
+        wait = retry_policy.retry_after(HTTPError(503, {'Retry-After': formatdate(time.time() + 20, usegmt=True)}))
+        self.assertTrue(15 < wait <= 20)
+        self.assertTrue(retry_policy.retry_after(HTTPError(503)) is None)
+        jittered = retry_policy.RetryPolicy(base_delay=1.0, rand=lambda: 0.25)
+        self.assertEqual(jittered.delay(3), 2.0)
+
+    def test_limiter(self):
+        """The limit rises with successes, halves on throttling, and bounds requests in flight."""
+        now = [0.0]
+        limiter = retry_policy.AdaptiveLimiter(maximum=8, initial=2, cooldown=1.0, clock=lambda: now[0])
+        for i in range(20):
+            limiter.acquire()
+            limiter.release()
+        self.assertTrue(6 < limiter.limit <= 8)
+        high = limiter.limit
+        for i in range(3):
+            limiter.acquire()
+            limiter.release(throttled=True, succeeded=False)
+        self.assertEqual(limiter.limit, high / 2)
+        now[0] = 2.0
+        limiter.acquire()
+        limiter.release(throttled=True, succeeded=False)
+        self.assertEqual((limiter.limit, limiter.throttled), (high / 4, 4))
+
+        limiter = retry_policy.AdaptiveLimiter(maximum=2, initial=2)
+        peak = [0]
+        lock = threading.Lock()
+
+        def request(attempt):
+            with lock:
+                peak[0] = max(peak[0], limiter.in_flight)
+            time.sleep(0.01)
+        threads = [threading.Thread(target=retry_policy.RetryPolicy().call, args=(request, limiter))
+                   for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((peak[0], limiter.in_flight), (2, 0))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RetryPolicyTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
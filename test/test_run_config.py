@@ -0,0 +1,100 @@
+# coding=utf-8
+"""Tests for the batch run config module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+from STeAMM.lib import run_config
+
+
+class RunConfigTest(unittest.TestCase):
+    """Test reading and checking run configs."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.config_dir = tempfile.mkdtemp()
+        self.config = {'proj_dir': 'crb', 'years': 2015, 'tiles': 'h09v04, h10v04',
+                       'rca_shp': 'rca.shp', 'rca_id_field': 'RCA_ID',
+                       'stream_shp': 'streams.shp', 'stream_id_field': 'REACH_ID',
+                       'obs_csv': 'obs.csv', 'download': False}
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.config_dir)
+
+    def write_config(self, config):
+        config_file = os.path.join(self.config_dir, 'run.json')
+        with open(config_file, 'w') as out_file:
+            json.dump(config, out_file)
+        return config_file
+
+    def test_load_config(self):
+        """Defaults are filled in, and years, tiles and paths are normalized."""
+        config = run_config.load_config(self.write_config(self.config), {'n_workers': 4})
+        self.assertEqual(config['years'], [2015])
+        self.assertEqual(config['tiles'], ['h09v04', 'h10v04'])
+        self.assertEqual(config['proj_dir'], os.path.join(os.path.abspath(self.config_dir), 'crb'))
+        self.assertEqual(config['product'], 'MOD11A1.005')
+        self.assertEqual(config['n_workers'], 4)
+
+    def test_invalid_config(self):
+        """Missing and unknown keys, and bad day ranges, are rejected."""
+        del self.config['obs_csv']
+        self.assertRaises(ValueError, run_config.validate_config, self.config)
+        self.config.update(obs_csv='obs.csv', doy_start=200, doy_end=100)
+        self.assertRaises(ValueError, run_config.validate_config, self.config)
+        self.config.update(doy_start=1, max_connections=0)
+        self.assertRaises(ValueError, run_config.validate_config, self.config)
+        self.config.update(max_connections=4, basin='crb')
+        self.assertRaises(ValueError, run_config.validate_config, self.config)
+
+    def test_basins(self):
+        """Basins inherit top level basin keys, and get one run config each."""
+        for key in ('rca_shp', 'stream_shp'):
+            del self.config[key]
+        self.config['basins'] = [{'name': 'crb', 'rca_shp': 'crb/rca.shp', 'stream_shp': 'crb/streams.shp'},
+                                 {'name': 'jd', 'rca_shp': 'jd/rca.shp', 'stream_shp': 'jd/streams.shp',
+                                  'obs_csv': 'jd/obs.csv', 'resolution': 500}]
+        config = run_config.load_config(self.write_config(self.config))
+        basins = run_config.basin_configs(config)
+        self.assertEqual([b['name'] for b in basins], ['crb', 'jd'])
+        self.assertEqual(basins[0]['obs_csv'], os.path.join(os.path.abspath(self.config_dir), 'obs.csv'))
+        self.assertEqual(basins[1]['obs_csv'], os.path.join(os.path.abspath(self.config_dir), 'jd', 'obs.csv'))
+        self.assertEqual((basins[0]['resolution'], basins[1]['resolution']), (None, 500))
+        self.assertTrue(basins[0]['basins'] is None)
+
+    def test_invalid_basins(self):
+        """Basins need a unique name and every basin key."""
+        del self.config['rca_shp']
+        self.config['basins'] = [{'name': 'crb'}, {'rca_shp': 'rca.shp'}]
+        self.assertRaises(ValueError, run_config.validate_config, self.config)
+        self.config['basins'] = [{'name': 'crb', 'rca_shp': 'a.shp'}, {'name': 'crb', 'rca_shp': 'b.shp'}]
+        self.assertRaises(ValueError, run_config.validate_config, self.config)
+
+    def test_credentials(self):
+        """Downloads need an Earthdata login, from the run config or the environment."""
+        self.config['download'] = True
+        self.assertRaises(ValueError, run_config.validate_config, self.config, '', {})
+        environ = {run_config.USERNAME_ENV: 'user', run_config.PASSWORD_ENV: 'secret'}
+        config = run_config.validate_config(self.config, '', environ)
+        self.assertEqual((config['username'], config['password']), ('user', 'secret'))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RunConfigTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
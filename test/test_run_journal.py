@@ -0,0 +1,96 @@
+# coding=utf-8
+"""Tests for the preprocessing run journal module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import time
+import shutil
+import tempfile
+
+from STeAMM.lib import run_journal
+
+
+class RunJournalTest(unittest.TestCase):
+    """Test recording, verifying and resuming completed stage units."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.work_dir = tempfile.mkdtemp()
+        self.journal_file = os.path.join(self.work_dir, 'journal', run_journal.JOURNAL_FILE)
+        self.vrt = self.write_file('A2015001.vrt', 'mosaic')
+        self.grid = self.write_file('A2015001.vrt_reprj.tif', 'grid')
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.work_dir)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'w') as out_file:
+            out_file.write(text)
+        return path
+
+    def test_resume(self):
+        """Units recorded by a previous run are completed after a restart."""
+        journal = run_journal.RunJournal(self.journal_file)
+        self.assertFalse(journal.skip('reproject_rasters', 'A2015001.vrt_reprj.tif'))
+        journal.record('reproject_rasters', 'A2015001.vrt_reprj.tif', [self.vrt], [self.grid])
+        journal = run_journal.RunJournal(self.journal_file)
+        self.assertTrue(journal.skip('reproject_rasters', 'A2015001.vrt_reprj.tif'))
+        self.assertEqual(journal.completed_units('reproject_rasters'), {'A2015001.vrt_reprj.tif': [self.grid]})
+        self.assertEqual(journal.skipped, 1)
+
+    def test_changed_files(self):
+        """Units with changed or missing outputs, or changed inputs, are not completed,
+        but released inputs do not invalidate a unit."""
+        journal = run_journal.RunJournal(self.journal_file)
+        journal.record('reproject_rasters', 'A2015001.vrt_reprj.tif', [self.vrt], [self.grid])
+        os.remove(self.vrt)
+        self.assertTrue(journal.completed('reproject_rasters', 'A2015001.vrt_reprj.tif'))
+        time.sleep(0.01)
+        self.write_file('A2015001.vrt', 'new mosaic')
+        self.assertTrue(journal.completed('reproject_rasters', 'A2015001.vrt_reprj.tif') is None)
+        journal.record('reproject_rasters', 'A2015001.vrt_reprj.tif', [self.vrt], [self.grid])
+        os.remove(self.grid)
+        self.assertTrue(journal.completed('reproject_rasters', 'A2015001.vrt_reprj.tif') is None)
+
+    def test_restart(self):
+        """A journal that does not resume discards previous units, and a line cut short
+        by a crash is ignored."""
+        journal = run_journal.RunJournal(self.journal_file)
+        journal.record('reproject_rasters', 'A2015001.vrt_reprj.tif', [self.vrt], [self.grid])
+        with open(self.journal_file, 'a') as out_file:
+            out_file.write('{"stage": "LST_to_csv", "un')
+        self.assertEqual(len(run_journal.RunJournal(self.journal_file).completed_units('reproject_rasters')), 1)
+        journal = run_journal.RunJournal(self.journal_file, resume=False)
+        self.assertEqual(journal.completed_units('reproject_rasters'), {})
+
+    def test_record_after_crash(self):
+        """A record appended after a line cut short by a crash starts on a new line."""
+        journal = run_journal.RunJournal(self.journal_file)
+        journal.record('reproject_rasters', 'A2015001.vrt_reprj.tif', [self.vrt], [self.grid])
+        with open(self.journal_file, 'a') as out_file:
+            out_file.write('{"stage": "LST_to_csv", "un')
+        journal = run_journal.RunJournal(self.journal_file)
+        journal.record('LST_to_csv', 'A2015001.csv', [self.grid], [self.vrt])
+        journal.record('LST_to_csv', 'A2015002.csv', [self.grid], [self.vrt])
+        journal = run_journal.RunJournal(self.journal_file)
+        self.assertEqual(sorted(journal.completed_units('LST_to_csv')), ['A2015001.csv', 'A2015002.csv'])
+        self.assertEqual(len(journal.completed_units('reproject_rasters')), 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RunJournalTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,100 @@
+# coding=utf-8
+"""Tests for the run report module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+from STeAMM.lib import run_report
+
+
+class RunReportTest(unittest.TestCase):
+    """Test timing stages and reporting their throughput."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.report = run_report.RunReport()
+
+    def test_timed(self):
+        """Timed calls add up time, items and bytes, and throughput is derived from them."""
+        for i in range(2):
+            with self.report.timed('preprocess.convert_hdf') as stats:
+                time.sleep(0.01)
+                stats.add(1, bytes_read=1024 * 1024, bytes_written=512)
+        self.report.add('preprocess.convert_hdf.skipped', 3)
+        stages = self.report.to_dict()['stages']
+        self.assertEqual([s['stage'] for s in stages], ['preprocess.convert_hdf', 'preprocess.convert_hdf.skipped'])
+        self.assertEqual((stages[0]['calls'], stages[0]['items']), (2, 2))
+        self.assertEqual((stages[0]['bytes_read'], stages[0]['bytes_written']), (2 * 1024 * 1024, 1024))
+        self.assertTrue(stages[0]['seconds'] >= 0.02)
+        self.assertTrue(stages[0]['items_per_second'] > 0)
+        self.assertEqual((stages[1]['items'], stages[1]['items_per_second']), (3, None))
+
+    def test_error(self):
+        """A call that raises is still timed."""
+        def fail():
+            with self.report.timed('predict_temp.select_model'):
+                raise ValueError("no observations")
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(self.report.to_dict()['stages'][0]['calls'], 1)
+
+    def test_threads(self):
+        """Stages timed from several threads count every call."""
+        def work():
+            for i in range(100):
+                with self.report.timed('preprocess.LST_to_csv') as stats:
+                    stats.add(1)
+        threads = [threading.Thread(target=work) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stage = self.report.to_dict()['stages'][0]
+        self.assertEqual((stage['calls'], stage['items']), (400, 400))
+
+    def test_write(self):
+        """The report is written as JSON, and summarized one stage per line."""
+        out_dir = tempfile.mkdtemp()
+        try:
+            in_file = os.path.join(out_dir, 'granule.hdf')
+            with open(in_file, 'w') as out:
+                out.write('LST')
+            with self.report.timed('get_modis.download') as stats:
+                stats.add(1, bytes_read=run_report.file_size(in_file, os.path.join(out_dir, 'missing.hdf')))
+            out_file = self.report.write(os.path.join(out_dir, 'reports', 'run_report.json'))
+            with open(out_file, 'r') as in_json:
+                self.assertEqual(json.load(in_json)['stages'][0]['bytes_read'], 3)
+            lines = self.report.summary().splitlines()
+            self.assertEqual(len(lines), 3)
+            self.assertTrue(lines[1].startswith('get_modis.download'))
+        finally:
+            shutil.rmtree(out_dir)
+
+    def test_reset(self):
+        """The module level report collects stages until it is reset."""
+        run_report.reset()
+        with run_report.timed('get_swaths.list_hdf'):
+            pass
+        self.assertEqual(len(run_report.current().to_dict()['stages']), 1)
+        self.assertEqual(run_report.reset().to_dict()['stages'], [])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RunReportTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,86 @@
+# coding=utf-8
+"""Tests for the in-memory spatial index module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from STeAMM.lib import spatial_index
+
+
+def triangle_contains(triangles, xs, ys):
+    """Returns a contains(point, polygon) test for right triangles given as (x0, y0, size),
+    with the right angle at (x0, y0)."""
+    def contains(point, zone):
+        x0, y0, size = triangles[zone]
+        dx, dy = xs[point] - x0, ys[point] - y0
+        return dx >= 0 and dy >= 0 and dx + dy <= size
+    return contains
+
+
+class SpatialIndexTest(unittest.TestCase):
+    """Test joining points to the polygons containing them."""
+
+    def test_candidates(self):
+        """Points are paired with every extent containing them, and only those."""
+        rng = np.random.RandomState(0)
+        lower = rng.rand(200, 2) * 100
+        size = rng.rand(200, 2) * 10 + 0.1
+        extents = np.column_stack([lower[:, 0], lower[:, 0] + size[:, 0], lower[:, 1], lower[:, 1] + size[:, 1]])
+        xs, ys = rng.rand(500) * 120 - 10, rng.rand(500) * 120 - 10
+        points, zones = spatial_index.ExtentIndex(extents).candidates(xs, ys)
+        inside = ((xs[:, None] >= extents[:, 0]) & (xs[:, None] <= extents[:, 1]) &
+                  (ys[:, None] >= extents[:, 2]) & (ys[:, None] <= extents[:, 3]))
+        expected_points, expected_zones = np.nonzero(inside)
+        np.testing.assert_array_equal(points, expected_points)
+        np.testing.assert_array_equal(zones, expected_zones)
+
+    def test_join_points(self):
+        """Each reach midpoint maps to the first polygon containing it, or -1, and only
+        polygons whose extent contains the point are tested."""
+        triangles = [(0.0, 0.0, 10.0), (5.0, 0.0, 10.0), (50.0, 50.0, 1.0)]
+        extents = np.array([[x0, x0 + size, y0, y0 + size] for x0, y0, size in triangles])
+        xs = np.array([1.0, 9.0, 14.0, 50.5, 30.0, 9.0])
+        ys = np.array([1.0, 0.5, 0.5, 50.2, 30.0, 9.0])
+        tested = []
+        contains = triangle_contains(triangles, xs, ys)
+
+        def counted(point, zone):
+            tested.append((point, zone))
+            return contains(point, zone)
+        zones = spatial_index.join_points(xs, ys, extents, counted)
+        np.testing.assert_array_equal(zones, [0, 0, 1, 2, -1, -1])
+        self.assertTrue((4, 0) not in tested and (3, 0) not in tested)
+        np.testing.assert_array_equal(spatial_index.join_points(xs, ys, np.zeros((0, 4)), counted), [-1] * 6)
+
+    def test_join_cache(self):
+        """The reach to RCA join round trips through its .npz cache."""
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache_file = spatial_index.save_join(os.path.join(cache_dir, 'reach_rca.npz'), [11, 12, 13], [3, -1, 3])
+            reach_ids, reach_rca_ids = spatial_index.load_join(cache_file)
+            np.testing.assert_array_equal(reach_ids, [11, 12, 13])
+            np.testing.assert_array_equal(reach_rca_ids, [3, -1, 3])
+            self.assertEqual(reach_rca_ids.dtype, np.int64)
+        finally:
+            shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SpatialIndexTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,113 @@
+# coding=utf-8
+"""Tests for the preprocessing stage cache module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import time
+import shutil
+import tempfile
+
+from STeAMM.lib import stage_cache
+
+
+class StageCacheTest(unittest.TestCase):
+    """Test caching, restoring and evicting stage outputs."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.work_dir = tempfile.mkdtemp()
+        self.cache = stage_cache.StageCache(os.path.join(self.work_dir, 'cache'))
+        self.granule = self.write_file('granule.hdf', 'LST')
+        self.calls = []
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.work_dir)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'w') as out_file:
+            out_file.write(text)
+        return path
+
+    def read_file(self, name):
+        with open(os.path.join(self.work_dir, name), 'r') as in_file:
+            return in_file.read()
+
+    def convert(self, out_file, text):
+        self.calls.append(out_file)
+        with open(out_file, 'w') as output:
+            output.write(text)
+
+    def test_key(self):
+        """Keys change with the stage, the params and the contents of the inputs."""
+        key = self.cache.key('convert_hdf', [self.granule], {'srs': 'A'})
+        self.assertEqual(key, self.cache.key('convert_hdf', [self.granule], {'srs': 'A'}))
+        self.assertNotEqual(key, self.cache.key('convert_to_vrt', [self.granule], {'srs': 'A'}))
+        self.assertNotEqual(key, self.cache.key('convert_hdf', [self.granule], {'srs': 'B'}))
+        time.sleep(0.01)
+        self.write_file('granule.hdf', 'LST v2')
+        self.assertNotEqual(key, self.cache.key('convert_hdf', [self.granule], {'srs': 'A'}))
+
+    def test_vrt_sources(self):
+        """The key of a VRT changes with the contents of its source files."""
+        tif = self.write_file('a.tif', 'tile')
+        vrt = self.write_file('a.vrt', '<VRTDataset><SourceFilename relativeToVRT="1">a.tif'
+                                       '</SourceFilename></VRTDataset>')
+        key = self.cache.key('reproject_rasters', [vrt])
+        time.sleep(0.01)
+        self.write_file('a.tif', 'tile v2')
+        self.assertNotEqual(key, self.cache.key('reproject_rasters', [vrt]))
+        self.assertTrue(os.path.exists(tif))
+
+    def test_run(self):
+        """Outputs are created on a miss, and restored on a hit without running the stage."""
+        out_file = os.path.join(self.work_dir, 'out', 'granule.tif')
+        os.makedirs(os.path.dirname(out_file))
+        args = ('convert_hdf', [self.granule], {'srs': 'A'}, [out_file], self.convert, out_file, 'grid')
+        self.assertFalse(self.cache.run(*args))
+        os.remove(out_file)
+        self.assertTrue(self.cache.run(*args))
+        self.assertEqual(self.read_file(os.path.join('out', 'granule.tif')), 'grid')
+        self.assertEqual(self.calls, [out_file])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_rerun_keeps_entry(self):
+        """Running a stage again with new params does not overwrite a cached output in place."""
+        out_file = os.path.join(self.work_dir, 'granule.tif')
+        self.cache.run('convert_hdf', [self.granule], {'srs': 'A'}, [out_file], self.convert, out_file, 'A')
+        self.cache.run('convert_hdf', [self.granule], {'srs': 'B'}, [out_file], self.convert, out_file, 'B')
+        self.assertTrue(self.cache.run('convert_hdf', [self.granule], {'srs': 'A'}, [out_file],
+                                       self.convert, out_file, 'A'))
+        self.assertEqual(self.read_file('granule.tif'), 'A')
+
+    def test_evict(self):
+        """The least recently used entries are evicted to keep the cache under its budget."""
+        self.cache.max_bytes = 10
+        out_files = []
+        for i in range(3):
+            out_files.append(self.write_file('out_%d.tif' % i, '%d' % i * 4))
+            self.cache.store(self.cache.key('stage', [], {'i': i}), [out_files[i]])
+            time.sleep(0.01)
+        restore_file = os.path.join(self.work_dir, 'restored.tif')
+        self.assertEqual(len(self.cache.entries()), 2)
+        self.assertFalse(self.cache.restore(self.cache.key('stage', [], {'i': 0}), [restore_file]))
+        self.assertTrue(self.cache.restore(self.cache.key('stage', [], {'i': 1}), [restore_file]))
+        self.assertEqual(self.cache.size(), 8)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(StageCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,130 @@
+# coding=utf-8
+"""Tests for the stage profiling module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+import os
+import json
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+
+from STeAMM.lib import stage_profile
+
+
+def build_table(n_rows, scale=1):
+    return [[i * scale] * 10 for i in range(n_rows)]
+
+
+class StageProfileTest(unittest.TestCase):
+    """Test profiling chosen stages."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.out_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Runs after each test."""
+        stage_profile.configure(environ={})
+        shutil.rmtree(self.out_dir)
+
+    def test_disabled(self):
+        """Stage functions are returned unchanged when profiling is off."""
+        self.assertTrue(stage_profile.configure(environ={}) is None)
+        self.assertTrue(stage_profile.profiled('LST_to_csv', build_table) is build_table)
+        self.assertEqual(stage_profile.write(), [])
+
+    def test_configure(self):
+        """Stages are chosen by the run config, or else by the environment."""
+        environ = {stage_profile.PROFILE_ENV: 'interpolate_lst, poly_stat'}
+        self.assertEqual(stage_profile.configure(None, self.out_dir, environ), set(['interpolate_lst', 'poly_stat']))
+        self.assertEqual(stage_profile.configure(['LST_to_csv'], self.out_dir, environ), set(['LST_to_csv']))
+        self.assertTrue(stage_profile.enabled('LST_to_csv'))
+        self.assertFalse(stage_profile.enabled('poly_stat'))
+        stage_profile.configure('all', self.out_dir, {})
+        self.assertTrue(stage_profile.enabled('poly_stat'))
+
+    def test_profile(self):
+        """Profiled stages write a cProfile file and their peak memory."""
+        stage_profile.configure(['build_interpl_table'], self.out_dir, {})
+        table = stage_profile.profile('build_interpl_table')(build_table)
+        for i in range(2):
+            self.assertEqual(len(table(1000, scale=2)), 1000)
+        self.assertEqual(stage_profile.profiled('predict_reaches', build_table)(3), build_table(3))
+        out_files = stage_profile.write()
+        self.assertEqual([os.path.basename(f) for f in out_files],
+                         ['build_interpl_table.prof', 'build_interpl_table.memory.json'])
+        stats = pstats.Stats(out_files[0])
+        self.assertTrue([f for f in stats.stats if f[2] == 'build_table'])
+        with open(out_files[1], 'r') as in_json:
+            memory = json.load(in_json)
+        self.assertEqual(memory['calls'], 2)
+        self.assertEqual(memory['memory_method'], stage_profile.MEMORY_METHOD)
+        if stage_profile.tracemalloc is not None:
+            self.assertTrue(memory['peak_bytes'] > 0)
+            self.assertTrue(os.path.exists(os.path.join(self.out_dir, 'build_interpl_table.snapshot')))
+
+    @unittest.skipIf(stage_profile.resource is None, "ru_maxrss requires the resource module")
+    def test_max_rss(self):
+        """Without tracemalloc (Python 2), the peak is the growth of the process's peak
+        resident set size during the call."""
+        method = stage_profile.MEMORY_METHOD
+        stage_profile.MEMORY_METHOD = 'ru_maxrss'
+        try:
+            stage_profile.configure(['LST_to_csv'], self.out_dir, {})
+            stage = stage_profile.profiled('LST_to_csv', lambda n: len(bytearray(n)))
+            # well above the peak of the test run so far, so the process's peak must rise
+            n_bytes = stage_profile.max_rss() + 64 * 1024 * 1024
+            self.assertEqual(stage(n_bytes), n_bytes)
+            out_files = stage_profile.write()
+        finally:
+            stage_profile.MEMORY_METHOD = method
+        with open(out_files[1], 'r') as in_json:
+            memory = json.load(in_json)
+        self.assertEqual(memory['memory_method'], 'ru_maxrss')
+        self.assertTrue(memory['peak_bytes'] >= n_bytes // 2)
+        self.assertFalse(os.path.exists(os.path.join(self.out_dir, 'LST_to_csv.snapshot')))
+
+    def test_threads(self):
+        """Profiled calls from several threads run one at a time, and tracemalloc only runs
+        while a profiled call does."""
+        stage_profile.configure('all', self.out_dir, {})
+        running = []
+        overlaps = []
+        tracing = []
+
+        def stage(i):
+            running.append(i)
+            overlaps.append(len(running))
+            if stage_profile.tracemalloc is not None:
+                tracing.append(stage_profile.tracemalloc.is_tracing())
+            time.sleep(0.01)
+            running.remove(i)
+        threads = [threading.Thread(target=stage_profile.profiled('LST_to_csv', stage), args=(i,))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlaps, [1, 1, 1, 1])
+        if stage_profile.tracemalloc is not None:
+            self.assertEqual(tracing, [True] * 4)
+            self.assertFalse(stage_profile.tracemalloc.is_tracing())
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(StageProfileTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,62 @@
+# coding=utf-8
+"""Tests for the background task feedback.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+
+try:
+    import steamm_task
+except ImportError:
+    # steamm_task requires PyQt4
+    steamm_task = None
+
+
+class Signal(object):
+    """Stands in for a pyqtSignal, recording what is emitted."""
+
+    def __init__(self, emitted):
+        self.emitted = emitted
+
+    def emit(self, value):
+        self.emitted.append(value)
+
+
+class Task(object):
+    """Stands in for a SteammTask, with its progress and message signals."""
+
+    def __init__(self):
+        self.reported = []
+        self.progress = Signal(self.reported)
+        self.message = Signal(self.reported)
+
+
+@unittest.skipIf(steamm_task is None, "steamm_task requires PyQt4")
+class TaskFeedbackTest(unittest.TestCase):
+    """Test reporting progress from task functions."""
+
+    def test_report(self):
+        """Progress and messages go to the task, and a canceled task stops at the next report."""
+        task = Task()
+        feedback = steamm_task.TaskFeedback(task)
+        feedback.report(10, 'Downloading...')
+        feedback.report(20)
+        self.assertEqual(task.reported, ['Downloading...', 10.0, 20.0])
+        feedback.cancel()
+        self.assertRaises(steamm_task.TaskCanceled, feedback.report, 30)
+        self.assertEqual(task.reported, ['Downloading...', 10.0, 20.0])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TaskFeedbackTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
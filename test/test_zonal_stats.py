@@ -0,0 +1,85 @@
+# coding=utf-8
+"""Tests for the zonal statistics module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'jesse@southforkresearch.org'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2016, South Fork Research, Inc.'
+
+import unittest
+
+import numpy as np
+
+from STeAMM.lib import zonal_stats
+
+
+class LabelStatsTest(unittest.TestCase):
+    """Test label based zonal statistics."""
+
+    def test_grid_index(self):
+        """Cell center coordinates map to flat grid indexes."""
+        geotransform = (100.0, 10.0, 0.0, 200.0, 0.0, -10.0)
+        idx = zonal_stats.grid_index([105.0, 125.0, 95.0], [195.0, 185.0, 195.0], geotransform, (3, 3))
+        np.testing.assert_array_equal(idx, [0, 5, -1])
+
+    def test_label_index(self):
+        """Zone IDs are converted to sequential labels."""
+        labels = zonal_stats.label_index([30, 10, 20], [[10, -1], [30, 20]])
+        np.testing.assert_array_equal(labels, [[2, 0], [1, 3]])
+
+    def test_zonal_mean(self):
+        """Means per label and day skip missing values and unlabelled pixels."""
+        lst = np.array([[1.0, 2.0],
+                        [3.0, np.nan],
+                        [5.0, 6.0],
+                        [9.0, 9.0]])
+        labels = np.array([1, 1, 2, 0])
+        mean = zonal_stats.zonal_mean(lst, labels, 3, chunk_size=3)
+        np.testing.assert_allclose(mean[:2], [[2.0, 2.0], [5.0, 6.0]])
+        self.assertTrue(np.isnan(mean[2]).all())
+
+
+class WeightMatrixTest(unittest.TestCase):
+    """Test area weighted zonal statistics."""
+
+    def setUp(self):
+        """Runs before each test."""
+        # 1 x 2 grid at 2 x 2 sub-cells: zone 1 covers the first cell and a
+        # quarter of the second, zone 2 covers the rest of the second cell
+        fine_labels = np.array([[1, 1, 1, 2],
+                                [1, 1, 2, 2]])
+        triples = zonal_stats.strip_weights(fine_labels, 2, 0, 2)
+        self.weight_matrix = zonal_stats.build_weight_matrix(*triples, n_zones=3)
+
+    def test_strip_weights(self):
+        """Covered fractions are measured from sub-cell counts."""
+        np.testing.assert_array_equal(self.weight_matrix['zone_idx'], [0, 0, 1])
+        np.testing.assert_array_equal(self.weight_matrix['cell_idx'], [0, 1, 1])
+        np.testing.assert_allclose(self.weight_matrix['weights'], [1.0, 0.25, 0.75])
+
+    def test_weighted_mean(self):
+        """Means are weighted by covered area and skip missing values."""
+        lst = np.array([[10.0, np.nan], [20.0, 4.0]])
+        mean = zonal_stats.weighted_mean(self.weight_matrix, lst, day_chunk_size=1)
+        np.testing.assert_allclose(mean[0], [12.0, 4.0])
+        np.testing.assert_allclose(mean[1], [20.0, 4.0])
+        self.assertTrue(np.isnan(mean[2]).all())
+
+    def test_select_cells(self):
+        """Matrix columns are re-indexed to table rows, dropping missing cells."""
+        selected = zonal_stats.select_cells(self.weight_matrix, np.array([1, -1]))
+        np.testing.assert_array_equal(selected['cell_idx'], [0, 0])
+        np.testing.assert_array_equal(selected['zone_idx'], [0, 1])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(LabelStatsTest)
+    suite.addTest(unittest.makeSuite(WeightMatrixTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
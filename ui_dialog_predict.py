@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'dialog_predict.ui'
+#
+# Created by: PyQt4 UI code generator 4.11.4
+#
+# WARNING! All changes made in this file will be lost!
+
+from PyQt4 import QtCore, QtGui
+
+try:
+    _fromUtf8 = QtCore.QString.fromUtf8
+except AttributeError:
+    def _fromUtf8(s):
+        return s
+
+try:
+    _encoding = QtGui.QApplication.UnicodeUTF8
+    def _translate(context, text, disambig):
+        return QtGui.QApplication.translate(context, text, disambig, _encoding)
+except AttributeError:
+    def _translate(context, text, disambig):
+        return QtGui.QApplication.translate(context, text, disambig)
+
+class Ui_PredictTempDialog(object):
+    def setupUi(self, PredictTempDialog):
+        PredictTempDialog.setObjectName(_fromUtf8("PredictTempDialog"))
+        PredictTempDialog.resize(1061, 739)
+        self.button_box = QtGui.QDialogButtonBox(PredictTempDialog)
+        self.button_box.setGeometry(QtCore.QRect(260, 435, 341, 32))
+        self.button_box.setOrientation(QtCore.Qt.Horizontal)
+        self.button_box.setStandardButtons(QtGui.QDialogButtonBox.Cancel|QtGui.QDialogButtonBox.Ok)
+        self.button_box.setObjectName(_fromUtf8("button_box"))
+        self.groupBox_MODISDataInput = QtGui.QGroupBox(PredictTempDialog)
+        self.groupBox_MODISDataInput.setGeometry(QtCore.QRect(15, 15, 586, 411))
+        self.groupBox_MODISDataInput.setObjectName(_fromUtf8("groupBox_MODISDataInput"))
+        self.groupBox = QtGui.QGroupBox(self.groupBox_MODISDataInput)
+        self.groupBox.setGeometry(QtCore.QRect(15, 290, 556, 106))
+        self.groupBox.setObjectName(_fromUtf8("groupBox"))
+        self.label_PolygonShp = QtGui.QLabel(self.groupBox)
+        self.label_PolygonShp.setGeometry(QtCore.QRect(50, 65, 111, 16))
+        self.label_PolygonShp.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_PolygonShp.setObjectName(_fromUtf8("label_PolygonShp"))
+        self.label_StreamShp = QtGui.QLabel(self.groupBox)
+        self.label_StreamShp.setGeometry(QtCore.QRect(10, 30, 151, 20))
+        self.label_StreamShp.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_StreamShp.setObjectName(_fromUtf8("label_StreamShp"))
+        self.pushButton_BrowsePolygonShp = QtGui.QPushButton(self.groupBox)
+        self.pushButton_BrowsePolygonShp.setGeometry(QtCore.QRect(460, 60, 81, 28))
+        self.pushButton_BrowsePolygonShp.setObjectName(_fromUtf8("pushButton_BrowsePolygonShp"))
+        self.lineEdit_PolygonShp = QtGui.QLineEdit(self.groupBox)
+        self.lineEdit_PolygonShp.setGeometry(QtCore.QRect(165, 65, 286, 22))
+        self.lineEdit_PolygonShp.setObjectName(_fromUtf8("lineEdit_PolygonShp"))
+        self.pushButton_BrowseStreamShp = QtGui.QPushButton(self.groupBox)
+        self.pushButton_BrowseStreamShp.setGeometry(QtCore.QRect(460, 25, 81, 28))
+        self.pushButton_BrowseStreamShp.setObjectName(_fromUtf8("pushButton_BrowseStreamShp"))
+        self.lineEdit_StreamShp = QtGui.QLineEdit(self.groupBox)
+        self.lineEdit_StreamShp.setGeometry(QtCore.QRect(165, 30, 286, 22))
+        self.lineEdit_StreamShp.setObjectName(_fromUtf8("lineEdit_StreamShp"))
+        self.groupBox_2 = QtGui.QGroupBox(self.groupBox_MODISDataInput)
+        self.groupBox_2.setGeometry(QtCore.QRect(15, 100, 556, 181))
+        self.groupBox_2.setObjectName(_fromUtf8("groupBox_2"))
+        self.label_4 = QtGui.QLabel(self.groupBox_2)
+        self.label_4.setGeometry(QtCore.QRect(290, 140, 81, 16))
+        self.label_4.setObjectName(_fromUtf8("label_4"))
+        self.comboBox = QtGui.QComboBox(self.groupBox_2)
+        self.comboBox.setGeometry(QtCore.QRect(375, 80, 166, 22))
+        self.comboBox.setObjectName(_fromUtf8("comboBox"))
+        self.lineEdit = QtGui.QLineEdit(self.groupBox_2)
+        self.lineEdit.setGeometry(QtCore.QRect(170, 35, 281, 22))
+        self.lineEdit.setObjectName(_fromUtf8("lineEdit"))
+        self.label_3 = QtGui.QLabel(self.groupBox_2)
+        self.label_3.setGeometry(QtCore.QRect(305, 110, 66, 16))
+        self.label_3.setObjectName(_fromUtf8("label_3"))
+        self.pushButton = QtGui.QPushButton(self.groupBox_2)
+        self.pushButton.setGeometry(QtCore.QRect(460, 30, 81, 28))
+        self.pushButton.setObjectName(_fromUtf8("pushButton"))
+        self.comboBox_2 = QtGui.QComboBox(self.groupBox_2)
+        self.comboBox_2.setGeometry(QtCore.QRect(375, 110, 166, 22))
+        self.comboBox_2.setObjectName(_fromUtf8("comboBox_2"))
+        self.label = QtGui.QLabel(self.groupBox_2)
+        self.label.setGeometry(QtCore.QRect(30, 35, 136, 21))
+        self.label.setObjectName(_fromUtf8("label"))
+        self.label_2 = QtGui.QLabel(self.groupBox_2)
+        self.label_2.setGeometry(QtCore.QRect(285, 80, 86, 16))
+        self.label_2.setObjectName(_fromUtf8("label_2"))
+        self.comboBox_3 = QtGui.QComboBox(self.groupBox_2)
+        self.comboBox_3.setGeometry(QtCore.QRect(375, 140, 166, 22))
+        self.comboBox_3.setObjectName(_fromUtf8("comboBox_3"))
+        self.label_5 = QtGui.QLabel(self.groupBox_2)
+        self.label_5.setGeometry(QtCore.QRect(90, 85, 181, 61))
+        font = QtGui.QFont()
+        font.setPointSize(7)
+        font.setItalic(True)
+        self.label_5.setFont(font)
+        self.label_5.setLayoutDirection(QtCore.Qt.LeftToRight)
+        self.label_5.setScaledContents(False)
+        self.label_5.setAlignment(QtCore.Qt.AlignLeading|QtCore.Qt.AlignLeft|QtCore.Qt.AlignVCenter)
+        self.label_5.setWordWrap(True)
+        self.label_5.setObjectName(_fromUtf8("label_5"))
+        self.groupBox_3 = QtGui.QGroupBox(self.groupBox_MODISDataInput)
+        self.groupBox_3.setGeometry(QtCore.QRect(15, 25, 556, 66))
+        self.groupBox_3.setObjectName(_fromUtf8("groupBox_3"))
+        self.label_MODISData = QtGui.QLabel(self.groupBox_3)
+        self.label_MODISData.setGeometry(QtCore.QRect(15, 25, 151, 20))
+        self.label_MODISData.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_MODISData.setObjectName(_fromUtf8("label_MODISData"))
+        self.lineEdit_MODISData = QtGui.QLineEdit(self.groupBox_3)
+        self.lineEdit_MODISData.setGeometry(QtCore.QRect(170, 25, 281, 21))
+        self.lineEdit_MODISData.setObjectName(_fromUtf8("lineEdit_MODISData"))
+        self.pushButton_BrowseMODISData = QtGui.QPushButton(self.groupBox_3)
+        self.pushButton_BrowseMODISData.setEnabled(True)
+        self.pushButton_BrowseMODISData.setGeometry(QtCore.QRect(460, 20, 81, 28))
+        self.pushButton_BrowseMODISData.setObjectName(_fromUtf8("pushButton_BrowseMODISData"))
+        self.groupBox_ReviewGraphs = QtGui.QGroupBox(PredictTempDialog)
+        self.groupBox_ReviewGraphs.setGeometry(QtCore.QRect(615, 15, 431, 451))
+        self.groupBox_ReviewGraphs.setObjectName(_fromUtf8("groupBox_ReviewGraphs"))
+        self.listWidget_ReivewGraphs = QtGui.QListWidget(self.groupBox_ReviewGraphs)
+        self.listWidget_ReivewGraphs.setGeometry(QtCore.QRect(15, 230, 401, 171))
+        self.listWidget_ReivewGraphs.setObjectName(_fromUtf8("listWidget_ReivewGraphs"))
+        self.pushButton_ReviewGraphs = QtGui.QPushButton(self.groupBox_ReviewGraphs)
+        self.pushButton_ReviewGraphs.setGeometry(QtCore.QRect(320, 410, 96, 28))
+        self.pushButton_ReviewGraphs.setObjectName(_fromUtf8("pushButton_ReviewGraphs"))
+        self.label_8 = QtGui.QLabel(self.groupBox_ReviewGraphs)
+        self.label_8.setGeometry(QtCore.QRect(15, 210, 53, 16))
+        self.label_8.setObjectName(_fromUtf8("label_8"))
+        self.listWidget_ReivewGraphs_2 = QtGui.QListWidget(self.groupBox_ReviewGraphs)
+        self.listWidget_ReivewGraphs_2.setGeometry(QtCore.QRect(15, 45, 401, 121))
+        self.listWidget_ReivewGraphs_2.setObjectName(_fromUtf8("listWidget_ReivewGraphs_2"))
+        self.pushButton_2 = QtGui.QPushButton(self.groupBox_ReviewGraphs)
+        self.pushButton_2.setGeometry(QtCore.QRect(285, 175, 131, 28))
+        self.pushButton_2.setObjectName(_fromUtf8("pushButton_2"))
+        self.label_9 = QtGui.QLabel(self.groupBox_ReviewGraphs)
+        self.label_9.setGeometry(QtCore.QRect(15, 25, 146, 16))
+        self.label_9.setObjectName(_fromUtf8("label_9"))
+        self.groupBox_StatusConsole = QtGui.QGroupBox(PredictTempDialog)
+        self.groupBox_StatusConsole.setGeometry(QtCore.QRect(15, 485, 1031, 241))
+        self.groupBox_StatusConsole.setObjectName(_fromUtf8("groupBox_StatusConsole"))
+        self.textEdit_StatusConsole = QtGui.QTextEdit(self.groupBox_StatusConsole)
+        self.textEdit_StatusConsole.setGeometry(QtCore.QRect(15, 25, 1001, 201))
+        self.textEdit_StatusConsole.setFrameShape(QtGui.QFrame.StyledPanel)
+        self.textEdit_StatusConsole.setFrameShadow(QtGui.QFrame.Plain)
+        self.textEdit_StatusConsole.setObjectName(_fromUtf8("textEdit_StatusConsole"))
+
+        self.retranslateUi(PredictTempDialog)
+        QtCore.QObject.connect(self.button_box, QtCore.SIGNAL(_fromUtf8("accepted()")), PredictTempDialog.accept)
+        QtCore.QObject.connect(self.button_box, QtCore.SIGNAL(_fromUtf8("rejected()")), PredictTempDialog.reject)
+        QtCore.QMetaObject.connectSlotsByName(PredictTempDialog)
+
+    def retranslateUi(self, PredictTempDialog):
+        PredictTempDialog.setWindowTitle(_translate("PredictTempDialog", "STeAMM - Predict Stream Temperatures", None))
+        self.groupBox_MODISDataInput.setTitle(_translate("PredictTempDialog", "Model Input", None))
+        self.groupBox.setTitle(_translate("PredictTempDialog", "Spatial Data", None))
+        self.label_PolygonShp.setText(_translate("PredictTempDialog", "Polygon shapefile:", None))
+        self.label_StreamShp.setText(_translate("PredictTempDialog", "Steam network shapefile:", None))
+        self.pushButton_BrowsePolygonShp.setText(_translate("PredictTempDialog", "Browse...", None))
+        self.pushButton_BrowseStreamShp.setText(_translate("PredictTempDialog", "Browse...", None))
+        self.groupBox_2.setTitle(_translate("PredictTempDialog", "Temperature Logger Data", None))
+        self.label_4.setText(_translate("PredictTempDialog", "Temperature:", None))
+        self.label_3.setText(_translate("PredictTempDialog", "Julian Day:", None))
+        self.pushButton.setText(_translate("PredictTempDialog", "Browse ...", None))
+        self.label.setText(_translate("PredictTempDialog", "Logger data table (csv):", None))
+        self.label_2.setText(_translate("PredictTempDialog", "Site Identifier:", None))
+        self.label_5.setText(_translate("PredictTempDialog", "Choose the field from the logger data table that best matches each input field requirement", None))
+        self.groupBox_3.setTitle(_translate("PredictTempDialog", "MODIS LST Raster Data", None))
+        self.label_MODISData.setText(_translate("PredictTempDialog", "Local directory of geotiffs:", None))
+        self.pushButton_BrowseMODISData.setText(_translate("PredictTempDialog", "Browse ...", None))
+        self.groupBox_ReviewGraphs.setTitle(_translate("PredictTempDialog", "Model Outputs", None))
+        self.pushButton_ReviewGraphs.setText(_translate("PredictTempDialog", "Open", None))
+        self.label_8.setText(_translate("PredictTempDialog", "Graphs", None))
+        self.pushButton_2.setText(_translate("PredictTempDialog", "Add to Layers Panel", None))
+        self.label_9.setText(_translate("PredictTempDialog", "Spatial and Tabular Data", None))
+        self.groupBox_StatusConsole.setTitle(_translate("PredictTempDialog", "Status Console", None))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'dialog_process.ui'
+#
+# Created by: PyQt4 UI code generator 4.11.4
+#
+# WARNING! All changes made in this file will be lost!
+
+from PyQt4 import QtCore, QtGui
+
+try:
+    _fromUtf8 = QtCore.QString.fromUtf8
+except AttributeError:
+    def _fromUtf8(s):
+        return s
+
+try:
+    _encoding = QtGui.QApplication.UnicodeUTF8
+    def _translate(context, text, disambig):
+        return QtGui.QApplication.translate(context, text, disambig, _encoding)
+except AttributeError:
+    def _translate(context, text, disambig):
+        return QtGui.QApplication.translate(context, text, disambig)
+
+class Ui_ProcessDialog(object):
+    def setupUi(self, ProcessDialog):
+        ProcessDialog.setObjectName(_fromUtf8("ProcessDialog"))
+        ProcessDialog.resize(541, 589)
+        self.text_StatusConsole = QtGui.QTextBrowser(ProcessDialog)
+        self.text_StatusConsole.setGeometry(QtCore.QRect(15, 400, 511, 171))
+        self.text_StatusConsole.setObjectName(_fromUtf8("text_StatusConsole"))
+        self.label_StatusConsole = QtGui.QLabel(ProcessDialog)
+        self.label_StatusConsole.setGeometry(QtCore.QRect(15, 380, 106, 16))
+        self.label_StatusConsole.setObjectName(_fromUtf8("label_StatusConsole"))
+        self.lineEdit_DataDir = QtGui.QLineEdit(ProcessDialog)
+        self.lineEdit_DataDir.setGeometry(QtCore.QRect(15, 278, 411, 22))
+        self.lineEdit_DataDir.setObjectName(_fromUtf8("lineEdit_DataDir"))
+        self.button_BrowseDataDir = QtGui.QPushButton(ProcessDialog)
+        self.button_BrowseDataDir.setGeometry(QtCore.QRect(435, 275, 93, 31))
+        self.button_BrowseDataDir.setAutoDefault(False)
+        self.button_BrowseDataDir.setObjectName(_fromUtf8("button_BrowseDataDir"))
+        self.label_ProductID = QtGui.QLabel(ProcessDialog)
+        self.label_ProductID.setGeometry(QtCore.QRect(20, 25, 141, 20))
+        self.label_ProductID.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_ProductID.setObjectName(_fromUtf8("label_ProductID"))
+        self.cbo_ProductID = QtGui.QComboBox(ProcessDialog)
+        self.cbo_ProductID.setGeometry(QtCore.QRect(170, 25, 101, 22))
+        self.cbo_ProductID.setObjectName(_fromUtf8("cbo_ProductID"))
+        self.label_SwathID = QtGui.QLabel(ProcessDialog)
+        self.label_SwathID.setGeometry(QtCore.QRect(20, 65, 141, 20))
+        self.label_SwathID.setTextFormat(QtCore.Qt.PlainText)
+        self.label_SwathID.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_SwathID.setObjectName(_fromUtf8("label_SwathID"))
+        self.label_ProcessYear = QtGui.QLabel(ProcessDialog)
+        self.label_ProcessYear.setGeometry(QtCore.QRect(20, 105, 141, 20))
+        self.label_ProcessYear.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_ProcessYear.setObjectName(_fromUtf8("label_ProcessYear"))
+        self.cbo_SwathID = QtGui.QComboBox(ProcessDialog)
+        self.cbo_SwathID.setGeometry(QtCore.QRect(170, 65, 101, 22))
+        self.cbo_SwathID.setObjectName(_fromUtf8("cbo_SwathID"))
+        self.cbo_ProcessYear = QtGui.QComboBox(ProcessDialog)
+        self.cbo_ProcessYear.setGeometry(QtCore.QRect(170, 105, 101, 22))
+        self.cbo_ProcessYear.setObjectName(_fromUtf8("cbo_ProcessYear"))
+        self.lineEdit_DoYStart = QtGui.QLineEdit(ProcessDialog)
+        self.lineEdit_DoYStart.setGeometry(QtCore.QRect(130, 175, 51, 22))
+        self.lineEdit_DoYStart.setText("")
+        self.lineEdit_DoYStart.setObjectName(_fromUtf8("lineEdit_DoYStart"))
+        self.label_JulianDaysDesc = QtGui.QLabel(ProcessDialog)
+        self.label_JulianDaysDesc.setGeometry(QtCore.QRect(10, 150, 301, 20))
+        self.label_JulianDaysDesc.setAlignment(QtCore.Qt.AlignCenter)
+        self.label_JulianDaysDesc.setObjectName(_fromUtf8("label_JulianDaysDesc"))
+        self.checkBox_HDFConvert = QtGui.QCheckBox(ProcessDialog)
+        self.checkBox_HDFConvert.setGeometry(QtCore.QRect(20, 210, 181, 20))
+        self.checkBox_HDFConvert.setObjectName(_fromUtf8("checkBox_HDFConvert"))
+        self.label_DoYStart = QtGui.QLabel(ProcessDialog)
+        self.label_DoYStart.setGeometry(QtCore.QRect(10, 175, 111, 21))
+        self.label_DoYStart.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_DoYStart.setObjectName(_fromUtf8("label_DoYStart"))
+        self.label_DoYEnd = QtGui.QLabel(ProcessDialog)
+        self.label_DoYEnd.setGeometry(QtCore.QRect(180, 175, 81, 21))
+        self.label_DoYEnd.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_DoYEnd.setObjectName(_fromUtf8("label_DoYEnd"))
+        self.lineEdit_DoYEnd = QtGui.QLineEdit(ProcessDialog)
+        self.lineEdit_DoYEnd.setGeometry(QtCore.QRect(270, 175, 51, 22))
+        self.lineEdit_DoYEnd.setObjectName(_fromUtf8("lineEdit_DoYEnd"))
+        self.lbl_DataDir = QtGui.QLabel(ProcessDialog)
+        self.lbl_DataDir.setGeometry(QtCore.QRect(15, 253, 206, 20))
+        self.lbl_DataDir.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.lbl_DataDir.setObjectName(_fromUtf8("lbl_DataDir"))
+        self.lineDivider = QtGui.QFrame(ProcessDialog)
+        self.lineDivider.setGeometry(QtCore.QRect(15, 360, 511, 16))
+        self.lineDivider.setFrameShape(QtGui.QFrame.HLine)
+        self.lineDivider.setFrameShadow(QtGui.QFrame.Sunken)
+        self.lineDivider.setObjectName(_fromUtf8("lineDivider"))
+        self.groupBox_Credentials = QtGui.QGroupBox(ProcessDialog)
+        self.groupBox_Credentials.setGeometry(QtCore.QRect(305, 20, 221, 111))
+        self.groupBox_Credentials.setObjectName(_fromUtf8("groupBox_Credentials"))
+        self.label_Username = QtGui.QLabel(self.groupBox_Credentials)
+        self.label_Username.setGeometry(QtCore.QRect(15, 35, 66, 16))
+        self.label_Username.setObjectName(_fromUtf8("label_Username"))
+        self.label_Password = QtGui.QLabel(self.groupBox_Credentials)
+        self.label_Password.setGeometry(QtCore.QRect(15, 70, 61, 16))
+        self.label_Password.setObjectName(_fromUtf8("label_Password"))
+        self.lineEdit_Username = QtGui.QLineEdit(self.groupBox_Credentials)
+        self.lineEdit_Username.setGeometry(QtCore.QRect(85, 35, 121, 22))
+        self.lineEdit_Username.setObjectName(_fromUtf8("lineEdit_Username"))
+        self.lineEdit_Password = QtGui.QLineEdit(self.groupBox_Credentials)
+        self.lineEdit_Password.setGeometry(QtCore.QRect(85, 70, 121, 22))
+        self.lineEdit_Password.setObjectName(_fromUtf8("lineEdit_Password"))
+        self.button_Start = QtGui.QPushButton(ProcessDialog)
+        self.button_Start.setGeometry(QtCore.QRect(325, 330, 93, 28))
+        self.button_Start.setDefault(True)
+        self.button_Start.setObjectName(_fromUtf8("button_Start"))
+        self.button_Reset = QtGui.QPushButton(ProcessDialog)
+        self.button_Reset.setGeometry(QtCore.QRect(430, 330, 93, 28))
+        self.button_Reset.setObjectName(_fromUtf8("button_Reset"))
+
+        self.retranslateUi(ProcessDialog)
+        QtCore.QObject.connect(self.button_Reset, QtCore.SIGNAL(_fromUtf8("pressed()")), ProcessDialog.reject)
+        QtCore.QObject.connect(self.button_Start, QtCore.SIGNAL(_fromUtf8("pressed()")), ProcessDialog.exec_)
+        QtCore.QMetaObject.connectSlotsByName(ProcessDialog)
+
+    def retranslateUi(self, ProcessDialog):
+        ProcessDialog.setWindowTitle(_translate("ProcessDialog", "STeAMM - Get MODIS Swaths", None))
+        self.label_StatusConsole.setText(_translate("ProcessDialog", "Status Messages:", None))
+        self.button_BrowseDataDir.setText(_translate("ProcessDialog", "Browse...", None))
+        self.label_ProductID.setText(_translate("ProcessDialog", "MODIS Data Product ID:", None))
+        self.label_SwathID.setText(_translate("ProcessDialog", "MODIS Swath ID:", None))
+        self.label_ProcessYear.setText(_translate("ProcessDialog", "Processing year:", None))
+        self.lineEdit_DoYStart.setPlaceholderText(_translate("ProcessDialog", "1", None))
+        self.label_JulianDaysDesc.setText(_translate("ProcessDialog", "Select the beginning and end dates, in julian days:", None))
+        self.checkBox_HDFConvert.setText(_translate("ProcessDialog", "Convert HDF files to Geotiff", None))
+        self.label_DoYStart.setText(_translate("ProcessDialog", "Beginning of year:", None))
+        self.label_DoYEnd.setText(_translate("ProcessDialog", "End of year:", None))
+        self.lineEdit_DoYEnd.setPlaceholderText(_translate("ProcessDialog", "366", None))
+        self.lbl_DataDir.setText(_translate("ProcessDialog", "Download to this directory file path:", None))
+        self.groupBox_Credentials.setTitle(_translate("ProcessDialog", "EarthData Login", None))
+        self.label_Username.setText(_translate("ProcessDialog", "Username:", None))
+        self.label_Password.setText(_translate("ProcessDialog", "Password:", None))
+        self.button_Start.setText(_translate("ProcessDialog", "Start", None))
+        self.button_Reset.setText(_translate("ProcessDialog", "Reset", None))